@@ -0,0 +1,237 @@
+# ----- Imports -----
+# Utility
+import numpy as np
+import threading
+
+# Reability
+from typing import Dict, List
+
+# For Control
+import time
+
+# My Code
+from KnobController import KnobController
+
+# ----- Class -----
+class SampleRingBuffer:
+	"""
+	Fixed size buffer of timestamped samples with a single writer and a single reader.
+
+	All memory is allocated up front. The writer never waits on the reader, and the
+	reader never waits on the writer, it only looks at the samples that have been
+	written since its last read.
+	"""
+
+	def __init__(self, capacity = 256):
+		"""
+		Creates an empty buffer
+
+		capacity : number of samples kept before the oldest ones are overwritten
+		"""
+
+		self.capacity = int(capacity)
+		self.timestamps = np.zeros(self.capacity)
+		self.values = np.zeros(self.capacity)
+
+		# Total number of samples written/read, the slot is the count modulo the capacity
+		self.writeCount = 0
+		self.readCount = 0
+
+		# Set if the writer stopped because of an error, see Fail
+		self.writerError: Exception = None
+	#
+
+	def Write(self, timestamp, value):
+		"""
+		Adds a sample to the buffer (writer side)
+
+		timestamp : time the sample was taken
+		value : raw sample value
+		"""
+
+		index = self.writeCount % self.capacity
+		self.timestamps[index] = timestamp
+		self.values[index] = value
+
+		# Only publish the sample once it has been completely written
+		self.writeCount += 1
+	#
+
+	def Fail(self, error):
+		"""
+		Marks the buffer as no longer being written because of error (writer side), every
+		later read raises it instead of returning the last sample forever
+		"""
+
+		self.writerError = error
+	#
+
+	def GetLatest(self):
+		"""
+		Returns the newest (timestamp, value) pair, or None if nothing has been written
+		"""
+
+		count = self.writeCount
+		if count == 0:
+			return None
+		#
+
+		index = (count - 1) % self.capacity
+		return self.timestamps[index], self.values[index]
+	#
+
+	def ReadNew(self):
+		"""
+		Returns the average of every sample written since the last call (reader side) and
+		the timestamp of the newest one. If nothing new has arrived the newest sample is
+		returned again. Returns None if nothing has been written yet, raises the writer's
+		error if it has failed (see Fail)
+		"""
+
+		if self.writerError is not None:
+			raise self.writerError
+		#
+
+		count = self.writeCount
+		if count == 0:
+			return None
+		#
+
+		# Samples older than the capacity have already been overwritten
+		numberOfNewSamples = min(count - self.readCount, self.capacity)
+		self.readCount = count
+
+		if numberOfNewSamples <= 0:
+			return self.GetLatest()
+		#
+
+		# Indices of the new samples, oldest first
+		indices = np.arange(count - numberOfNewSamples, count) % self.capacity
+		return self.timestamps[indices[-1]], np.mean(self.values[indices])
+	#
+#
+
+class AdcAcquisitionThread(threading.Thread):
+	"""
+	Background thread that samples the potentiometers of a group of knobs as fast as the
+	bus allows and publishes the samples to one SampleRingBuffer per knob.
+
+	While this thread is running it owns the ADC, knobs read their position from their
+	buffer instead of the bus (see KnobController.ReadPotentiometerValue).
+	"""
+
+	def __init__(self, knobs: List[KnobController], bufferSize = 256, samplePeriod = 0):
+		"""
+		Creates the thread and attaches a sample buffer to each knob
+
+		knobs : controllers to sample
+		bufferSize : number of samples held for each knob
+		samplePeriod : minimum time (in seconds) between passes over the knobs, 0 samples
+			as fast as possible
+		"""
+
+		super().__init__(name = "ADC Acquisition", daemon = True)
+
+		self.knobs = knobs
+		self.samplePeriod = samplePeriod
+		self.running = False
+
+		# Statistics
+		self.numberOfSamples = 0
+		self.numberOfBusErrors = 0
+
+		# Anything other than a bus error stops the thread, see run
+		self.error: Exception = None
+
+		# Attach a buffer to every knob
+		self.buffers: Dict[int, SampleRingBuffer] = dict()
+		for knobController in self.knobs:
+			sampleBuffer = SampleRingBuffer(bufferSize)
+			self.buffers[knobController.knobNumber] = sampleBuffer
+			knobController.sampleBuffer = sampleBuffer
+		#
+	#
+
+	def run(self):
+		"""
+		Sampling loop
+		"""
+
+		self.running = True
+
+		try:
+			while self.running:
+				passStartTime = time.monotonic()
+
+				for knobController in self.knobs:
+					number = knobController.knobNumber
+
+					try:
+						rawValue = knobController.ReadRawPotentiometerValue(number)
+					except OSError:
+						# The bus hiccuped, try again on the next pass
+						self.numberOfBusErrors += 1
+						continue
+					#
+
+					self.buffers[number].Write(time.monotonic(), rawValue)
+					self.numberOfSamples += 1
+				#
+
+				# Optionally limit the sampling rate
+				remainingTime = self.samplePeriod - (time.monotonic() - passStartTime)
+				if remainingTime > 0:
+					time.sleep(remainingTime)
+				#
+			#
+		except Exception as error:
+			# Handed to the control thread through the buffers, otherwise the knobs would
+			# keep acting on the last samples taken
+			self.error = error
+			self.running = False
+			for sampleBuffer in self.buffers.values():
+				sampleBuffer.Fail(error)
+			#
+		#
+	#
+
+	def WaitForFirstSamples(self, timeout = 1.0, pollInterval = 0.001):
+		"""
+		Waits until every knob's buffer holds a sample, so the knobs never have to fall
+		back on the bus (which the thread owns). Raises the thread's error if it stopped,
+		TimeoutError if the samples don't arrive within timeout seconds
+		"""
+
+		deadline = time.monotonic() + timeout
+		while any(sampleBuffer.writeCount == 0 for sampleBuffer in self.buffers.values()):
+			if self.error is not None:
+				raise self.error
+			#
+			if time.monotonic() > deadline:
+				raise TimeoutError(f"The acquisition thread didn't sample every knob within {timeout} s")
+			#
+
+			time.sleep(pollInterval)
+		#
+	#
+
+	def Stop(self):
+		"""
+		Stops sampling and hands the ADC back to the knobs
+		"""
+
+		self.running = False
+		if self.is_alive():
+			self.join()
+		#
+
+		for knobController in self.knobs:
+			knobController.sampleBuffer = None
+		#
+	#
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	print("Program Completed")
+#
@@ -0,0 +1,275 @@
+# ----- Imports -----
+# Utility
+import json
+import math
+import numpy as np
+
+# Reability
+from typing import Dict, List
+
+# For Control
+import time
+
+# My Code
+from ParameterSweep import GenerateLatinHypercube, RunSweep
+from StepResponseBenchmark import LoadPointList
+
+# ----- Class -----
+class GaussianProcess:
+	"""
+	Small Gaussian process regressor (squared exponential kernel) used as the surrogate
+	model of the controller's cost. Inputs are expected to be scaled to [0, 1]
+	"""
+
+	def __init__(self, lengthScales = (0.1, 0.2, 0.35, 0.6, 1.0), noiseVariance = 1e-3):
+		"""
+		Creates an untrained model
+
+		lengthScales : kernel length scales to choose from, the one with the highest marginal
+			likelihood is used when the model is fit
+		noiseVariance : observation noise (in standardized units), the simulated runs are
+			noisy because of the sensor noise
+		"""
+
+		self.lengthScales = lengthScales
+		self.noiseVariance = noiseVariance
+	#
+
+	def Kernel(self, a, b, lengthScale):
+		"""
+		Squared exponential kernel between the rows of a and b
+		"""
+
+		squaredDistances = np.sum((a[:, None, :] - b[None, :, :])**2, axis = 2)
+		return np.exp(-0.5*squaredDistances/lengthScale**2)
+	#
+
+	def Fit(self, inputs, outputs):
+		"""
+		Trains the model on observed inputs (n x d) and outputs (n)
+		"""
+
+		self.inputs = np.asarray(inputs, dtype = float)
+		self.outputs = outputs = np.asarray(outputs, dtype = float)
+
+		# Standardize the outputs so one set of hyperparameters works for any cost scale
+		self.outputMean = np.mean(outputs)
+		self.outputScale = np.std(outputs) if np.std(outputs) > 0 else 1.0
+		standardOutputs = (outputs - self.outputMean)/self.outputScale
+
+		# Pick the length scale with the highest log marginal likelihood
+		bestLikelihood = -np.inf
+		for lengthScale in self.lengthScales:
+			covariance = self.Kernel(self.inputs, self.inputs, lengthScale) \
+				+ self.noiseVariance*np.eye(len(self.inputs))
+			cholesky = np.linalg.cholesky(covariance)
+			alpha = np.linalg.solve(cholesky.T, np.linalg.solve(cholesky, standardOutputs))
+
+			likelihood = -0.5*standardOutputs @ alpha - np.sum(np.log(np.diag(cholesky)))
+			if likelihood > bestLikelihood:
+				bestLikelihood = likelihood
+				self.lengthScale = lengthScale
+				self.cholesky = cholesky
+				self.alpha = alpha
+			#
+		#
+	#
+
+	def Predict(self, inputs):
+		"""
+		Returns the predicted mean and standard deviation at each row of inputs
+		"""
+
+		inputs = np.asarray(inputs, dtype = float)
+
+		crossCovariance = self.Kernel(inputs, self.inputs, self.lengthScale)
+		standardMean = crossCovariance @ self.alpha
+
+		solved = np.linalg.solve(self.cholesky, crossCovariance.T)
+		variance = np.clip(1 - np.sum(solved**2, axis = 0), 1e-12, None)
+
+		mean = self.outputMean + self.outputScale*standardMean
+		standardDeviation = self.outputScale*np.sqrt(variance)
+
+		return mean, standardDeviation
+	#
+#
+
+# ----- Methods and Functions -----
+def ComputeCost(metrics: dict, overshootWeight = 0.1, timeoutPenalty = 100):
+	"""
+	Cost of a configuration: mean settling time + overshootWeight * mean overshoot, with a
+	large penalty for every move that never settled
+	"""
+
+	return metrics["meanTime"] + overshootWeight*metrics["meanOvershoot"] \
+		+ timeoutPenalty*metrics["timeouts"]
+#
+
+def ExpectedImprovement(mean, standardDeviation, bestCost):
+	"""
+	Expected amount each candidate improves on bestCost (lower costs are better)
+	"""
+
+	improvement = bestCost - mean
+	z = improvement/standardDeviation
+
+	normalCdf = 0.5*(1 + np.array([math.erf(value/math.sqrt(2)) for value in z]))
+	normalPdf = np.exp(-0.5*z**2)/math.sqrt(2*math.pi)
+
+	return improvement*normalCdf + standardDeviation*normalPdf
+#
+
+def ScaleConfigurations(configurations: List[dict], parameterRanges: Dict[str, tuple]):
+	"""
+	Converts configurations into an array with every parameter scaled to [0, 1]
+	"""
+
+	names = list(parameterRanges.keys())
+	lows = np.array([parameterRanges[name][0] for name in names], dtype = float)
+	highs = np.array([parameterRanges[name][1] for name in names], dtype = float)
+
+	values = np.array([[configuration[name] for name in names] for configuration in configurations], dtype = float)
+	return (values - lows)/(highs - lows)
+#
+
+def SelectBatch(model: GaussianProcess, candidates: List[dict], parameterRanges, bestCost, batchSize):
+	"""
+	Chooses batchSize candidates to evaluate next.
+
+	The candidate with the highest expected improvement is picked, then the model is told
+	(temporarily) that its cost is the predicted mean so the next pick goes somewhere else.
+	This spreads a batch out without having to wait for any of its results
+	"""
+
+	candidateInputs = ScaleConfigurations(candidates, parameterRanges)
+	observedInputs = model.inputs
+	observedOutputs = model.outputs
+
+	selectedIndices = []
+	for batchNumber in range(0, batchSize):
+		mean, standardDeviation = model.Predict(candidateInputs)
+		improvement = ExpectedImprovement(mean, standardDeviation, bestCost)
+		improvement[selectedIndices] = -np.inf
+
+		index = int(np.argmax(improvement))
+		selectedIndices.append(index)
+
+		# Pretend the prediction was observed
+		observedInputs = np.vstack([observedInputs, candidateInputs[index]])
+		observedOutputs = np.append(observedOutputs, mean[index])
+		model.Fit(observedInputs, observedOutputs)
+	#
+
+	return [candidates[index] for index in selectedIndices]
+#
+
+def RunAutoTune(parameterRanges: Dict[str, tuple], pointList, seeds, numberOfIterations = 8,
+		batchSize = 4, numberOfInitialSamples = 8, numberOfCandidates = 2000,
+		overshootWeight = 0.1, cacheFile = None, seed = 0, **runKwargs):
+	"""
+	Searches parameterRanges for the configuration with the lowest cost on the simulated
+	step-response benchmark, using a Gaussian process surrogate to pick which batch of
+	configurations to evaluate next. Batches are evaluated in parallel by RunSweep (and
+	share its cache). Returns (bestConfiguration, bestMetrics, history)
+
+	parameterRanges : KnobController argument name mapped to a (low, high) range
+	pointList : points every configuration is evaluated on
+	seeds : every configuration is run once per seed
+	numberOfIterations : number of batches chosen by the surrogate
+	batchSize : configurations evaluated per batch
+	numberOfInitialSamples : configurations from a Latin hypercube used to start the model
+	numberOfCandidates : random candidates the acquisition function is evaluated on
+	overshootWeight : weight of the mean overshoot in the cost (see ComputeCost)
+	cacheFile (optional) : cache shared with ParameterSweep
+	seed : seed for the random number generator
+	**runKwargs : named arguments sent to RunPointList
+	"""
+
+	random = np.random.default_rng(seed)
+
+	# --- Initial Design ---
+	configurations = GenerateLatinHypercube(parameterRanges, numberOfInitialSamples, seed = seed)
+	entries = RunSweep(configurations, pointList, seeds, cacheFile, **runKwargs)
+
+	history = [(entry["configuration"], entry["metrics"]) for entry in entries]
+
+	# --- Surrogate Guided Search ---
+	for iteration in range(0, numberOfIterations):
+		observedConfigurations = [configuration for configuration, metrics in history]
+		costs = [ComputeCost(metrics, overshootWeight) for configuration, metrics in history]
+		bestCost = min(costs)
+
+		print(f"Iteration {iteration:3} | Evaluated: {len(history):4} | Best Cost: {bestCost:7.3f}")
+
+		# Fit the model to everything evaluated so far
+		model = GaussianProcess()
+		model.Fit(ScaleConfigurations(observedConfigurations, parameterRanges), costs)
+
+		# Choose and evaluate the next batch
+		candidates = GenerateLatinHypercube(parameterRanges, numberOfCandidates, seed = int(random.integers(2**31)))
+		batch = SelectBatch(model, candidates, parameterRanges, bestCost, batchSize)
+		entries = RunSweep(batch, pointList, seeds, cacheFile, **runKwargs)
+
+		history.extend((entry["configuration"], entry["metrics"]) for entry in entries)
+	#
+
+	# --- Best Result ---
+	bestConfiguration, bestMetrics = min(history, key = lambda item: ComputeCost(item[1], overshootWeight))
+
+	return bestConfiguration, bestMetrics, history
+#
+
+def SaveCalibration(fileName, configuration: dict, metrics: dict, overshootWeight):
+	"""
+	Saves a configuration as a calibration file that KnobController.LoadCalibration reads
+	"""
+
+	calibrationDictionary = dict()
+	calibrationDictionary["controller"] = configuration
+	calibrationDictionary["metrics"] = metrics
+	calibrationDictionary["cost"] = ComputeCost(metrics, overshootWeight)
+	calibrationDictionary["overshootWeight"] = overshootWeight
+	calibrationDictionary["created"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
+	with open(fileName, 'w') as jsonFile:
+		json.dump(calibrationDictionary, jsonFile, indent = 1)
+	#
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	startTime = time.monotonic()
+
+	# --- Tuning Parameters ---
+	pointFile = "../Experimentation/ServoExperimentPoints_0.json"
+	cacheFile = "ParameterSweepCache.jsonl"
+	calibrationFile = "Calibration.json"
+	seeds = [0, 1]
+	overshootWeight = 0.1
+
+	parameterRanges = dict()
+	parameterRanges["proportionalGain"] = (0.1, 1.0)
+	parameterRanges["integralGain"] = (0.0, 0.8)
+	parameterRanges["derivativeGain"] = (0.0, 0.15)
+	parameterRanges["deadzoneCenter"] = (47, 51)
+	parameterRanges["deadzoneSize"] = (2, 6)
+	parameterRanges["boundarySpeedMagnitude"] = (2, 10)
+	parameterRanges["boundaryOuterThreshold"] = (10, 25)
+	parameterRanges["boundaryInnerThreshold"] = (30, 60)
+
+	# --- Tuning ---
+	pointList = LoadPointList(pointFile)
+	bestConfiguration, bestMetrics, history = RunAutoTune(parameterRanges, pointList, seeds,
+		overshootWeight = overshootWeight, cacheFile = cacheFile)
+
+	print("")
+	print(f"Best Configuration: {bestConfiguration}")
+	print(f"Metrics: {bestMetrics} | Cost: {ComputeCost(bestMetrics, overshootWeight):7.3f}")
+
+	# --- Saving Calibration ---
+	SaveCalibration(calibrationFile, bestConfiguration, bestMetrics, overshootWeight)
+	print(f"Calibration Saved To: {calibrationFile}")
+
+	print(f"Execution Time (s) : {time.monotonic() - startTime}")
+#
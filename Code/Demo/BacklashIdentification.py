@@ -0,0 +1,298 @@
+# ----- Imports -----
+# Utility
+import json
+import numpy as np
+
+# Reability
+from typing import List
+
+# For Control
+import time
+
+# My Code
+from KnobController import KnobController
+
+# ----- Methods and Functions -----
+# --- Driving the Knob Directly ---
+def ReadAveragedPosition(knobController: KnobController, numberOfSamples = 4):
+	"""
+	Returns the mean of a few raw potentiometer samples. The controller's own filter lags
+	too much to time when the knob starts moving
+	"""
+
+	values = [knobController.ReadRawPotentiometerValue(knobController.knobNumber) \
+		for sample in range(0, numberOfSamples)]
+
+	return float(np.mean(values))
+#
+
+def DriveServo(knobController: KnobController, command):
+	"""
+	Sends a command straight to the knob's servo, bypassing the PID
+	"""
+
+	knobController.servoCommand = command
+	knobController.WriteServoCommand()
+#
+
+def GetCommand(knobController: KnobController, direction, magnitude):
+	"""
+	Returns the servo command magnitude past the edge of the controller's deadzone in
+	direction (1 or -1), the same way KnobController.CompensateBacklash builds it
+	"""
+
+	return knobController.deadzoneCenter + direction*(0.5*knobController.deadzoneSize + magnitude)
+#
+
+def Hold(knobController: KnobController, duration, numberOfSamples = 4):
+	"""
+	Samples the knob until duration has passed, returns the lists of times and positions
+	"""
+
+	clock = knobController.clock
+	startTime = clock.monotonic()
+
+	times: List[float] = []
+	positions: List[float] = []
+	while clock.monotonic() - startTime < duration:
+		positions.append(ReadAveragedPosition(knobController, numberOfSamples))
+		times.append(clock.monotonic())
+		clock.sleep(knobController.samplingTime)
+	#
+
+	return times, positions
+#
+
+# --- Measurements ---
+def MeasureBreakaway(knobController: KnobController, direction, holdTime = 1.0, stepSize = 0.5,
+		maximumOffset = 15, moveThreshold = 2):
+	"""
+	Returns the smallest offset from the deadzone center (in servo command units) that
+	turns the knob in direction (1 or -1), i.e. how far the servo's stiction and deadband
+	extend. The slack in the gears should already be taken up in direction
+
+	holdTime : time each command is held for
+	stepSize : amount the command is increased by each step
+	maximumOffset : offset to give up at
+	moveThreshold : potentiometer counts the knob must move for it to count as moving
+	"""
+
+	offset = stepSize
+	while offset <= maximumOffset:
+		startPosition = ReadAveragedPosition(knobController)
+
+		DriveServo(knobController, knobController.deadzoneCenter + direction*offset)
+		times, positions = Hold(knobController, holdTime)
+		DriveServo(knobController, 180)
+
+		if direction*(positions[-1] - startPosition) > moveThreshold:
+			return offset
+		#
+
+		offset += stepSize
+	#
+
+	return None
+#
+
+def MeasureReversal(knobController: KnobController, direction, speedMagnitude = 10,
+		moveThreshold = 2, timeout = 3.0, measurementTime = 0.5):
+	"""
+	Drives the knob in direction right after it was last turned the other way and
+	measures how long the servo turns before the potentiometer follows.
+
+	Returns (deadTime, speed, backlash): the time (seconds) spent crossing the slack at
+	this command, the potentiometer speed (counts per second) once it is engaged, and the
+	backlash (potentiometer counts). deadTime is None if the knob never moved
+
+	speedMagnitude : command magnitude past the edge of the deadzone to drive at
+	moveThreshold : potentiometer counts the knob must move for it to count as moving
+	timeout : longest time to wait for the knob to move
+	measurementTime : time spent measuring the speed once the knob is moving
+	"""
+
+	clock = knobController.clock
+
+	restPosition = ReadAveragedPosition(knobController)
+
+	# - Cross the Slack -
+	DriveServo(knobController, GetCommand(knobController, direction, speedMagnitude))
+	startTime = clock.monotonic()
+
+	detectionTime = None
+	while clock.monotonic() - startTime < timeout:
+		position = ReadAveragedPosition(knobController)
+		if direction*(position - restPosition) > moveThreshold:
+			detectionTime = clock.monotonic()
+			break
+		#
+		clock.sleep(knobController.samplingTime)
+	#
+
+	if detectionTime is None:
+		DriveServo(knobController, 180)
+		return None, 0.0, 0.0
+	#
+
+	# - Measure the Engaged Speed -
+	times, positions = Hold(knobController, measurementTime)
+	DriveServo(knobController, 180)
+
+	speed = abs(np.polyfit(times, positions, 1)[0])
+
+	# The knob had already moved moveThreshold when it was detected
+	deadTime = max(0.0, detectionTime - startTime - moveThreshold/speed)
+
+	return deadTime, speed, speed*deadTime
+#
+
+def IdentifyBacklash(knobController: KnobController, numberOfReversals = 6, speedMagnitude = 10,
+		settleTime = 0.2, breakawayStepSize = 0.5, **reversalKwargs):
+	"""
+	Measures the deadband on each side of the servo's deadzone and the backlash in the
+	gears by reversing the knob back and forth around where it currently is. The knob
+	should be away from its end stops. Returns a dictionary of the results
+
+	numberOfReversals : number of reversals to average the backlash over
+	speedMagnitude : command magnitude past the edge of the deadzone used for reversals,
+		the backlash compensation should use the same value
+	settleTime : time to let the knob stop between moves
+	breakawayStepSize : resolution (servo command units) of the deadband measurement
+	**reversalKwargs : named arguments sent to MeasureReversal
+	"""
+
+	clock = knobController.clock
+
+	# --- Deadband ---
+	# Take up the slack in each direction before looking for the point the servo breaks away
+	breakawayOffsets = dict()
+	for direction in [1, -1]:
+		MeasureReversal(knobController, direction, speedMagnitude, **reversalKwargs)
+		clock.sleep(settleTime)
+		breakawayOffsets[direction] = MeasureBreakaway(knobController, direction, stepSize = breakawayStepSize)
+		clock.sleep(settleTime)
+	#
+
+	# --- Backlash ---
+	# The slack is on the negative side after the deadband measurements
+	deadTimes: List[float] = []
+	speeds: List[float] = []
+	backlashes: List[float] = []
+	for reversal in range(0, numberOfReversals):
+		direction = 1 if (reversal % 2 == 0) else -1
+
+		deadTime, speed, backlash = MeasureReversal(knobController, direction, speedMagnitude, **reversalKwargs)
+		clock.sleep(settleTime)
+
+		if deadTime is not None:
+			deadTimes.append(deadTime)
+			speeds.append(speed)
+			backlashes.append(backlash)
+		#
+	#
+
+	# --- Results ---
+	identification = dict()
+	identification["knobNumber"] = knobController.knobNumber
+	identification["speedMagnitude"] = speedMagnitude
+	identification["deadzoneCenter"] = knobController.deadzoneCenter
+	identification["breakawayStepSize"] = breakawayStepSize
+	identification["positiveBreakaway"] = breakawayOffsets[1]
+	identification["negativeBreakaway"] = breakawayOffsets[-1]
+	identification["deadTimes"] = deadTimes
+	identification["deadTime"] = float(np.median(deadTimes)) if deadTimes else None
+	identification["speed"] = float(np.median(speeds)) if speeds else None
+	identification["backlash"] = float(np.median(backlashes)) if backlashes else None
+
+	return identification
+#
+
+def GetControllerKwargs(identification: dict):
+	"""
+	Returns the KnobController named arguments that compensate for the identified
+	deadband and backlash
+	"""
+
+	controllerKwargs = dict()
+
+	# The controller skips commands within deadzoneSize/2 of the deadzone center, the edge
+	# of the deadband is somewhere in the step before each breakaway offset
+	positiveBreakaway = identification["positiveBreakaway"]
+	negativeBreakaway = identification["negativeBreakaway"]
+	if (positiveBreakaway is not None) and (negativeBreakaway is not None):
+		positiveEdge = positiveBreakaway - identification["breakawayStepSize"]/2
+		negativeEdge = negativeBreakaway - identification["breakawayStepSize"]/2
+		controllerKwargs["deadzoneCenter"] = identification["deadzoneCenter"] + (positiveEdge - negativeEdge)/2
+		controllerKwargs["deadzoneSize"] = positiveEdge + negativeEdge
+	#
+
+	if identification["deadTime"] is not None:
+		controllerKwargs["backlashPreloadTime"] = identification["deadTime"]
+		controllerKwargs["backlashPreloadSpeed"] = identification["speedMagnitude"]
+	#
+
+	return controllerKwargs
+#
+
+def SaveIdentification(fileName, identification: dict):
+	"""
+	Saves the identification as a calibration file that KnobController.LoadCalibration
+	reads
+	"""
+
+	calibrationDictionary = dict()
+	calibrationDictionary["controller"] = GetControllerKwargs(identification)
+	calibrationDictionary["identification"] = identification
+	calibrationDictionary["created"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+
+	with open(fileName, 'w') as jsonFile:
+		json.dump(calibrationDictionary, jsonFile, indent = 1)
+	#
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	from SimulatedHardware import SimulatedHardware
+
+	# --- Identification Parameters ---
+	useHardware = False
+	knobNumber = 0
+	calibrationFile = "Backlash.json"
+	simulatedBacklash = 6
+
+	# --- Identifying ---
+	if useHardware:
+		knobController = KnobController(knobNumber, printDebugValues = False)
+	else:
+		hardware = SimulatedHardware(3, seed = 0, backlash = simulatedBacklash)
+		knobController = KnobController(knobNumber, printDebugValues = False, **hardware.GetControllerKwargs())
+	#
+
+	identification = IdentifyBacklash(knobController)
+	print(f"Breakaway Offsets: +{identification['positiveBreakaway']} / -{identification['negativeBreakaway']}")
+	print(f"Backlash: {identification['backlash']:5.2f} counts | Dead Time: {identification['deadTime']:5.3f} s" \
+		+ f" | Speed: {identification['speed']:5.2f} counts/s")
+
+	SaveIdentification(calibrationFile, identification)
+	print(f"Calibration Saved To: {calibrationFile}")
+
+	# --- Comparing Reversals in Simulation ---
+	if not useHardware:
+		moves = [60, 190, 70, 180, 80, 170]
+		compensationKwargs = {name: value for name, value in GetControllerKwargs(identification).items() \
+			if name.startswith("backlash")}
+
+		for name, controllerKwargs in [("Uncompensated", dict()), ("Compensated", compensationKwargs)]:
+			hardware = SimulatedHardware(3, seed = 1, backlash = simulatedBacklash)
+			knobController = KnobController(knobNumber, printDebugValues = False,
+				**hardware.GetControllerKwargs(), **controllerKwargs)
+
+			moveTimes = []
+			for setpoint in moves:
+				knobController(setpoint, sequential = True, printDebugValues = False)
+				moveTimes.append(knobController.log["time"])
+			#
+			print(f"{name:13} | Mean Move Time: {np.mean(moveTimes):5.2f} s | {np.round(moveTimes, 2).tolist()}")
+		#
+	#
+#
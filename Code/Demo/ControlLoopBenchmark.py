@@ -0,0 +1,305 @@
+# ----- Imports -----
+# Utility
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import tracemalloc
+
+# Reability
+from typing import Dict, List
+
+# For Control
+import time
+
+# My Code
+from KnobSuite import KnobSuite
+from SimulatedHardware import SimulatedHardware
+
+# ----- Global Values ----
+# Stages of KnobController.Update that are timed, in the order they run
+STAGES = ["read", "filter", "pid", "deadzone", "padding", "settle", "servo"]
+
+# ----- Utility Classes -----
+class TickBudgetExceeded(Exception):
+	"""
+	Raised when a benchmark run uses more control ticks than it was allowed, so a
+	configuration that never settles can't hang the benchmark
+	"""
+	pass
+#
+
+class StageTimer:
+	"""
+	Accumulates the time spent in each stage of the control loop
+	"""
+
+	def __init__(self):
+		self.totals: Dict[str, float] = {stage: 0.0 for stage in STAGES}
+		self.counts: Dict[str, int] = {stage: 0 for stage in STAGES}
+	#
+
+	def Wrap(self, stage, function):
+		"""
+		Returns a version of function that adds its run time to stage
+		"""
+
+		def TimedFunction(*args, **kwargs):
+			startTime = time.perf_counter()
+			result = function(*args, **kwargs)
+			self.totals[stage] += time.perf_counter() - startTime
+			self.counts[stage] += 1
+			return result
+		#
+
+		return TimedFunction
+	#
+#
+
+class TimedProxy:
+	"""
+	Wraps a callable object (the PID controller or a filter) so calls to it are timed
+	while every attribute read and write still reaches the wrapped object
+	"""
+
+	def __init__(self, target, stage, stageTimer: StageTimer):
+		object.__setattr__(self, "target", target)
+		object.__setattr__(self, "timedCall", stageTimer.Wrap(stage, target))
+	#
+
+	def __call__(self, *args, **kwargs):
+		return self.timedCall(*args, **kwargs)
+	#
+
+	def __getattr__(self, attributeName):
+		return getattr(self.target, attributeName)
+	#
+
+	def __setattr__(self, attributeName, value):
+		setattr(self.target, attributeName, value)
+	#
+#
+
+# ----- Methods and Functions -----
+def InstrumentKnobSuite(knobSuite: KnobSuite, stageTimer: StageTimer):
+	"""
+	Replaces the parts of each controller that make up a control step with timed versions
+	"""
+
+	for knobController in knobSuite.knobs:
+		knobController.ReadRawPotentiometerValue = stageTimer.Wrap("read", knobController.ReadRawPotentiometerValue)
+		knobController.potentiometerFilter = TimedProxy(knobController.potentiometerFilter, "filter", stageTimer)
+		knobController.pid = TimedProxy(knobController.pid, "pid", stageTimer)
+		knobController.ApplyDeadzone = stageTimer.Wrap("deadzone", knobController.ApplyDeadzone)
+		knobController.ReducePidBoundsAtExtremes = stageTimer.Wrap("padding", knobController.ReducePidBoundsAtExtremes)
+		knobController.UpdateHasSettled = stageTimer.Wrap("settle", knobController.UpdateHasSettled)
+		knobController.WriteServoCommand = stageTimer.Wrap("servo", knobController.WriteServoCommand)
+	#
+#
+
+def CountUpdates(knobSuite: KnobSuite, maximumTicks = None):
+	"""
+	Wraps every controller's Update so the number of control ticks can be counted,
+	returns the list holding the count
+
+	maximumTicks (optional) : raise TickBudgetExceeded once this many ticks have run
+	"""
+
+	updateCount = [0]
+
+	for knobController in knobSuite.knobs:
+		def CountedUpdate(*args, update = knobController.Update, **kwargs):
+			updateCount[0] += 1
+			if (maximumTicks is not None) and (updateCount[0] > maximumTicks):
+				raise TickBudgetExceeded()
+			#
+			return update(*args, **kwargs)
+		#
+		knobController.Update = CountedUpdate
+	#
+
+	return updateCount
+#
+
+def GetMoves(numberOfKnobs, numberOfMoves):
+	"""
+	Returns a repeatable list of setpoint lists that send every knob across most of its
+	range, knobs are staggered so they don't all settle at the same time
+	"""
+
+	targets = [40, 215, 90, 165, 20, 235]
+
+	moves = []
+	for moveNumber in range(0, numberOfMoves):
+		setpoints = [targets[(moveNumber + number) % len(targets)] for number in range(0, numberOfKnobs)]
+		moves.append(setpoints)
+	#
+
+	return moves
+#
+
+def CreateSuite(numberOfKnobs, settlingTime, seed = 0):
+	"""
+	Creates a KnobSuite running on simulated hardware
+	"""
+
+	hardware = SimulatedHardware(max(numberOfKnobs, 3), seed = seed)
+	knobSuite = KnobSuite(numberOfKnobs, settlingTime = settlingTime, printDebugValues = False,
+		**hardware.GetControllerKwargs())
+
+	return knobSuite
+#
+
+def RunMoves(knobSuite: KnobSuite, moves, printDebugValues):
+	"""
+	Runs the moves, any debug output is captured instead of printed so the cost of
+	formatting it is measured without flooding the terminal. Returns False if the tick
+	budget ran out before every move settled
+	"""
+
+	with contextlib.redirect_stdout(io.StringIO()):
+		try:
+			for setpoints in moves:
+				knobSuite(setpoints, printDebugValues = printDebugValues)
+			#
+		except TickBudgetExceeded:
+			return False
+		#
+	#
+
+	return True
+#
+
+def BenchmarkCase(numberOfKnobs, settlingTime, printDebugValues, numberOfMoves = 3,
+		ticksPerKnob = 5000):
+	"""
+	Benchmarks one configuration, returns a dictionary of results
+
+	ticksPerKnob : tick budget for each knob, runs that haven't settled by then are cut
+		short (and reported as not completed)
+	"""
+
+	moves = GetMoves(numberOfKnobs, numberOfMoves)
+	maximumTicks = ticksPerKnob*numberOfKnobs
+
+	# --- Throughput and Stage Times ---
+	knobSuite = CreateSuite(numberOfKnobs, settlingTime)
+	stageTimer = StageTimer()
+	InstrumentKnobSuite(knobSuite, stageTimer)
+	updateCount = CountUpdates(knobSuite, maximumTicks)
+
+	startTime = time.perf_counter()
+	completed = RunMoves(knobSuite, moves, printDebugValues)
+	elapsedTime = time.perf_counter() - startTime
+
+	numberOfTicks = updateCount[0]
+
+	# --- Uninstrumented Throughput ---
+	# The instrumentation has overhead of its own, so ticks per second are measured again
+	# on a clean suite
+	knobSuite = CreateSuite(numberOfKnobs, settlingTime)
+	cleanCount = CountUpdates(knobSuite, maximumTicks)
+
+	startTime = time.perf_counter()
+	RunMoves(knobSuite, moves, printDebugValues)
+	cleanElapsedTime = time.perf_counter() - startTime
+
+	ticksPerSecond = cleanCount[0]/cleanElapsedTime
+
+	# --- Memory ---
+	knobSuite = CreateSuite(numberOfKnobs, settlingTime)
+	memoryCount = CountUpdates(knobSuite, maximumTicks)
+
+	tracemalloc.start()
+	startingBlocks = sys.getallocatedblocks()
+	RunMoves(knobSuite, moves, printDebugValues)
+	endingBlocks = sys.getallocatedblocks()
+	currentMemory, peakMemory = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	# --- Results ---
+	results = dict()
+	results["numberOfKnobs"] = numberOfKnobs
+	results["settlingTime"] = settlingTime
+	results["printDebugValues"] = printDebugValues
+	results["completed"] = completed
+	results["ticks"] = numberOfTicks
+	results["ticksPerSecond"] = ticksPerSecond
+	results["suiteCyclesPerSecond"] = ticksPerSecond/numberOfKnobs
+	results["stageMicroseconds"] = {stage: 1e6*stageTimer.totals[stage]/max(numberOfTicks, 1) for stage in STAGES}
+	results["stageCalls"] = dict(stageTimer.counts)
+	results["instrumentedSeconds"] = elapsedTime
+	results["retainedBlocksPerTick"] = (endingBlocks - startingBlocks)/max(memoryCount[0], 1)
+	results["peakMemoryBytes"] = peakMemory
+
+	return results
+#
+
+def GetCommit():
+	"""
+	Returns the current git commit so results can be compared across commits
+	"""
+
+	try:
+		output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True)
+		return output.stdout.strip()
+	except OSError:
+		return ""
+	#
+#
+
+def RunBenchmark(knobCounts, settlingTimes, debugSettings, numberOfMoves = 3):
+	"""
+	Runs every combination of the parameters, returns the list of results
+	"""
+
+	allResults: List[dict] = []
+
+	for numberOfKnobs in knobCounts:
+		for settlingTime in settlingTimes:
+			for printDebugValues in debugSettings:
+				results = BenchmarkCase(numberOfKnobs, settlingTime, printDebugValues, numberOfMoves)
+				allResults.append(results)
+
+				print(f"Knobs: {numberOfKnobs:2} | Settling: {settlingTime:4.2f} | Debug: {printDebugValues:1} |" \
+					+ f" Done: {results['completed']:1} |" \
+					+ f" Ticks/s: {results['ticksPerSecond']:8.0f} |" \
+					+ f" Peak: {results['peakMemoryBytes']/1024:7.1f} KiB |" \
+					+ " ".join(f" {stage}: {results['stageMicroseconds'][stage]:5.1f}" for stage in STAGES) \
+					+ " (µs/tick)"
+				)
+			#
+		#
+	#
+
+	return allResults
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	# --- Benchmark Parameters ---
+	knobCounts = [1, 2, 4, 8, 16]
+	settlingTimes = [0.25, 1.0]
+	debugSettings = [False, True]
+
+	# --- Running Benchmark ---
+	allResults = RunBenchmark(knobCounts, settlingTimes, debugSettings)
+
+	# --- Saving Results ---
+	currentTime = time.localtime()
+	currentTimeString = time.strftime("%Y_%m_%d_%H_%M_%S", currentTime)
+
+	resultsDictionary = dict()
+	resultsDictionary["commit"] = GetCommit()
+	resultsDictionary["time"] = currentTimeString
+	resultsDictionary["python"] = sys.version.split()[0]
+	resultsDictionary["results"] = allResults
+
+	resultsFilename = "BenchmarkResults_" + currentTimeString + ".json"
+	with open(resultsFilename, 'w') as jsonFile:
+		json.dump(resultsDictionary, jsonFile, indent = 1)
+	#
+
+	print(f"Benchmark Results Saved To: {resultsFilename}")
+#
@@ -1,15 +1,17 @@
 # ----- Imports -----
 # Utility
 import time
-
-# Qwiic
-import qwiic_serlcd
-import qwiic_tmp102
+from concurrent.futures import ThreadPoolExecutor
 
 # My Code
 from JoystickInterface import JoystickInterface
 from SlidingNumberSelector import SlidingNumberSelector
 from KnobSuite import KnobSuite
+from LazyImport import LazyModule
+
+# Qwiic (only imported once the devices are created)
+qwiic_serlcd = LazyModule("qwiic_serlcd")
+qwiic_tmp102 = LazyModule("qwiic_tmp102")
 
 # ----- Class -----
 class DemoStateMachine:
@@ -32,30 +34,43 @@ class DemoStateMachine:
         # Which knob is currently selected in the move state
         self.selectedKnob = 0
 
+        # Where the knobs save their state between runs
+        self.knobStateFile = "KnobState.json"
+
         # --- Objects ---
+        # Devices are independent of each other so they are brought up at the same time.
+        # The UI only needs the LCD, joystick, and temperature sensor, the knobs keep
+        # initializing in the background until the first move needs them
+        self.startupTimes = dict()
+        self.startupBeginTime = time.monotonic()
+
+        startupPool = ThreadPoolExecutor(max_workers = 4, thread_name_prefix = "Startup")
+
         # - KnobSuite -
-        self.knobSuite = KnobSuite(2)
+        self.knobSuite = None
+        self.knobSuiteFuture = startupPool.submit(self.TimeStartup, "knobs", KnobSuite, 2,
+            stateFile = self.knobStateFile)
+        self.knobSuiteFuture.add_done_callback(self.ReportKnobStartup)
 
         # - Joystick -
-        self.joystick = JoystickInterface()
+        joystickFuture = startupPool.submit(self.TimeStartup, "joystick", JoystickInterface)
 
         # - LCD -
-        self.lcd = qwiic_serlcd.QwiicSerlcd()
+        lcdFuture = startupPool.submit(self.TimeStartup, "lcd", self.StartLcd)
 
-        self.lcd.setBacklight(255, 255, 255) # Set backlight to bright white
-        self.lcd.setContrast(5) # set contrast. Lower to 0 for higher contrast.
-        self.lcd.clearScreen() # clear the screen - this moves the cursor to the home position as well
-
-        time.sleep(2) # give a sec for system messages to complete
-        
-        self.lcd.print("Hello!")
+        # - Temperature Sensor -
+        tempSensorFuture = startupPool.submit(self.TimeStartup, "temperature", self.StartTempSensor)
 
-        time.sleep(1) # Wait so the user can see the greeting
+        # Let the pool clean itself up once the knobs are done
+        startupPool.shutdown(wait = False)
 
-        # - Temperature Sensor -
-        self.tempSensor = qwiic_tmp102.QwiicTmp102Sensor()
+        # - Wait for the UI Devices -
+        self.lcd = lcdFuture.result()
+        self.joystick = joystickFuture.result()
+        self.tempSensor = tempSensorFuture.result()
 
-        self.tempSensor.begin()
+        self.startupTimes["ui ready"] = time.monotonic() - self.startupBeginTime
+        self.PrintStartupTimes()
 
         # - Setpoint Selectors -
         minimumSetpoint = 5
@@ -65,6 +80,111 @@ class DemoStateMachine:
 
         # 
 
+    # --- Startup ---
+    def TimeStartup(self, name, function, *args, **kwargs):
+        """
+        Runs a device's startup function and records how long it took
+
+        name : name the time is recorded under in self.startupTimes
+        function : function that creates and returns the device
+        *args, **kwargs : arguments passed to function
+        """
+
+        startTime = time.monotonic()
+        device = function(*args, **kwargs)
+        self.startupTimes[name] = time.monotonic() - startTime
+
+        return device
+    # 
+
+    def WaitUntilReady(self, isReady, timeout = 2, pollInterval = 0.01):
+        """
+        Polls isReady until it returns True or timeout (in seconds) passes, returns the last
+        result. Used instead of fixed sleeps so startup only waits as long as it has to
+        """
+
+        deadline = time.monotonic() + timeout
+
+        ready = isReady()
+        while not ready and time.monotonic() < deadline:
+            time.sleep(pollInterval)
+            ready = isReady()
+        # 
+
+        return ready
+    # 
+
+    def StartLcd(self):
+        """
+        Creates and configures the LCD, returns it once it can accept text
+        """
+
+        lcd = qwiic_serlcd.QwiicSerlcd()
+
+        # Wait for the display to answer on the bus
+        if not self.WaitUntilReady(lambda: lcd.connected):
+            print("LCD did not respond during startup")
+        # 
+
+        # The settings below would otherwise show system messages ("Contrast set") over
+        # whatever is printed next, so there's nothing to wait for once they are off
+        lcd.disableSystemMessages()
+
+        lcd.setBacklight(255, 255, 255) # Set backlight to bright white
+        lcd.setContrast(5) # set contrast. Lower to 0 for higher contrast.
+        lcd.clearScreen() # clear the screen - this moves the cursor to the home position as well
+
+        lcd.print("Hello!")
+
+        return lcd
+    # 
+
+    def StartTempSensor(self):
+        """
+        Creates and starts the temperature sensor
+        """
+
+        tempSensor = qwiic_tmp102.QwiicTmp102Sensor()
+        tempSensor.begin()
+
+        return tempSensor
+    # 
+
+    def ReportKnobStartup(self, knobSuiteFuture):
+        """
+        Prints the knob startup time once the knobs finish initializing in the background
+        """
+
+        if knobSuiteFuture.exception() is None:
+            knobsReadyTime = time.monotonic() - self.startupBeginTime
+            print(f"Knobs Ready: {self.startupTimes['knobs']:5.2f} s | {knobsReadyTime:5.2f} s after startup began")
+        # 
+    # 
+
+    def PrintStartupTimes(self):
+        """
+        Prints how long each device took to start
+        """
+
+        print("Startup Times")
+        # Copied because the knobs may still be recording their time in the background
+        for name, seconds in list(self.startupTimes.items()):
+            print(f"* {name:12}: {seconds:5.2f} s")
+        # 
+    # 
+
+    def GetKnobSuite(self):
+        """
+        Returns the knob suite, waiting for it to finish initializing if it hasn't yet
+        """
+
+        if self.knobSuite is None:
+            self.knobSuite = self.knobSuiteFuture.result()
+        # 
+
+        return self.knobSuite
+    # 
+
     def Start(self):
         """
         Command that begins the state machine, which also takes over program control because
@@ -72,21 +192,34 @@ class DemoStateMachine:
         """
         print("Starting State Machine")
 
-        while True:
-            # Process Current State
-            try:
-                # Iterate through the states
-                if self.state == "display":
-                    self.DisplayState()
-                elif self.state == "move":
-                    self.MoveState()
+        try:
+            while True:
+                # Process Current State
+                try:
+                    # Iterate through the states
+                    if self.state == "display":
+                        self.DisplayState()
+                    elif self.state == "move":
+                        self.MoveState()
+                    # 
+                except OSError:
+                    print("An OSError occured, ignoring it and moving on")
                 # 
-            except OSError:
-                print("An OSError occured, ignoring it and moving on")
+
+                # Wait a little bit between updates
+                time.sleep(self.updateTime)
+            # 
+        finally:
+            # Clean shutdown, save where the knobs are so the next start is instant. Only
+            # a suite that started can be closed, otherwise the startup error would hide
+            # the one that stopped the state machine
+            if (self.knobSuite is None) and (self.knobSuiteFuture.exception() is None):
+                self.knobSuite = self.knobSuiteFuture.result()
             # 
 
-            # Wait a little bit between updates
-            time.sleep(self.updateTime)
+            if self.knobSuite is not None:
+                self.knobSuite.Close()
+            # 
         # 
     # 
 
@@ -253,13 +386,29 @@ class DemoStateMachine:
                 setpoints = [setpoint0, setpoint1]
                 print(f"Moving to {setpoints}")
                 
-                self.knobSuite(setpoints)
+                knobSuite = self.GetKnobSuite()
+
+                # Pressing select again after a fault is how the user retries
+                knobSuite.ClearFaults()
+                knobSuite(setpoints)
                 
                 # Clearing Bottom Line (By Writing to a Whole Row)
                 self.lcd.setCursor(0,2)
                 self.lcd.print(f"{'':20}")
 
-                print(f"Move Complete")
+                # Faulted knobs stopped where they are, say so instead of staying quiet
+                faults = knobSuite.GetFaults()
+                faultedKnobs = [number for number, fault in enumerate(faults) if fault is not None]
+                if faultedKnobs:
+                    for number in faultedKnobs:
+                        print(f"Knob {number} Faulted: {faults[number]}")
+                    # 
+
+                    self.lcd.setCursor(0,2)
+                    self.lcd.print(f"{'Fault: Knob ' + ', '.join(str(number) for number in faultedKnobs):20}")
+                else:
+                    print(f"Move Complete")
+                # 
             # 
             
             # - Reset for Next Loop -
@@ -0,0 +1,181 @@
+# ----- Imports -----
+# Utility
+import json
+
+# Reability
+from typing import Dict
+
+# ----- Global Values ----
+# - Servo Characteristics -
+# Measured at the servo's output shaft, so they don't depend on the gearbox. Chosen so the
+# 2:1 gearbox in CAD/ServoPID.json reproduces SimulatedPlant's defaults (1.5 counts/s per
+# command unit, 40 counts/s at most)
+SERVO_DEGREES_PER_SECOND_PER_COMMAND = 1.5*2*300/255
+SERVO_MAXIMUM_DEGREES_PER_SECOND = 40*2*300/255
+
+# - Potentiometer Characteristics -
+# Rotation (degrees) of the B500K potentiometer between its end stops
+POTENTIOMETER_TRAVEL = 300
+
+# Potentiometer speed (counts per second) the knobs should be moving at when they reach
+# the end stops, KnobController's default boundarySpeedMagnitude on the 2:1 gearbox
+BOUNDARY_POTENTIOMETER_SPEED = 4*1.5
+
+# ----- Class -----
+class GearConfiguration:
+	"""
+	Describes the gearbox between a servo and its potentiometer, as set in the OpenSCAD
+	customizer file the gears were printed from (CAD/ServoPID.json), and converts it into
+	the constants the simulated plant and KnobController need
+	"""
+
+	def __init__(self, fileName, parameterSetName = "New set 1",
+			potentiometerTravel = POTENTIOMETER_TRAVEL, knobTravel = None):
+		"""
+		Loads a parameter set and derives the transmission ratio and travel limits
+
+		fileName : OpenSCAD customizer JSON file (e.g. CAD/ServoPID.json)
+		parameterSetName (optional) : parameter set to use, the first set in the file is
+			used if None
+		potentiometerTravel : rotation (degrees) of the potentiometer between its end stops
+		knobTravel (optional) : rotation (degrees) of the potentiometer the knob is allowed
+			to use, centered in the potentiometer's range. The whole range is used if not
+			provided
+		"""
+
+		self.parameters = LoadParameterSet(fileName, parameterSetName)
+
+		# - Gear Train -
+		self.motorGearToothCount = int(self.parameters["motorGearToothCount"])
+		self.potentiometerGearMultiplier = self.parameters["potentiometerGearMultiplier"]
+		# Same calculation as ServoPID.scad
+		self.potentiometerGearToothCount = self.potentiometerGearMultiplier*self.motorGearToothCount
+
+		# Potentiometer degrees per servo degree
+		self.transmissionRatio = self.motorGearToothCount/self.potentiometerGearToothCount
+
+		# - Travel -
+		self.potentiometerTravel = potentiometerTravel
+		if knobTravel is None:
+			knobTravel = potentiometerTravel
+		#
+		self.knobTravel = min(knobTravel, potentiometerTravel)
+
+		# 8 bit ADC counts per degree the servo turns
+		self.countsPerServoDegree = 255*self.transmissionRatio/self.potentiometerTravel
+
+		# Servo rotation needed to cross the knob's whole range
+		self.servoTravel = self.knobTravel/self.transmissionRatio
+
+		# ADC values at the ends of the knob's range
+		unusedCounts = 255*(1 - self.knobTravel/self.potentiometerTravel)
+		self.minimumPotentiometerValue = int(round(unusedCounts/2))
+		self.maximumPotentiometerValue = int(round(255 - unusedCounts/2))
+	#
+
+	def GetPotentiometerSpeedGain(self):
+		"""
+		Returns the potentiometer speed (counts per second) per unit of servo command
+		"""
+
+		return SERVO_DEGREES_PER_SECOND_PER_COMMAND*self.countsPerServoDegree
+	#
+
+	def GetPlantKwargs(self):
+		"""
+		Returns the named arguments that make SimulatedPlant (or SimulatedHardware) model
+		this gearbox
+		"""
+
+		plantKwargs = dict()
+		plantKwargs["speedGain"] = self.GetPotentiometerSpeedGain()
+		plantKwargs["maximumSpeed"] = SERVO_MAXIMUM_DEGREES_PER_SECOND*self.countsPerServoDegree
+		plantKwargs["minimumPosition"] = 0
+		plantKwargs["maximumPosition"] = 255
+
+		return plantKwargs
+	#
+
+	def GetControllerKwargs(self, boundaryPotentiometerSpeed = BOUNDARY_POTENTIOMETER_SPEED):
+		"""
+		Returns the named arguments that set KnobController's (or KnobSuite's) speed and
+		travel limits for this gearbox
+
+		boundaryPotentiometerSpeed : potentiometer speed (counts per second) the knob should
+			slow to at the edges of its range
+		"""
+
+		controllerKwargs: Dict[str, float] = dict()
+
+		# Commands past the point the servo saturates only wind up the PID
+		controllerKwargs["speedMagnitude"] = SERVO_MAXIMUM_DEGREES_PER_SECOND/SERVO_DEGREES_PER_SECOND_PER_COMMAND
+
+		# A finer gearbox needs a larger command for the same potentiometer speed
+		controllerKwargs["boundarySpeedMagnitude"] = boundaryPotentiometerSpeed/self.GetPotentiometerSpeedGain()
+
+		controllerKwargs["minimumPotentiometerValue"] = self.minimumPotentiometerValue
+		controllerKwargs["maximumPotentiometerValue"] = self.maximumPotentiometerValue
+
+		return controllerKwargs
+	#
+#
+
+# ----- Methods and Functions -----
+def ParseCustomizerValue(value):
+	"""
+	Converts a value saved by the OpenSCAD customizer (always a string) into the python
+	equivalent, e.g. "16" -> 16, "0.20000000000000001" -> 0.2, "[70, 47, 8]" -> [70, 47, 8],
+	"true" -> True. Values that aren't numbers, lists, or booleans are left as strings
+	"""
+
+	try:
+		return json.loads(value)
+	except ValueError:
+		return value
+	#
+#
+
+def LoadParameterSet(fileName, parameterSetName = "New set 1"):
+	"""
+	Returns one parameter set from an OpenSCAD customizer JSON file with its values parsed
+
+	fileName : customizer JSON file
+	parameterSetName (optional) : parameter set to return, the first set in the file is
+		returned if None
+	"""
+
+	with open(fileName) as jsonFile:
+		customizerDictionary = json.load(jsonFile)
+	#
+
+	parameterSets = customizerDictionary["parameterSets"]
+	if parameterSetName is None:
+		parameterSetName = next(iter(parameterSets))
+	#
+	if parameterSetName not in parameterSets:
+		raise KeyError(f"{fileName} has no parameter set named '{parameterSetName}', options are {list(parameterSets.keys())}")
+	#
+
+	return {name: ParseCustomizerValue(value) for name, value in parameterSets[parameterSetName].items()}
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	gearConfiguration = GearConfiguration("../../CAD/ServoPID.json")
+
+	print(f"Motor Gear: {gearConfiguration.motorGearToothCount} teeth | Potentiometer Gear: {gearConfiguration.potentiometerGearToothCount} teeth")
+	print(f"Transmission Ratio: {gearConfiguration.transmissionRatio} | Servo Travel: {gearConfiguration.servoTravel} degrees")
+	print(f"Plant: {gearConfiguration.GetPlantKwargs()}")
+	print(f"Controller: {gearConfiguration.GetControllerKwargs()}")
+
+	# --- Simulated Move With This Gearbox ---
+	from KnobSuite import KnobSuite
+	from SimulatedHardware import SimulatedHardware
+
+	hardware = SimulatedHardware(2, seed = 0, **gearConfiguration.GetPlantKwargs())
+	knobSuite = KnobSuite(2, printDebugValues = False, **hardware.GetControllerKwargs(),
+		**gearConfiguration.GetControllerKwargs())
+
+	knobSuite([50, 200], printDebugValues = False)
+	print(f"Logs: {knobSuite.GetLogs()}")
+#
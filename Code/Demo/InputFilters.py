@@ -11,13 +11,6 @@ from typing import List
 # For Control
 import time
 
-# For I2C
-import pi_servo_hat
-import smbus
-
-# For control systems
-from simple_pid import PID
-
 class MovingAverage:
 	"""
 	Uses a moving average to filter input data
@@ -1,7 +1,12 @@
 # ----- Imports -----
-import qwiic_joystick
 import time
 
+# My Code
+from LazyImport import LazyModule
+
+# Qwiic (only imported once the joystick is created)
+qwiic_joystick = LazyModule("qwiic_joystick")
+
 # ----- Class -----
 class JoystickInterface:
 	"""
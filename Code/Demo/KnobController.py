@@ -1,5 +1,6 @@
 # ----- Imports -----
 # Utility
+import json
 import numpy as np
 
 # Reability
@@ -8,15 +9,80 @@ from typing import List
 # For Control
 import time
 
-# For I2C
-import pi_servo_hat
-import smbus
+# My Code
+from InputFilters import MovingAverage
+from LazyImport import LazyModule
+
+# For I2C (only imported once a controller talks to the hardware)
+pi_servo_hat = LazyModule("pi_servo_hat")
+qwiic_i2c = LazyModule("qwiic_i2c")
+smbus = LazyModule("smbus")
 
 # For control systems
-from simple_pid import PID
+simple_pid = LazyModule("simple_pid")
 
-# My Code
-from InputFilters import MovingAverage
+# ----- Global Values ----
+# PCF8591 the first three knobs are wired to
+ADC_ADDRESS = 0x4a
+POT_0_CONTROL_BYTE = 0x40
+POT_1_CONTROL_BYTE = 0X42
+POT_2_CONTROL_BYTE = 0x41
+
+# Knobs past the first three are read from additional PCF8591s, four channels each
+EXTRA_ADC_ADDRESS = 0x4b
+EXTRA_ADC_CHANNELS = 4
+
+# Servo hat on each i2c bus, shared by every knob on that bus (see GetServoHat)
+servoHats = dict()
+
+# ----- Methods and Functions -----
+def GetServoHat(busNumber):
+	"""
+	Returns the servo hat on an i2c bus, opening it the first time the bus is used. Every
+	knob on a bus drives a channel of the same hat, so they share one
+	"""
+
+	if busNumber not in servoHats:
+		servoHats[busNumber] = pi_servo_hat.PiServoHat(i2c_driver = qwiic_i2c.getI2CDriver(iBus = busNumber))
+	# 
+
+	return servoHats[busNumber]
+#
+
+def LoadCalibration(fileName):
+	"""
+	Loads a calibration file (see AutoTune) and returns the named arguments it holds, so
+	they can be passed to KnobController or KnobSuite, e.g.
+	KnobSuite(2, **LoadCalibration("Calibration.json"))
+	"""
+
+	with open(fileName) as jsonFile:
+		calibrationDictionary = json.load(jsonFile)
+	# 
+
+	return calibrationDictionary["controller"]
+# 
+
+def GetAdcChannel(potentiometerNumber):
+	"""
+	Returns the (address, controlByte) pair used to read a potentiometer from its PCF8591
+	"""
+
+	if (potentiometerNumber == 0):
+		return ADC_ADDRESS, POT_0_CONTROL_BYTE
+	elif (potentiometerNumber == 1):
+		return ADC_ADDRESS, POT_1_CONTROL_BYTE
+	elif (potentiometerNumber == 2):
+		return ADC_ADDRESS, POT_2_CONTROL_BYTE
+	# 
+
+	# Additional ADCs, channels are used in order
+	extraNumber = potentiometerNumber - 3
+	address = EXTRA_ADC_ADDRESS + extraNumber//EXTRA_ADC_CHANNELS
+	controlByte = 0x40 + extraNumber % EXTRA_ADC_CHANNELS
+
+	return address, controlByte
+# 
 
 # ----- Class -----
 class KnobController:
@@ -30,6 +96,11 @@ class KnobController:
 			  speedMagnitude = 30, boundarySpeedMagnitude = 4,
 			  boundaryOuterThreshold = 20, boundaryInnerThreshold = 40,
 			  errorMagnitude = 1.1, settledErrorMagnitude = 5, settlingTime = 0.25,
+			  proportionalGain = 0.4, integralGain = 0.33, derivativeGain = 0.05,
+			  deadzoneCenter = 49, deadzoneSize = 4, backlashPreloadTime = 0, backlashPreloadSpeed = 10,
+			  stallTime = 1.0, stallSpeedMagnitude = 5, stallProgress = 2, stallReversalTime = 2.0,
+			  moveTimeLimit = None,
+			  busNumber = 1, warmState = None, i2cBus = None, servoHat = None, clock = time,
 			  printDebugValues = True):
 		"""
 		Creates an instance of the class
@@ -52,6 +123,43 @@ class KnobController:
 			susceptible to random sensor deviations)
 		settlingTime : time (in seconds) the system must stay within errorMagnitude before
 			tolerances can be relaxed to settledErrorMagnitude
+		proportionalGain : P gain of the position controller
+		integralGain : I gain of the position controller
+		derivativeGain : D gain of the position controller
+		deadzoneCenter : servo command the servo does not turn at
+		deadzoneSize : width of the band of servo commands around deadzoneCenter that don't
+			turn the servo (skipped over by ApplyDeadzone)
+		backlashPreloadTime : time (seconds) the servo takes to cross the gear backlash at
+			backlashPreloadSpeed, measured by BacklashIdentification. When the servo changes
+			direction it is driven at least that fast for this long to take up the slack.
+			0 turns compensation off
+		backlashPreloadSpeed : command magnitude (beyond the deadzone) used while taking up
+			the slack
+		stallTime : time (seconds) the servo can be driven at stallSpeedMagnitude or faster
+			without the knob moving stallProgress before the knob is considered stalled
+			(unpowered servo, slipping gears, disconnected potentiometer). None turns stall
+			detection off
+		stallSpeedMagnitude : command magnitude (beyond the deadzone) the knob is expected to
+			visibly move at, slower commands near the setpoint or the boundaries don't count
+			towards a stall
+		stallProgress : potentiometer counts the knob must move in the commanded direction
+			to count as making progress
+		stallReversalTime : extra time (seconds) allowed without progress after the servo
+			is driven the other way, the gears have to cross their backlash before the knob
+			moves. Should cover crossing the backlash at stallSpeedMagnitude, with or without
+			backlash compensation
+		moveTimeLimit (optional) : longest time (seconds) a move may take before the knob is
+			considered faulted, KnobSuite sets it from the predicted move time when it has a
+			move time surface
+		busNumber : i2c bus the potentiometer ADC and servo hat for this knob are connected to
+		warmState (optional) : state saved by GetWarmState during a previous run, if it still
+			matches the knob's position the controller resumes from it instead of priming
+			its filters
+		i2cBus (optional) : object with the smbus interface to use instead of opening the bus
+		servoHat (optional) : object with the PiServoHat interface to use instead of the
+			real servo hat (used with SimulatedHardware)
+		clock : object providing monotonic() and sleep(), the time module unless the
+			controller is being simulated
 		"""
 		
 		# --- Initializing ---
@@ -61,24 +169,55 @@ class KnobController:
 		self.hasSettled = False
 
 		# - Commuincation and Control Objects -
+		# Source of time for control and logging
+		self.clock = clock
+
 		# Initialize the i2c bus
-		self.i2cBus = smbus.SMBus(1)
+		self.busNumber = int(busNumber)
+		if i2cBus is None:
+			i2cBus = smbus.SMBus(self.busNumber)
+		# 
+		self.i2cBus = i2cBus
 		
-		# Initialize Servo Hat
-		self.servoHat = pi_servo_hat.PiServoHat()
+		# Initialize Servo Hat (on the same bus as the ADC)
+		if servoHat is None:
+			servoHat = GetServoHat(self.busNumber)
+		# 
+		self.servoHat = servoHat
 		# Soft rest the system, preparing it for use
 		self.servoHat.restart()
 		# Wait a little bit
-		time.sleep(0.001)
+		self.clock.sleep(0.001)
 		# Tell the motor that it should start in the off position
-		self.servoHat.move_servo_position(self.knobNumber, 180)
+		self.servoCommand = 180
+		self.WriteServoCommand()
 
 		# --- Creating Control Range ---
 		# - Defining Operational Range -
-		self.deadzoneSize = 4
-		self.deadzoneCenter = 49
+		self.deadzoneSize = deadzoneSize
+		self.deadzoneCenter = deadzoneCenter
 		self.speedMagnitude = speedMagnitude
 
+		# - Backlash Compensation -
+		self.backlashPreloadTime = backlashPreloadTime
+		self.backlashPreloadSpeed = backlashPreloadSpeed
+		# Direction the servo last turned (1 or -1, 0 if unknown), the slack is on that side
+		self.lastDirection = 0
+		self.preloadDirection = 0
+		self.preloadStartTime = 0
+		self.preloadEndTime = 0
+
+		# - Fault Detection -
+		self.stallTime = stallTime
+		self.stallSpeedMagnitude = stallSpeedMagnitude
+		self.stallProgress = stallProgress
+		self.stallReversalTime = stallReversalTime
+		self.moveTimeLimit = moveTimeLimit
+		# A faulted knob stays stopped until ClearFault is called
+		self.faulted = False
+		self.faultReason = None
+		self.ResetProgressMonitor(0)
+
 		# Set the output bounds
 		deadzoneLowerBound = self.deadzoneCenter - self.deadzoneSize/2
 		self.pidLowerBound = deadzoneLowerBound - self.speedMagnitude
@@ -87,7 +226,9 @@ class KnobController:
 		# - Defining PID Controller -
 		# Create the pid controller
 		startingValue = np.mean([self.pidLowerBound, self.pidUpperBound])
-		self.pid = PID(0.4, 0.33, 0.05, starting_output=startingValue)
+		self.pid = simple_pid.PID(proportionalGain, integralGain, derivativeGain,
+			starting_output=startingValue,
+			time_fn=self.clock.monotonic)
 
 		# Setting the sampling time
 		self.samplingTime = 0.005
@@ -136,6 +277,9 @@ class KnobController:
 		# --- Creating Filters ---
 		filterSize = 15
 
+		# Samples are read from the bus unless an acquisition thread provides a buffer
+		self.sampleBuffer = None
+
 		# Potentiometer Filter
 		self.potentiometerFilter = MovingAverage(filterSize)
 		
@@ -144,10 +288,12 @@ class KnobController:
 		settlingWindowSize = self.settlingTime//self.samplingTime
 		self.settlingFilter = MovingAverage(settlingWindowSize)
 
-		# Populate filters
-		for i in range(0, min(filterSize, settlingWindowSize)):
-			value = self.ReadPotentiometerValue(self.knobNumber)
-			self.UpdateHasSettled(value)
+		# Populate filters (unless they can be restored from the last run)
+		if (warmState is None) or (not self.RestoreWarmState(warmState, printDebugValues)):
+			for i in range(0, min(filterSize, settlingWindowSize)):
+				value = self.ReadPotentiometerValue(self.knobNumber)
+				self.UpdateHasSettled(value)
+			# 
 		# 
 
 		# --- Stats ---
@@ -166,12 +312,86 @@ class KnobController:
 		
 		# --- Creating First Log ---
 		self.startSetpoint = self.lastSetpoint
-		self.startTime = time.monotonic()
-		self.endTime = time.monotonic()
+		self.startTime = self.clock.monotonic()
+		self.endTime = self.clock.monotonic()
 		
 		self.GenerateLog()
 	# 
 
+	# --- Warm State ---
+	def GetWarmState(self):
+		"""
+		Returns the parts of the controller's state that are expensive to relearn (filter
+		contents, setpoints, last position, and PID integrator) as a JSON friendly dict
+		"""
+
+		warmState = dict()
+		warmState["knobNumber"] = self.knobNumber
+		warmState["position"] = float(self.lastPotentiometerValue)
+		warmState["setpoint"] = float(self.pid.setpoint)
+		warmState["lastSetpoint"] = float(self.lastSetpoint)
+		warmState["hasSettled"] = float(self.hasSettled)
+		warmState["currentErrorMagnitude"] = float(self.currentErrorMagnitude)
+		warmState["potentiometerFilter"] = self.potentiometerFilter.window.tolist()
+		warmState["settlingFilter"] = self.settlingFilter.window.tolist()
+		warmState["pidIntegral"] = float(self.pid._integral)
+		warmState["lastDirection"] = self.lastDirection
+
+		return warmState
+	# 
+
+	def RestoreWarmState(self, warmState, printDebugValues = True):
+		"""
+		Restores state saved by GetWarmState. Returns True if the state was restored.
+
+		A single sample is read to make sure the knob hasn't been moved since the state was
+		saved (by hand or by another program), if it has the state is ignored and False is
+		returned so the filters can be primed normally
+
+		warmState : dict created by GetWarmState
+		"""
+
+		# - Check the State Belongs to this Knob -
+		sameKnob = warmState.get("knobNumber") == self.knobNumber
+		sameFilters = (len(warmState.get("potentiometerFilter", [])) == len(self.potentiometerFilter.window)) \
+			and (len(warmState.get("settlingFilter", [])) == len(self.settlingFilter.window))
+
+		if not (sameKnob and sameFilters):
+			return False
+		# 
+
+		# - Check the Knob Hasn't Moved -
+		rawValue = self.ReadRawPotentiometerValue(self.knobNumber)
+		if abs(rawValue - warmState["position"]) > self.settledErrorMagnitude:
+			if printDebugValues:
+				print(f"Knob {self.knobNumber} moved since its state was saved ({warmState['position']:5.1f} -> {rawValue}), not restoring it")
+			# 
+			return False
+		# 
+
+		# - Restore -
+		self.potentiometerFilter.window = np.array(warmState["potentiometerFilter"])
+		self.settlingFilter.window = np.array(warmState["settlingFilter"])
+		self.lastPotentiometerValue = warmState["position"]
+
+		self.pid.setpoint = warmState["setpoint"]
+		self.lastSetpoint = warmState["lastSetpoint"]
+		self.hasSettled = warmState["hasSettled"]
+		self.currentErrorMagnitude = warmState["currentErrorMagnitude"]
+
+		# simple_pid has no public way to set the integrator while in automatic mode
+		self.pid._integral = warmState["pidIntegral"]
+
+		# Older state files don't know which side of the gears the slack is on
+		self.lastDirection = warmState.get("lastDirection", 0)
+
+		if printDebugValues:
+			print(f"Knob {self.knobNumber} restored at {self.lastPotentiometerValue:5.1f} (setpoint {self.pid.setpoint})")
+		# 
+
+		return True
+	# 
+
 	# --- Potentiometer ---
 	def ReadRawPotentiometerValue(self, potentiometerNumber):
 		"""
@@ -179,48 +399,62 @@ class KnobController:
 		This function assumes the ADC is the PCF8591: https://www.nxp.com/docs/en/data-sheet/PCF8591.pdf
 		"""
 		# - Control Values -
-		ADC_ADDRESS = 0x4a
-		POT_0_CONTROL_BYTE = 0x40
-		POT_1_CONTROL_BYTE = 0X42
-		POT_2_CONTROL_BYTE = 0x41
-		
-		controlByte = 0x20 # This value should get overwritten so it doesn't matter much what it is
-
-		if (potentiometerNumber == 0):
-			controlByte = POT_0_CONTROL_BYTE
-		elif (potentiometerNumber == 1):
-			controlByte = POT_1_CONTROL_BYTE
-		elif (potentiometerNumber == 2):
-			controlByte = POT_2_CONTROL_BYTE
-		# 
+		adcAddress, controlByte = GetAdcChannel(potentiometerNumber)
 				
 		# Short Delay
 		busSettlingDelay = 0.0001
 
 		# Read the value from the ADC
-		self.i2cBus.write_byte(ADC_ADDRESS, controlByte)
+		self.i2cBus.write_byte(adcAddress, controlByte)
 
-		time.sleep(busSettlingDelay)
+		self.clock.sleep(busSettlingDelay)
 
 		# The PCF8591 sends the previously converted value while calculating the new one
-		previousValue = self.i2cBus.read_byte(ADC_ADDRESS)
+		previousValue = self.i2cBus.read_byte(adcAddress)
 
-		time.sleep(busSettlingDelay)
+		self.clock.sleep(busSettlingDelay)
 		
 		# Wait a little bit then read the next value
-		value = self.i2cBus.read_byte(ADC_ADDRESS)
+		value = self.i2cBus.read_byte(adcAddress)
 
 		return value
 	#
 
-	def ReadPotentiometerValue(self, potentiometerNumber):
+	def ReadPotentiometerValue(self, potentiometerNumber, rawValue = None):
 		"""
 		Reads and filters the potentiometer value
+
+		rawValue (optional) : value that has already been read from the ADC, if provided
+			the bus is not touched
+
+		If an acquisition thread has attached a sample buffer (see AdcAcquisition) the
+		average of all samples taken since the last call is used instead of reading the bus
 		"""
-		rawValue = self.ReadRawPotentiometerValue(potentiometerNumber)
+		# Use the newest samples from the acquisition thread if there is one. The thread
+		# owns the ADC, writing a control byte here could switch the channel it is
+		# converting, so the bus is never used as a fallback
+		if (rawValue is None) and (self.sampleBuffer is not None):
+			sample = self.sampleBuffer.ReadNew()
+			if sample is None:
+				raise RuntimeError(f"Knob {self.knobNumber} has no samples from the acquisition thread yet")
+			# 
+			sampleTime, rawValue = sample
+		# 
+
+		if rawValue is None:
+			rawValue = self.ReadRawPotentiometerValue(potentiometerNumber)
+		# 
 		return self.potentiometerFilter(rawValue)
 	# 
 
+	# --- Servo ---
+	def WriteServoCommand(self):
+		"""
+		Sends the most recent servo command to the servo hat
+		"""
+		self.servoHat.move_servo_position(self.knobNumber, self.servoCommand)
+	# 
+
 	# --- PID Output Modifications ---
 	def ApplyDeadzone(self, pidRecommendation):
 		"""
@@ -237,6 +471,57 @@ class KnobController:
 		return recommendedSpeed
 	# 
 
+	def CompensateBacklash(self, recommendedSpeed):
+		"""
+		When the servo reverses, the gears have to cross their backlash before the
+		potentiometer moves, which the PID only sees as a knob that isn't responding.
+		This drives the servo at least backlashPreloadSpeed for backlashPreloadTime after
+		every reversal so the slack is taken up quickly, then hands control back to the PID
+		"""
+		if self.backlashPreloadTime <= 0:
+			return recommendedSpeed
+		# 
+
+		# Direction the servo is being asked to turn
+		if recommendedSpeed > self.deadzoneCenter + 0.5*self.deadzoneSize:
+			direction = 1
+		elif recommendedSpeed < self.deadzoneCenter - 0.5*self.deadzoneSize:
+			direction = -1
+		else:
+			return recommendedSpeed
+		# 
+
+		currentTime = self.clock.monotonic()
+
+		# - Start Taking Up Slack on a Reversal -
+		if (self.lastDirection != 0) and (direction != self.lastDirection):
+			if currentTime < self.preloadEndTime:
+				# Reversed part way through a preload, only the slack crossed so far needs undoing
+				preloadTime = currentTime - self.preloadStartTime
+			else:
+				preloadTime = self.backlashPreloadTime
+			# 
+
+			self.preloadDirection = direction
+			self.preloadStartTime = currentTime
+			self.preloadEndTime = currentTime + preloadTime
+		# 
+		self.lastDirection = direction
+
+		# - Drive Through the Slack -
+		if (currentTime < self.preloadEndTime) and (direction == self.preloadDirection):
+			if direction > 0:
+				preloadSpeed = self.deadzoneCenter + 0.5*self.deadzoneSize + self.backlashPreloadSpeed
+				recommendedSpeed = max(recommendedSpeed, preloadSpeed)
+			else:
+				preloadSpeed = self.deadzoneCenter - 0.5*self.deadzoneSize - self.backlashPreloadSpeed
+				recommendedSpeed = min(recommendedSpeed, preloadSpeed)
+			# 
+		# 
+
+		return recommendedSpeed
+	# 
+
 	def ReducePidBoundsAtExtremes(self, recommendedSpeed, potentiometerValue):
 		"""
 		Limits the values that the PID controller is allowed to access if the system is
@@ -296,6 +581,115 @@ class KnobController:
 		# 
 	# 
 
+	# --- Fault Detection ---
+	def ResetProgressMonitor(self, potentiometerValue):
+		"""
+		Starts watching for progress from potentiometerValue, called at the start of every
+		move
+		"""
+
+		self.progressPosition = potentiometerValue
+		# Which side of the backlash the servo ended the last move on isn't known, so the
+		# first direction it turns counts as a reversal
+		self.progressDirection = 0
+		self.stalledTime = 0
+		self.lastProgressCheckTime = self.clock.monotonic()
+	# 
+
+	def MonitorProgress(self, potentiometerValue):
+		"""
+		Compares the commanded speed with how the knob is actually moving. Returns a
+		description of the fault if the knob has been driven firmly (at least
+		stallSpeedMagnitude past the deadzone) for stallTime without moving stallProgress
+		counts in that direction (plus stallReversalTime after a reversal), or if the move
+		has taken longer than moveTimeLimit. Returns None otherwise
+		"""
+
+		currentTime = self.clock.monotonic()
+		elapsedTime = currentTime - self.lastProgressCheckTime
+		self.lastProgressCheckTime = currentTime
+
+		# - Overall Time Limit -
+		if (self.moveTimeLimit is not None) and (currentTime - self.startTime > self.moveTimeLimit):
+			return f"move took longer than {self.moveTimeLimit:.1f} s"
+		# 
+
+		if self.stallTime is None:
+			return None
+		# 
+
+		# - Is the Servo Turning? -
+		commandOffset = self.servoCommand - self.deadzoneCenter
+		if (self.servoCommand == 180) or (abs(commandOffset) <= 0.5*self.deadzoneSize):
+			return None
+		# 
+		direction = 1 if commandOffset > 0 else -1
+
+		# - Did the Servo Reverse? -
+		# The knob stays still while the gears cross the backlash, a healthy knob that is
+		# driven slowly the other way can take longer than stallTime to get through it.
+		# Slow commands count too, they move the servo to the other side of the gap
+		if direction != self.progressDirection:
+			self.progressPosition = potentiometerValue
+			self.progressDirection = direction
+			self.stalledTime = -max(self.stallReversalTime, self.backlashPreloadTime)
+			return None
+		# 
+
+		# - Is the Servo Being Driven Firmly? -
+		if abs(commandOffset) - 0.5*self.deadzoneSize < self.stallSpeedMagnitude:
+			return None
+		# 
+
+		# - Is the Knob Following? -
+		madeProgress = direction*(potentiometerValue - self.progressPosition) >= self.stallProgress
+		if madeProgress:
+			self.progressPosition = potentiometerValue
+			self.stalledTime = 0
+			return None
+		# 
+
+		self.stalledTime += elapsedTime
+		if self.stalledTime > self.stallTime:
+			return f"stalled at {potentiometerValue:5.1f} after {self.stalledTime:.2f} s of commanded motion"
+		# 
+
+		return None
+	# 
+
+	def Fault(self, reason, writeServo = True):
+		"""
+		Stops the servo and marks the knob faulted, the move is logged (with the reason) and
+		the knob ignores setpoints until ClearFault is called
+		"""
+
+		self.servoCommand = 180
+		if writeServo:
+			self.WriteServoCommand()
+		# 
+
+		self.faulted = True
+		self.faultReason = reason
+
+		self.endTime = self.clock.monotonic()
+		self.log = self.GenerateLog()
+
+		# The move didn't finish, the next one starts from scratch
+		self.updated = False
+		self.terminatedCleanly = False
+
+		print(f"Knob {self.knobNumber} faulted moving to {self.pid.setpoint}: {reason}")
+	# 
+
+	def ClearFault(self):
+		"""
+		Lets a faulted knob move again (once the problem has been fixed)
+		"""
+
+		self.faulted = False
+		self.faultReason = None
+	# 
+
 	# --- Settling ---
 
 	def GetHasSettled(self):
@@ -378,6 +772,7 @@ class KnobController:
 		currentLog["overshoot"] = self.overshoot
 		currentLog["minSpeed"] = self.minSpeed
 		currentLog["maxSpeed"] = self.maxSpeed
+		currentLog["fault"] = self.faultReason
 		self.log = currentLog
 
 		return currentLog
@@ -403,20 +798,32 @@ class KnobController:
 		self.terminatedCleanly = False
 	# 
 	
-	def __call__(self, setpoint, sequential = False, printDebugValues = True):
+	def __call__(self, setpoint, sequential = False, printDebugValues = True,
+			rawPotentiometerValue = None, writeServo = True):
 		"""
 		Move knob to next location
 
 		setpoint : next location to move to
 		sequential : if true, call will not exit until system has settled
 		printDebugValues : if true, prints debug values during operation
+		rawPotentiometerValue (optional) : sample already read from the ADC, only used in
+			parallel operation (see Update)
+		writeServo : if false the servo command is stored in self.servoCommand instead of
+			being sent, so the caller can send it with WriteServoCommand later
 		"""
 		# --- Determining State ---
+		# A faulted knob stays where it stopped
+		if self.faulted:
+			return
+		# 
+
 		# Does the system need re-initialized?
 		if (not self.updated):
-			print(f"Updating {self.knobNumber}")
+			if printDebugValues:
+				print(f"Updating {self.knobNumber}")
+			# 
 			# --- Preparing for Logging ---
-			self.startTime = time.monotonic()
+			self.startTime = self.clock.monotonic()
 			self.startSetpoint = self.GetLastSetpoint()
 
 			# --- Updating Controller Setpoint ---
@@ -446,7 +853,9 @@ class KnobController:
 
 			# Clamping Bounds
 			self.pid.output_limits = (clampedLowerBound, clampedUpperBound)
-			print(f"Clamped to: ({clampedLowerBound}, {clampedUpperBound})")
+			if printDebugValues:
+				print(f"Clamped to: ({clampedLowerBound}, {clampedUpperBound})")
+			# 
 
 			# Calling PID Loop to Apply Clamping
 			self.pid(self.lastPotentiometerValue)
@@ -460,6 +869,7 @@ class KnobController:
 
 			# Recording starting position so overshoot can be calculated
 			self.startingPosition = self.lastPotentiometerValue
+			self.ResetProgressMonitor(self.startingPosition)
 			
 			# System is rising if it is currently at a value below the setpoint
 			self.rising = (self.startingPosition < self.pid.setpoint)
@@ -484,9 +894,9 @@ class KnobController:
 		# --- Moving to New Location ---
 		if (sequential):
 			# For sequential operation
-			while (not self.GetHasSettled()):
-				self.Update()
-				time.sleep(self.samplingTime)
+			while (not self.GetHasSettled()) and (not self.faulted):
+				self.Update(printDebugValues = printDebugValues)
+				self.clock.sleep(self.samplingTime)
 			# 
 		else:
 			# Performing Parallel Operation
@@ -495,17 +905,26 @@ class KnobController:
 			# * it has not properly exited
 			if (not self.GetHasSettled or not self.terminatedCleanly):
 				# Increment by one time step
-				self.Update()
+				self.Update(printDebugValues = printDebugValues,
+					rawPotentiometerValue = rawPotentiometerValue, writeServo = writeServo)
 			# 
 		# 
 		
+		# A fault ends the move without settling
+		if self.faulted:
+			return
+		# 
+
 		# Is the system settled and has it officially exited yet?
 		if (self.GetHasSettled() and not self.terminatedCleanly):
 			# Time to stop
-			self.servoHat.move_servo_position(self.knobNumber, 180)
+			self.servoCommand = 180
+			if writeServo:
+				self.WriteServoCommand()
+			# 
 			
 			# Log Data
-			self.endTime = time.monotonic()
+			self.endTime = self.clock.monotonic()
 			self.lastSetpoint = self.pid.setpoint
 			self.log = self.GenerateLog()
 			
@@ -532,9 +951,13 @@ class KnobController:
 		# 
 	# 
 
-	def Update(self, printDebugValues = True):
+	def Update(self, printDebugValues = True, rawPotentiometerValue = None, writeServo = True):
 		"""
 		Updates the controller by one time step
+
+		rawPotentiometerValue (optional) : sample already read from the ADC, if not provided
+			the potentiometer is read from the bus
+		writeServo : if false the new command is only stored in self.servoCommand
 		"""
 		# --- Manage Looping Count ---
 		if (self.count > self.resetCountAt):
@@ -545,7 +968,7 @@ class KnobController:
 		
 		# --- Read Knob Position ---
 		# Read the current value of the knob
-		potentiometerValue = self.ReadPotentiometerValue(self.knobNumber)
+		potentiometerValue = self.ReadPotentiometerValue(self.knobNumber, rawPotentiometerValue)
 
 		# --- Calculate New Motor Speed ---
 		# Calculate new output speed
@@ -563,14 +986,27 @@ class KnobController:
 		# - Update Servo Speed -
 		if (not hasSettled):
 			# Update Speed
-			self.servoHat.move_servo_position(self.knobNumber, newSpeed)
+			self.servoCommand = self.CompensateBacklash(newSpeed)
 		else:
 			# Turn off Servo
-			self.servoHat.move_servo_position(self.knobNumber, 180)
+			self.servoCommand = 180
 			
 			# Relax error bounds
 			self.currentErrorMagnitude = self.settledErrorMagnitude
 		# 
+
+		# - Check the Knob is Responding -
+		if not hasSettled:
+			faultReason = self.MonitorProgress(potentiometerValue)
+			if faultReason is not None:
+				self.Fault(faultReason, writeServo)
+				return
+			# 
+		# 
+
+		if writeServo:
+			self.WriteServoCommand()
+		# 
 		
 		# --- Stats and Record Keeping - --
 
@@ -1,6 +1,8 @@
 # ----- Imports -----
 # Utility
+import json
 import numpy as np
+import os
 
 # Reability
 from typing import List
@@ -10,6 +12,10 @@ import time
 
 # My Code
 from KnobController import KnobController
+from MultiBusSampler import MultiBusSampler
+from AdcAcquisition import AdcAcquisitionThread
+from TraceRecording import TraceRecorder
+from MoveTimePrediction import MoveTimePredictor
 
 # ----- Class -----
 class KnobSuite:
@@ -18,12 +24,38 @@ class KnobSuite:
 	conflicts on the i2c line
 	"""
 
-	def __init__(self, numberOfKnobs, **kwargs):
+	def __init__(self, numberOfKnobs, busNumbers = None, backgroundAcquisition = False,
+			stateFile = None, stateSaveInterval = 30, warmStates = None, traceFile = None,
+			moveTimeFile = None, moveTimeoutFactor = 3, moveTimeoutMargin = 1.0, moveTimeoutMinimum = 45,
+			**kwargs):
 		"""
 		Initializes the knob suite
 
 		numberOfKnobs : number of knobs to create, channels begin at at 0 and count up to
 			this number minus 1
+		busNumbers (optional) : i2c bus for each knob, indexed by channel. If the knobs are
+			spread across more than one bus they are sampled with one thread per bus
+		backgroundAcquisition : if True the potentiometers are oversampled by a background
+			thread and the control loop reads the freshest samples without waiting on the bus
+		stateFile (optional) : file the knobs' warm state is saved to and restored from, so
+			the knobs don't have to be re-primed every time the system starts
+		stateSaveInterval : minimum time (in seconds) between saves of the state file while
+			the suite is running, the state is always saved by Close
+		warmStates (optional) : warm state of each knob, used instead of the state file's
+			(used when replaying traces)
+		traceFile (optional) : file to record every ADC sample, clock reading, and servo
+			command to (see TraceRecording). Knobs are serviced from this thread while
+			recording so the trace can be replayed exactly
+		moveTimeFile (optional) : move time surface (see MoveTimePrediction) used to predict
+			how long each move will take
+		moveTimeoutFactor : with a move time surface, a knob is considered faulted if a move
+			takes longer than moveTimeoutFactor times its predicted time plus
+			moveTimeoutMargin seconds
+		moveTimeoutMargin : seconds added to every move's time limit
+		moveTimeoutMinimum : shortest time limit (seconds) a move is given, however quick it
+			is predicted to be. Single moves in the recorded results take up to about 33 s
+			even where the average is a few seconds, and stalls are caught sooner by the
+			knob's own stall detection
 		**kwargs : named arguments to sent to each KnobController instance
 		"""
 
@@ -32,9 +64,49 @@ class KnobSuite:
 		self.knobs: List[KnobController] = []
 		self.settledKnobs: List[bool] = []
 				
+		# - Loading Warm State -
+		self.stateFile = stateFile
+		self.stateSaveInterval = stateSaveInterval
+		if warmStates is None:
+			warmStates = self.LoadState()
+		# 
+		self.lastStateSaveTime = time.monotonic()
+
+		# - Trace Recording -
+		self.traceRecorder = None
+		if traceFile is not None:
+			if backgroundAcquisition:
+				raise ValueError("Traces can't be recorded with background acquisition, the order samples are taken in isn't repeatable")
+			# 
+			self.traceRecorder = TraceRecorder(traceFile, numberOfKnobs, busNumbers, kwargs, warmStates)
+		# 
+
+		# - Move Time Prediction -
+		self.moveTimePredictor = None
+		self.moveTimeoutFactor = moveTimeoutFactor
+		self.moveTimeoutMargin = moveTimeoutMargin
+		self.moveTimeoutMinimum = moveTimeoutMinimum
+		if moveTimeFile is not None:
+			self.moveTimePredictor = MoveTimePredictor(moveTimeFile)
+		# 
+
 		# - Creating Suite of Knobs -
 		for number in range(0, numberOfKnobs):
-			knobController = KnobController(number, **kwargs)
+			if busNumbers is not None:
+				kwargs["busNumber"] = busNumbers[number]
+			# 
+
+			if number < len(warmStates):
+				kwargs["warmState"] = warmStates[number]
+			else:
+				kwargs["warmState"] = None
+			# 
+
+			if self.traceRecorder is not None:
+				knobController = KnobController(number, **self.traceRecorder.WrapControllerKwargs(kwargs))
+			else:
+				knobController = KnobController(number, **kwargs)
+			# 
 			self.knobs.append(knobController) 
 			
 			# Assume all knobs are not in the correct place to begin with
@@ -42,16 +114,41 @@ class KnobSuite:
 		# 
 
 		# - Other useful variables -
-		# All controllers have the same sampling time
+		# All controllers have the same sampling time and clock
 		self.samplingTime = knobController.samplingTime
+		self.clock = knobController.clock
+
+		# - Parallel Bus Sampling -
+		# Only worth the threads if there is more than one bus to talk to
+		self.sampler = None
+		if (busNumbers is not None) and (len(set(busNumbers)) > 1) and not backgroundAcquisition \
+				and (self.traceRecorder is None):
+			self.sampler = MultiBusSampler(self.knobs)
+		# 
+
+		# - Background Acquisition -
+		# Started after the knobs have primed their filters so the ADC is not shared
+		self.acquisitionThread = None
+		if backgroundAcquisition:
+			self.acquisitionThread = AdcAcquisitionThread(self.knobs)
+			self.acquisitionThread.start()
+
+			# Until every knob has a sample it would have to read the bus itself
+			self.acquisitionThread.WaitForFirstSamples()
+		# 
 	# 
 
 	def HasControllerSettled(self, knobController: KnobController):
 		"""
 		Returns True if the knobController reports that the knob is in the correct
-		position
+		position, or that it has faulted (it won't move again until the fault is cleared,
+		so the rest of the suite shouldn't wait on it)
 		"""
 
+		if knobController.faulted:
+			return True
+		# 
+
 		hasSettled = knobController.UpdateHasSettled()
 		hasTerminatedCleanly = knobController.terminatedCleanly
 		condition = hasTerminatedCleanly and hasSettled
@@ -67,8 +164,28 @@ class KnobSuite:
 			corresponds to the knob channel the command will be sent to. No channels will be
 			skipped
 		sequential : if True, adjusts knobs one after the other
+		printDebugValues : if true, prints debug values during operation
 		"""
 
+		if self.traceRecorder is not None:
+			self.traceRecorder.RecordCall(setpointList, sequential, printDebugValues)
+		# 
+
+		# --- Move Time Limits ---
+		# Moves that take much longer than expected mean something is wrong with the knob.
+		# The limits are recorded with the call so a trace replays without the surface
+		if self.moveTimePredictor is not None:
+			predictedMoveTimes = self.PredictMoveTimes(setpointList)
+			for number in range(0, self.numberOfKnobs):
+				self.knobs[number].moveTimeLimit = max(self.moveTimeoutFactor*predictedMoveTimes[number] \
+					+ self.moveTimeoutMargin, self.moveTimeoutMinimum)
+			# 
+
+			if self.traceRecorder is not None:
+				self.traceRecorder.RecordMoveTimeLimits([knobController.moveTimeLimit for knobController in self.knobs])
+			# 
+		# 
+
 		if printDebugValues:
 			for number in range(0, self.numberOfKnobs):
 				setpoint = setpointList[number]
@@ -79,6 +196,10 @@ class KnobSuite:
 					+ f" Last Setpoint: {knobController.lastSetpoint}"
 				)
 			# 
+
+			if self.moveTimePredictor is not None:
+				print(f"Predicted Move Times: {np.round(self.PredictMoveTimes(setpointList), 2).tolist()}")
+			# 
 		# 
 
 		# --- Update All Setpoints and Settling States ---
@@ -100,6 +221,13 @@ class KnobSuite:
 		
 		
 		# --- Move to Setpoints ---
+		# Knobs on different busses are serviced by the sampler's bus threads
+		if (self.sampler is not None) and (not sequential):
+			self.MoveWithSampler(setpointList, printDebugValues)
+			self.SaveStatePeriodically()
+			return
+		# 
+
 		# Try to move, ignore OSErrors if the i2c bus throws a fit
 		try:
 			while (not np.all(self.settledKnobs)):
@@ -110,7 +238,8 @@ class KnobSuite:
 					
 					# Update Knob (if not settled)
 					if (not self.settledKnobs[number]):
-						knobController(setpoint, sequential=sequential)
+						knobController(setpoint, sequential=sequential,
+							printDebugValues=printDebugValues)
 					# 
 
 					# Has it settled
@@ -118,7 +247,7 @@ class KnobSuite:
 
 					# Add delay if processing all knobs in parallel
 					if not sequential:
-						time.sleep(self.samplingTime)	
+						self.clock.sleep(self.samplingTime)
 					# 
 
 					# Save Knob Instance (Technically Unecessary)
@@ -128,6 +257,172 @@ class KnobSuite:
 		except OSError:
 			print("An OSError occured, ignoring it and moving on")
 		# 
+
+		self.SaveStatePeriodically()
+	# 
+
+	def MoveWithSampler(self, setpointList, printDebugValues = True):
+		"""
+		Moves all knobs to their setpoints, with the i2c traffic for each bus handled by its
+		own thread. Every tick the busses are read in parallel, then the control step for
+		every knob runs, and the resulting servo commands are sent at the start of the next
+		tick
+
+		setpointList: list of setpoints to pass to knobs, indexed by channel
+		printDebugValues : if true, knobs print debug values during operation
+		"""
+
+		# Try to move, ignore OSErrors if the i2c bus throws a fit
+		try:
+			while (not np.all(self.settledKnobs)):
+				# - Bus Phase -
+				# Send last tick's commands and sample every knob that is still moving
+				activeKnobs = [number for number in range(0, self.numberOfKnobs) \
+					if not self.settledKnobs[number]]
+				rawValues = self.sampler.Tick(activeKnobs)
+
+				# - Control Phase -
+				for number in activeKnobs:
+					knobController = self.knobs[number]
+					setpoint = setpointList[number]
+
+					# Update Knob, the servo command is sent during the next bus phase
+					knobController(setpoint, printDebugValues = printDebugValues,
+						rawPotentiometerValue = rawValues[number], writeServo = False)
+					self.sampler.QueueServoCommand(knobController)
+
+					# Has it settled
+					self.settledKnobs[number] = self.HasControllerSettled(knobController)
+				# 
+
+				# One delay per tick, shared by all knobs
+				self.clock.sleep(self.samplingTime)
+			# 
+
+			# Send the final stop commands
+			self.sampler.Flush()
+		except OSError:
+			print("An OSError occured, ignoring it and moving on")
+		# 
+	# 
+
+	# --- Warm State ---
+	def LoadState(self):
+		"""
+		Returns the list of warm states saved in the state file, or an empty list if there
+		is no usable state file
+		"""
+
+		if (self.stateFile is None) or (not os.path.exists(self.stateFile)):
+			return []
+		# 
+
+		try:
+			with open(self.stateFile) as jsonFile:
+				stateDictionary = json.load(jsonFile)
+			# 
+		except (OSError, ValueError):
+			print(f"Could not read knob state from {self.stateFile}, starting cold")
+			return []
+		# 
+
+		return stateDictionary.get("knobs", [])
+	# 
+
+	def SaveState(self):
+		"""
+		Writes every knob's warm state to the state file
+		"""
+
+		if self.stateFile is None:
+			return
+		# 
+
+		stateDictionary = dict()
+		stateDictionary["knobs"] = [knobController.GetWarmState() for knobController in self.knobs]
+
+		# Write to a temporary file first so a power loss can't leave a half written file
+		temporaryFile = self.stateFile + ".tmp"
+		with open(temporaryFile, 'w') as jsonFile:
+			json.dump(stateDictionary, jsonFile)
+			jsonFile.flush()
+			os.fsync(jsonFile.fileno())
+		# 
+		os.replace(temporaryFile, self.stateFile)
+
+		self.lastStateSaveTime = time.monotonic()
+	# 
+
+	def SaveStatePeriodically(self):
+		"""
+		Saves the warm state if stateSaveInterval has passed since it was last saved
+		"""
+
+		if (time.monotonic() - self.lastStateSaveTime) >= self.stateSaveInterval:
+			self.SaveState()
+		# 
+	# 
+
+	def Close(self):
+		"""
+		Releases resources held by the suite (stops the bus and acquisition threads if
+		there are any, finishes the trace if one is being recorded) and saves the warm state
+		"""
+
+		if self.acquisitionThread is not None:
+			self.acquisitionThread.Stop()
+			self.acquisitionThread = None
+		# 
+
+		if self.sampler is not None:
+			self.sampler.Close()
+			self.sampler = None
+		# 
+
+		if self.traceRecorder is not None:
+			self.traceRecorder.Close()
+		# 
+
+		self.SaveState()
+	# 
+
+	def PredictMoveTimes(self, setpointList):
+		"""
+		Returns the predicted time (seconds) each knob will take to move from where it is
+		to its setpoint, the longest is how long the whole move should take
+
+		setpointList: list of setpoints, indexed by channel
+		"""
+
+		if self.moveTimePredictor is None:
+			raise ValueError("No move time surface was loaded, pass moveTimeFile to KnobSuite")
+		# 
+
+		return [self.moveTimePredictor.PredictMoveTime(number, self.knobs[number].lastPotentiometerValue,
+			setpointList[number]) for number in range(0, self.numberOfKnobs)]
+	# 
+
+	# --- Faults ---
+	def GetFaults(self):
+		"""
+		Returns the fault of each knob, None for knobs that are working
+		"""
+
+		return [knobController.faultReason for knobController in self.knobs]
+	# 
+
+	def ClearFaults(self):
+		"""
+		Lets every faulted knob move again
+		"""
+
+		if self.traceRecorder is not None:
+			self.traceRecorder.RecordClearFaults()
+		# 
+
+		for knobController in self.knobs:
+			knobController.ClearFault()
+		# 
 	# 
 
 	def GetLogs(self):
@@ -0,0 +1,66 @@
+# ----- Imports -----
+# Utility
+import importlib
+
+# ----- Class -----
+class LazyObject:
+	"""
+	Stand-in for an object that is only created the first time one of its attributes is
+	used.
+
+	Used for hardware (an i2c bus, a servo hat) that scripts share at module level, so
+	importing the script doesn't open the device, only using it does.
+	"""
+
+	def __init__(self, factory):
+		"""
+		Creates the stand-in, nothing is created yet
+
+		factory : function without arguments that creates the object
+		"""
+
+		self.factory = factory
+		self.instance = None
+	#
+
+	def __getattr__(self, attributeName):
+		"""
+		Creates the object (on first use) and returns the requested attribute
+		"""
+
+		# Only reached for attributes that aren't on the stand-in itself
+		if self.instance is None:
+			self.instance = self.factory()
+		#
+
+		return getattr(self.instance, attributeName)
+	#
+#
+
+class LazyModule(LazyObject):
+	"""
+	Stand-in for a module that is only imported the first time one of its attributes is
+	used.
+
+	Device libraries (smbus, pi_servo_hat, qwiic_*) pull in large dependency trees that
+	take seconds to import on a Pi Zero and are not installed at all on machines used
+	for analysis. Wrapping them means importing one of the project's modules never
+	touches them, only creating hardware objects does.
+	"""
+
+	def __init__(self, moduleName):
+		"""
+		Creates the stand-in, nothing is imported yet
+
+		moduleName : name of the module as it would be passed to an import statement
+		"""
+
+		self.moduleName = moduleName
+		super().__init__(lambda: importlib.import_module(moduleName))
+	#
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	print("Program Completed")
+#
@@ -0,0 +1,77 @@
+# ----- Imports -----
+# Utility
+import math
+import numpy as np
+
+# ----- Class -----
+class MoveTimePredictor:
+	"""
+	Predicts how long a knob takes to move between two setpoints (and how far it
+	overshoots) from a lookup grid fit to experiment results (see
+	Code/Experimentation/MoveTimeSurface.py). Every query is a constant time bilinear
+	lookup, cheap enough for ETAs, timeouts, and scheduling while the knobs run
+	"""
+
+	def __init__(self, fileName):
+		"""
+		Loads a surface
+
+		fileName : .npz file saved by MoveTimeSurface.SaveMoveTimeSurface
+		"""
+
+		with np.load(fileName, allow_pickle = False) as surface:
+			self.gridPoints = surface["gridPoints"]
+			self.channels = surface["channels"].tolist()
+			self.grids = {name: surface[name] for name in surface.files if name not in ("gridPoints", "channels")}
+		#
+
+		# The grid is evenly spaced, so a setpoint's cell is found by arithmetic
+		self.gridSize = len(self.gridPoints)
+		self.gridStart = float(self.gridPoints[0])
+		self.gridStep = float(self.gridPoints[1] - self.gridPoints[0])
+	#
+
+	def Predict(self, knobNumber, startSetpoint, endSetpoint, metric = "time"):
+		"""
+		Returns the predicted metric ("time" or "overshoot") of a move. Knobs the surface
+		wasn't fit for use the first knob's grid
+		"""
+
+		grid = self.grids[metric]
+		knobIndex = self.channels.index(knobNumber) if knobNumber in self.channels else 0
+
+		# - Fractional Grid Coordinates -
+		maximumIndex = self.gridSize - 1
+		x = min(max((startSetpoint - self.gridStart)/self.gridStep, 0), maximumIndex)
+		y = min(max((endSetpoint - self.gridStart)/self.gridStep, 0), maximumIndex)
+
+		x0 = min(int(math.floor(x)), maximumIndex - 1)
+		y0 = min(int(math.floor(y)), maximumIndex - 1)
+		dx = x - x0
+		dy = y - y0
+
+		# - Bilinear Interpolation -
+		top = (1 - dy)*grid[knobIndex, x0, y0] + dy*grid[knobIndex, x0, y0 + 1]
+		bottom = (1 - dy)*grid[knobIndex, x0 + 1, y0] + dy*grid[knobIndex, x0 + 1, y0 + 1]
+
+		return float((1 - dx)*top + dx*bottom)
+	#
+
+	def PredictMoveTime(self, knobNumber, startSetpoint, endSetpoint):
+		"""
+		Returns the predicted time (seconds) to move between two setpoints
+		"""
+
+		return self.Predict(knobNumber, startSetpoint, endSetpoint, "time")
+	#
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	moveTimePredictor = MoveTimePredictor("../Experimentation/MoveTimeSurface.npz")
+
+	for start, end in [(5, 250), (250, 5), (100, 150), (127, 128)]:
+		print(f"{start:3} -> {end:3} | Time: {moveTimePredictor.PredictMoveTime(0, start, end):5.2f} s" \
+			+ f" | Overshoot: {moveTimePredictor.Predict(0, start, end, 'overshoot'):5.2f}")
+	#
+#
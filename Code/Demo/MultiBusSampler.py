@@ -0,0 +1,193 @@
+# ----- Imports -----
+# Utility
+import threading
+
+# Reability
+from typing import Dict, List
+
+# My Code
+from KnobController import KnobController
+
+# ----- Class -----
+class MultiBusSampler:
+	"""
+	Performs the i2c traffic for a group of knobs with one worker thread per i2c bus.
+
+	Every tick the workers send the queued servo commands and read the potentiometers
+	for the knobs on their bus at the same time (smbus releases the GIL while it waits
+	on the bus), then meet the control thread at a barrier. The control computation
+	happens after the barrier, so the time spent on the bus each tick depends on the
+	busiest bus instead of the total number of devices.
+
+	Servo commands are sent by the worker of the bus the knob's ADC is on, which is also
+	the bus KnobController opens the knob's servo hat on (see GetServoHat).
+	"""
+
+	def __init__(self, knobs: List[KnobController]):
+		"""
+		Creates the sampler and starts one worker for every bus used by knobs
+
+		knobs : controllers to sample, grouped by their busNumber attribute
+		"""
+
+		# --- Grouping Knobs by Bus ---
+		self.busGroups: Dict[int, List[KnobController]] = dict()
+		for knobController in knobs:
+			self.busGroups.setdefault(knobController.busNumber, []).append(knobController)
+		#
+
+		# --- Shared Tick State ---
+		# Written by the workers, read by the control thread after the barrier
+		self.rawValues: Dict[int, int] = {knob.knobNumber: None for knob in knobs}
+		self.busErrors: List[OSError] = []
+
+		# Anything other than a bus error stops the sampler, see BusWorker
+		self.workerError: Exception = None
+
+		# Written by the control thread, read by the workers after the barrier
+		self.readRequested: Dict[int, bool] = {knob.knobNumber: False for knob in knobs}
+		self.writePending: Dict[int, bool] = {knob.knobNumber: False for knob in knobs}
+
+		# --- Synchronization ---
+		# All workers plus the control thread take part in every tick
+		numberOfParties = len(self.busGroups) + 1
+		self.startBarrier = threading.Barrier(numberOfParties)
+		self.finishBarrier = threading.Barrier(numberOfParties)
+		self.running = True
+
+		# --- Starting Workers ---
+		self.workers: List[threading.Thread] = []
+		for busNumber, busKnobs in self.busGroups.items():
+			worker = threading.Thread(target = self.BusWorker, args = (busKnobs,),
+				name = f"I2C Bus {busNumber}", daemon = True)
+			worker.start()
+			self.workers.append(worker)
+		#
+	#
+
+	def BusWorker(self, busKnobs: List[KnobController]):
+		"""
+		Loop run by each worker thread, services the knobs on a single bus once per tick
+
+		busKnobs : controllers whose ADC is on the bus this worker is responsible for
+		"""
+
+		while True:
+			# Wait for the control thread to start the tick
+			try:
+				self.startBarrier.wait()
+			except threading.BrokenBarrierError:
+				break
+			#
+
+			if not self.running:
+				break
+			#
+
+			# - Bus Traffic -
+			try:
+				for knobController in busKnobs:
+					number = knobController.knobNumber
+
+					# Send the command computed during the last tick
+					if self.writePending[number]:
+						knobController.WriteServoCommand()
+						self.writePending[number] = False
+					#
+
+					# Read the next sample
+					if self.readRequested[number]:
+						self.rawValues[number] = knobController.ReadRawPotentiometerValue(number)
+					#
+				#
+			except OSError as error:
+				# Handed to the control thread so it can be handled like a serial read
+				self.busErrors.append(error)
+			except Exception as error:
+				# Breaking the barriers so the control thread (and the other workers)
+				# aren't left waiting on this one, Tick raises the error
+				self.workerError = error
+				self.startBarrier.abort()
+				self.finishBarrier.abort()
+				break
+			#
+
+			# Let the control thread know this bus is done
+			try:
+				self.finishBarrier.wait()
+			except threading.BrokenBarrierError:
+				break
+			#
+		#
+	#
+
+	def Tick(self, knobNumbers: List[int]):
+		"""
+		Runs one bus phase on every bus: sends all queued servo commands, then reads the
+		potentiometers of the requested knobs. Returns the raw values keyed by knob number
+
+		knobNumbers : knobs that need a new potentiometer sample this tick
+		"""
+
+		for number in self.readRequested:
+			self.readRequested[number] = number in knobNumbers
+		#
+
+		# Release the workers and wait for every bus to finish
+		try:
+			self.startBarrier.wait()
+			self.finishBarrier.wait()
+		except threading.BrokenBarrierError:
+			if self.workerError is not None:
+				raise self.workerError
+			#
+			raise
+		#
+
+		# Surface bus errors in the control thread
+		if self.busErrors:
+			error = self.busErrors[0]
+			self.busErrors.clear()
+			raise error
+		#
+
+		return self.rawValues
+	#
+
+	def QueueServoCommand(self, knobController: KnobController):
+		"""
+		Marks the knob's current servo command to be sent at the start of the next tick
+		"""
+
+		self.writePending[knobController.knobNumber] = True
+	#
+
+	def Flush(self):
+		"""
+		Sends any queued servo commands without reading new samples
+		"""
+
+		if any(self.writePending.values()):
+			self.Tick([])
+		#
+	#
+
+	def Close(self):
+		"""
+		Stops the worker threads
+		"""
+
+		self.running = False
+		self.startBarrier.abort()
+		self.finishBarrier.abort()
+
+		for worker in self.workers:
+			worker.join()
+		#
+	#
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	print("Program Completed")
+#
@@ -0,0 +1,314 @@
+# ----- Imports -----
+# Utility
+import hashlib
+import itertools
+import json
+import multiprocessing
+import numpy as np
+import os
+import sys
+
+# Reability
+from typing import Dict, List
+
+# For Control
+import time
+
+# My Code
+from StepResponseBenchmark import LoadPointList, RunPointList
+
+# ExperimentLog is shared with Code/Experimentation
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Experimentation"))
+from ExperimentLog import RemovePartialLine
+
+# ----- Methods and Functions -----
+# --- Sampling Parameter Space ---
+def GenerateGrid(parameterGrid: Dict[str, list]):
+	"""
+	Returns every combination of the values in parameterGrid
+
+	parameterGrid : KnobController argument name mapped to the values to try
+	"""
+
+	names = list(parameterGrid.keys())
+	configurations = []
+
+	for values in itertools.product(*[parameterGrid[name] for name in names]):
+		configurations.append(dict(zip(names, values)))
+	#
+
+	return configurations
+#
+
+def GenerateRandom(parameterRanges: Dict[str, tuple], numberOfSamples, seed = None):
+	"""
+	Returns configurations sampled uniformly from parameterRanges
+
+	parameterRanges : KnobController argument name mapped to a (low, high) range
+	numberOfSamples : number of configurations to create
+	seed : seed for the random number generator
+	"""
+
+	random = np.random.default_rng(seed)
+	names = list(parameterRanges.keys())
+
+	lows = np.array([parameterRanges[name][0] for name in names], dtype = float)
+	highs = np.array([parameterRanges[name][1] for name in names], dtype = float)
+	samples = lows + (highs - lows)*random.random((numberOfSamples, len(names)))
+
+	return [dict(zip(names, sample.tolist())) for sample in samples]
+#
+
+def GenerateLatinHypercube(parameterRanges: Dict[str, tuple], numberOfSamples, seed = None):
+	"""
+	Returns configurations from a Latin hypercube over parameterRanges, every parameter's
+	range is split into numberOfSamples strata and each stratum is used exactly once, so
+	the space is covered more evenly than with purely random samples
+
+	parameterRanges : KnobController argument name mapped to a (low, high) range
+	numberOfSamples : number of configurations to create
+	seed : seed for the random number generator
+	"""
+
+	random = np.random.default_rng(seed)
+	names = list(parameterRanges.keys())
+
+	# One column per parameter, each a shuffled set of strata with a random offset inside
+	strata = np.array([random.permutation(numberOfSamples) for name in names]).T
+	unitSamples = (strata + random.random(strata.shape))/numberOfSamples
+
+	lows = np.array([parameterRanges[name][0] for name in names], dtype = float)
+	highs = np.array([parameterRanges[name][1] for name in names], dtype = float)
+	samples = lows + (highs - lows)*unitSamples
+
+	return [dict(zip(names, sample.tolist())) for sample in samples]
+#
+
+# --- Evaluating Configurations ---
+def GetConfigurationKey(configuration: dict, pointList, seeds, runKwargs: dict = None):
+	"""
+	Returns a key identifying a configuration evaluated on a given point list and seeds
+	with the given RunPointList arguments (plant, gear limits, time limit), used to find
+	results in the cache
+	"""
+
+	if runKwargs is None:
+		runKwargs = dict()
+	#
+
+	# Values json can't save (numpy integers) are described by their repr
+	description = json.dumps([configuration, pointList, list(seeds), runKwargs], sort_keys = True, default = repr)
+	return hashlib.sha1(description.encode()).hexdigest()
+#
+
+def ComputeMetrics(allResults: List[dict], numberOfTimeouts):
+	"""
+	Reduces the results of one or more runs into the numbers configurations are ranked by
+	"""
+
+	times = []
+	overshoots = []
+	for resultsDictionary in allResults:
+		for knobLogs in resultsDictionary.values():
+			for log in knobLogs:
+				# Moves that don't go anywhere aren't interesting
+				if log["startSetpoint"] != log["endSetpoint"]:
+					times.append(log["time"])
+					overshoots.append(log["overshoot"])
+				#
+			#
+		#
+	#
+
+	metrics = dict()
+	metrics["meanTime"] = float(np.mean(times))
+	metrics["p95Time"] = float(np.percentile(times, 95))
+	metrics["meanOvershoot"] = float(np.mean(overshoots))
+	metrics["p95Overshoot"] = float(np.percentile(overshoots, 95))
+	metrics["maxOvershoot"] = float(np.max(overshoots))
+	metrics["timeouts"] = int(numberOfTimeouts)
+
+	return metrics
+#
+
+def EvaluateConfiguration(arguments):
+	"""
+	Pool worker, runs the point list once per seed with one configuration
+
+	arguments : tuple of (key, configuration, pointList, seeds, runKwargs)
+	"""
+
+	key, configuration, pointList, seeds, runKwargs = arguments
+
+	# The configuration is applied on top of any controller arguments the run already has
+	# (e.g. limits from a gear configuration)
+	runKwargs = dict(runKwargs)
+	runKwargs["controllerKwargs"] = {**runKwargs.get("controllerKwargs", dict()), **configuration}
+
+	allResults = []
+	totalTimeouts = 0
+	for seed in seeds:
+		resultsDictionary, numberOfTimeouts = RunPointList(pointList, seed, **runKwargs)
+		allResults.append(resultsDictionary)
+		totalTimeouts += numberOfTimeouts
+	#
+
+	return key, configuration, ComputeMetrics(allResults, totalTimeouts)
+#
+
+# --- Cache ---
+def LoadCache(cacheFile):
+	"""
+	Returns the results already stored in the cache file, keyed by configuration key
+	"""
+
+	cache = dict()
+
+	if (cacheFile is None) or (not os.path.exists(cacheFile)):
+		return cache
+	#
+
+	with open(cacheFile) as jsonFile:
+		for line in jsonFile:
+			try:
+				entry = json.loads(line)
+			except ValueError:
+				# Partially written line from an interrupted sweep
+				continue
+			#
+			cache[entry["key"]] = entry
+		#
+	#
+
+	return cache
+#
+
+# --- Sweep ---
+def RunSweep(configurations: List[dict], pointList, seeds, cacheFile = None,
+		numberOfProcesses = None, **runKwargs):
+	"""
+	Evaluates every configuration on the simulated plant across a pool of processes.
+	Each finished configuration is appended to cacheFile straight away, so a sweep that
+	is interrupted picks up where it left off. Returns one entry per configuration with
+	its metrics
+
+	configurations : list of KnobController named arguments to evaluate
+	pointList : points to visit, in order
+	seeds : every configuration is run once per seed
+	cacheFile (optional) : line delimited JSON file of finished configurations
+	numberOfProcesses (optional) : size of the process pool, defaults to the CPU count
+	**runKwargs : named arguments sent to RunPointList
+	"""
+
+	seeds = list(seeds)
+	cache = LoadCache(cacheFile)
+
+	# --- Determining Remaining Work ---
+	keys = [GetConfigurationKey(configuration, pointList, seeds, runKwargs) for configuration in configurations]
+	workItems = []
+	for key, configuration in zip(keys, configurations):
+		if key not in cache:
+			workItems.append((key, configuration, pointList, seeds, runKwargs))
+		#
+	#
+
+	print(f"Configurations: {len(configurations)} | Cached: {len(configurations) - len(workItems)} | To Run: {len(workItems)}")
+
+	# --- Evaluating ---
+	if workItems:
+		cacheHandle = None
+		if cacheFile is not None:
+			# A line cut short by an interrupted sweep would have the next entry glued onto it
+			if os.path.exists(cacheFile):
+				RemovePartialLine(cacheFile)
+			#
+			cacheHandle = open(cacheFile, 'a')
+		#
+
+		with multiprocessing.Pool(numberOfProcesses) as pool:
+			for count, (key, configuration, metrics) in enumerate(pool.imap_unordered(EvaluateConfiguration, workItems)):
+				entry = {"key": key, "configuration": configuration, "metrics": metrics}
+				cache[key] = entry
+
+				if cacheHandle is not None:
+					cacheHandle.write(json.dumps(entry) + "\n")
+					cacheHandle.flush()
+				#
+
+				print(f"{count + 1:4}/{len(workItems)} | Mean Time: {metrics['meanTime']:6.2f} s |" \
+					+ f" Max Overshoot: {metrics['maxOvershoot']:5.1f} | {configuration}")
+			#
+		#
+
+		if cacheHandle is not None:
+			cacheHandle.close()
+		#
+	#
+
+	return [cache[key] for key in keys]
+#
+
+def RankConfigurations(entries: List[dict], maximumOvershoot = None, overshootMetric = "maxOvershoot"):
+	"""
+	Sorts sweep results by mean settling time, dropping configurations that timed out or
+	overshoot by more than maximumOvershoot
+
+	entries : results returned by RunSweep
+	maximumOvershoot (optional) : largest allowed value of overshootMetric
+	overshootMetric : which overshoot metric the constraint applies to
+	"""
+
+	feasibleEntries = []
+	for entry in entries:
+		metrics = entry["metrics"]
+
+		if metrics["timeouts"] > 0:
+			continue
+		#
+		if (maximumOvershoot is not None) and (metrics[overshootMetric] > maximumOvershoot):
+			continue
+		#
+
+		feasibleEntries.append(entry)
+	#
+
+	return sorted(feasibleEntries, key = lambda entry: entry["metrics"]["meanTime"])
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	startTime = time.monotonic()
+
+	# --- Sweep Parameters ---
+	pointFile = "../Experimentation/ServoExperimentPoints_0.json"
+	cacheFile = "ParameterSweepCache.jsonl"
+	seeds = [0, 1]
+	numberOfSamples = 32
+	maximumOvershoot = 15
+
+	parameterRanges = dict()
+	parameterRanges["speedMagnitude"] = (15, 45)
+	parameterRanges["boundarySpeedMagnitude"] = (2, 10)
+	parameterRanges["boundaryOuterThreshold"] = (10, 25)
+	parameterRanges["boundaryInnerThreshold"] = (30, 60)
+	parameterRanges["errorMagnitude"] = (0.8, 2.0)
+	parameterRanges["settledErrorMagnitude"] = (3, 8)
+	parameterRanges["settlingTime"] = (0.1, 0.5)
+
+	# --- Running Sweep ---
+	pointList = LoadPointList(pointFile)
+	configurations = GenerateLatinHypercube(parameterRanges, numberOfSamples, seed = 0)
+	entries = RunSweep(configurations, pointList, seeds, cacheFile)
+
+	# --- Ranking Results ---
+	rankedEntries = RankConfigurations(entries, maximumOvershoot)
+
+	print("")
+	print(f"{len(rankedEntries)} of {len(entries)} configurations have a max overshoot of at most {maximumOvershoot}")
+	for rank, entry in enumerate(rankedEntries[:10]):
+		metrics = entry["metrics"]
+		print(f"#{rank + 1:2} | Mean Time: {metrics['meanTime']:6.2f} s | Max Overshoot: {metrics['maxOvershoot']:5.1f} | {entry['configuration']}")
+	#
+
+	print(f"Execution Time (s) : {time.monotonic() - startTime}")
+#
@@ -0,0 +1,346 @@
+# ----- Imports -----
+# Utility
+import numpy as np
+
+# Reability
+from typing import Dict, List
+
+# My Code
+from KnobController import GetAdcChannel
+
+# ----- Class -----
+class SimulatedClock:
+	"""
+	Stand-in for the time module. Time only advances when something sleeps, so simulated
+	runs are deterministic and take no longer than the computation itself
+	"""
+
+	def __init__(self, startTime = 0.0):
+		"""
+		Creates a clock
+
+		startTime : value monotonic() returns before anything has slept
+		"""
+
+		self.currentTime = float(startTime)
+	#
+
+	def monotonic(self):
+		"""
+		Returns the current simulated time in seconds
+		"""
+
+		return self.currentTime
+	#
+
+	def sleep(self, seconds):
+		"""
+		Advances the simulated time
+		"""
+
+		if seconds > 0:
+			self.currentTime += seconds
+		#
+	#
+#
+
+class SimulatedPlant:
+	"""
+	Model of the continuous rotation servos and the potentiometers they turn.
+
+	Each channel's servo turns at a speed proportional to how far its command is from the
+	center of the deadzone (180 stops it), up to a maximum speed. The gears between the
+	servo and potentiometer can have backlash, the potentiometer only turns while the servo
+	is pushing on one side of the gap. Positions are advanced lazily, only when a channel is
+	read or commanded
+	"""
+
+	def __init__(self, numberOfChannels = 16, seed = None,
+			  speedGain = 1.5, maximumSpeed = 40,
+			  deadzoneCenter = 49, deadzoneSize = 4, noiseMagnitude = 0.7,
+			  minimumPosition = 0, maximumPosition = 255, startingPositions = None,
+			  backlash = 0):
+		"""
+		Creates a plant
+
+		numberOfChannels : number of servo - potentiometer pairs
+		seed : seed for the sensor noise, runs with the same seed are identical
+		speedGain : potentiometer counts per second per unit of servo command away from the
+			deadzone center
+		maximumSpeed : fastest the potentiometer can turn (counts per second)
+		deadzoneCenter : servo command the servo doesn't move at
+		deadzoneSize : width of the band of commands around deadzoneCenter that don't move
+			the servo
+		noiseMagnitude : standard deviation of the noise added to each ADC conversion
+		minimumPosition : potentiometer value at the low end stop
+		maximumPosition : potentiometer value at the high end stop
+		startingPositions (optional) : initial potentiometer value of each channel, all
+			channels start centered if not provided
+		backlash : play in the gears (potentiometer counts) the servo has to cross after
+			changing direction before the potentiometer turns
+		"""
+
+		self.numberOfChannels = int(numberOfChannels)
+		self.random = np.random.default_rng(seed)
+
+		self.speedGain = speedGain
+		self.maximumSpeed = maximumSpeed
+		self.deadzoneCenter = deadzoneCenter
+		self.deadzoneSize = deadzoneSize
+		self.noiseMagnitude = noiseMagnitude
+		self.minimumPosition = minimumPosition
+		self.maximumPosition = maximumPosition
+		self.backlash = backlash
+
+		# - Channel State -
+		if startingPositions is None:
+			startingPositions = [(minimumPosition + maximumPosition)/2]*self.numberOfChannels
+		#
+		self.positions: List[float] = [float(position) for position in startingPositions]
+		# Where the servo side of the gears is, in potentiometer counts
+		self.servoPositions: List[float] = list(self.positions)
+		self.commands: List[float] = [180]*self.numberOfChannels
+		self.lastUpdateTimes: List[float] = [0.0]*self.numberOfChannels
+
+		# Channels whose servo doesn't turn (unpowered, or the gears slip)
+		self.stalledChannels = set()
+	#
+
+	def SetStalled(self, channel, stalled = True, currentTime = None):
+		"""
+		Makes a channel's servo stop turning regardless of its command (or turn again),
+		for testing fault detection
+
+		currentTime (optional) : time of the change, the channel is brought up to date first
+		"""
+
+		if currentTime is not None:
+			self.AdvanceTo(channel, currentTime)
+		#
+
+		if stalled:
+			self.stalledChannels.add(channel)
+		else:
+			self.stalledChannels.discard(channel)
+		#
+	#
+
+	def GetSpeed(self, channel):
+		"""
+		Returns the speed (counts per second) the channel is currently turning at
+		"""
+
+		command = self.commands[channel]
+
+		# Stopped, stalled, or inside the deadzone
+		if (command >= 180) or (channel in self.stalledChannels) or (abs(command - self.deadzoneCenter) <= self.deadzoneSize/2):
+			return 0.0
+		#
+
+		speed = self.speedGain*(command - self.deadzoneCenter)
+		return max(-self.maximumSpeed, min(self.maximumSpeed, speed))
+	#
+
+	def AdvanceTo(self, channel, currentTime):
+		"""
+		Moves a channel's potentiometer to where it would be at currentTime
+		"""
+
+		elapsedTime = currentTime - self.lastUpdateTimes[channel]
+		self.lastUpdateTimes[channel] = currentTime
+
+		if elapsedTime > 0:
+			# The servo can't get further than the gap past the end stops
+			halfBacklash = self.backlash/2
+			servoPosition = self.servoPositions[channel] + self.GetSpeed(channel)*elapsedTime
+			servoPosition = max(self.minimumPosition - halfBacklash, min(self.maximumPosition + halfBacklash, servoPosition))
+			self.servoPositions[channel] = servoPosition
+
+			# The potentiometer is dragged along once the servo reaches a side of the gap
+			position = self.positions[channel]
+			position = max(servoPosition - halfBacklash, min(servoPosition + halfBacklash, position))
+			self.positions[channel] = max(self.minimumPosition, min(self.maximumPosition, position))
+		#
+	#
+
+	def SetCommand(self, channel, command, currentTime):
+		"""
+		Changes the command sent to a channel's servo
+		"""
+
+		self.AdvanceTo(channel, currentTime)
+		self.commands[channel] = command
+	#
+
+	def Convert(self, channel, currentTime):
+		"""
+		Returns a noisy 8 bit ADC conversion of a channel's potentiometer
+		"""
+
+		self.AdvanceTo(channel, currentTime)
+
+		value = self.positions[channel] + self.noiseMagnitude*self.random.standard_normal()
+		return int(max(0, min(255, round(value))))
+	#
+#
+
+class SimulatedI2cBus:
+	"""
+	Provides the part of the smbus interface KnobController uses, backed by simulated
+	PCF8591 ADCs. Like the real chip, each read returns the previous conversion and
+	starts a new one
+	"""
+
+	def __init__(self, plant: SimulatedPlant, clock: SimulatedClock):
+		"""
+		Creates a bus with enough ADCs for every channel of the plant
+		"""
+
+		self.plant = plant
+		self.clock = clock
+
+		# Map each (address, controlByte) pair to the channel it reads
+		self.channels: Dict[tuple, int] = dict()
+		for channel in range(0, plant.numberOfChannels):
+			self.channels[GetAdcChannel(channel)] = channel
+		#
+		addresses = set(address for address, controlByte in self.channels)
+
+		# ADC State
+		self.controlBytes: Dict[int, int] = {address: 0x40 for address in addresses}
+		self.lastConversions: Dict[int, int] = {address: 0 for address in addresses}
+	#
+
+	def CheckAddress(self, address):
+		"""
+		Raises the same error the real bus does when nothing answers at an address
+		"""
+
+		if address not in self.controlBytes:
+			raise OSError(121, "Remote I/O error")
+		#
+	#
+
+	def write_byte(self, address, value):
+		"""
+		Selects the ADC channel to convert
+		"""
+
+		self.CheckAddress(address)
+		self.controlBytes[address] = value
+	#
+
+	def read_byte(self, address):
+		"""
+		Returns the previous conversion and converts the selected channel
+		"""
+
+		self.CheckAddress(address)
+
+		previousConversion = self.lastConversions[address]
+
+		# Unconnected inputs read as 0
+		channel = self.channels.get((address, self.controlBytes[address]))
+		if channel is None:
+			self.lastConversions[address] = 0
+		else:
+			self.lastConversions[address] = self.plant.Convert(channel, self.clock.monotonic())
+		#
+
+		return previousConversion
+	#
+#
+
+class SimulatedServoHat:
+	"""
+	Provides the part of the PiServoHat interface KnobController uses
+	"""
+
+	def __init__(self, plant: SimulatedPlant, clock: SimulatedClock):
+		"""
+		Creates a servo hat driving the plant's servos
+		"""
+
+		self.plant = plant
+		self.clock = clock
+	#
+
+	def restart(self):
+		"""
+		Nothing to reset in simulation
+		"""
+
+		pass
+	#
+
+	def move_servo_position(self, channel, position, swing = 90):
+		"""
+		Sends a command to a servo
+		"""
+
+		self.plant.SetCommand(channel, position, self.clock.monotonic())
+	#
+#
+
+class SimulatedHardware:
+	"""
+	Bundles a simulated clock, plant, i2c bus, and servo hat that can be handed to
+	KnobController or KnobSuite in place of the real hardware
+	"""
+
+	def __init__(self, numberOfChannels = 16, seed = None, **plantKwargs):
+		"""
+		Creates the simulated hardware
+
+		numberOfChannels : number of servo - potentiometer pairs
+		seed : seed for the sensor noise
+		**plantKwargs : named arguments sent to SimulatedPlant
+		"""
+
+		self.clock = SimulatedClock()
+		self.plant = SimulatedPlant(numberOfChannels, seed, **plantKwargs)
+		self.i2cBus = SimulatedI2cBus(self.plant, self.clock)
+		self.servoHat = SimulatedServoHat(self.plant, self.clock)
+	#
+
+	def GetControllerKwargs(self):
+		"""
+		Returns the named arguments that make a KnobController (or every controller in a
+		KnobSuite) use this hardware
+		"""
+
+		return dict(i2cBus = self.i2cBus, servoHat = self.servoHat, clock = self.clock)
+	#
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	from KnobSuite import KnobSuite
+
+	hardware = SimulatedHardware(2, seed = 0)
+	knobSuite = KnobSuite(2, printDebugValues = False, **hardware.GetControllerKwargs())
+
+	knobSuite([50, 200], printDebugValues = False)
+	print(f"Logs: {knobSuite.GetLogs()}")
+	print(f"Positions: {hardware.plant.positions}")
+
+	# --- Fault Detection Checks ---
+	# Healthy knobs whose gears have backlash (without compensation) must never fault
+	hardware = SimulatedHardware(2, seed = 0, backlash = 12)
+	knobSuite = KnobSuite(2, printDebugValues = False, **hardware.GetControllerKwargs())
+	random = np.random.default_rng(1)
+	for move in range(0, 60):
+		knobSuite(list(random.uniform(30, 225, 2)), printDebugValues = False)
+		faults = [fault for fault in knobSuite.GetFaults() if fault is not None]
+		assert not faults, f"Healthy knob with backlash faulted on move {move}: {faults}"
+	#
+
+	# A jammed knob must still fault, without holding up the others
+	hardware.plant.SetStalled(0, True, hardware.clock.monotonic())
+	knobSuite([40, 200], printDebugValues = False)
+	assert knobSuite.GetFaults()[0] is not None, "Jammed knob didn't fault"
+	assert knobSuite.GetFaults()[1] is None, "Healthy knob faulted next to a jammed one"
+	print("Fault detection checks passed")
+
+	print("Program Completed")
+#
@@ -0,0 +1,287 @@
+# ----- Imports -----
+# Utility
+import json
+import multiprocessing
+import numpy as np
+import os
+
+# Reability
+from typing import Dict, List
+
+# For Control
+import time
+
+# My Code
+from ControlLoopBenchmark import CountUpdates, TickBudgetExceeded
+from GearConfiguration import GearConfiguration
+from KnobSuite import KnobSuite
+from SimulatedHardware import SimulatedHardware
+
+# ----- Methods and Functions -----
+def LoadPointList(fileName):
+	"""
+	Loads the list of points from a ServoExperimentPoints_*.json file
+	"""
+
+	with open(fileName) as jsonFile:
+		experimentDictionary = json.load(jsonFile)
+	#
+
+	return experimentDictionary["pointList"]
+#
+
+def ConvertLog(log: dict):
+	"""
+	Converts the values in a log generated by KnobController.GenerateLog into default
+	python datatypes so it can be saved as JSON
+	"""
+
+	convertedLog = dict()
+	for key, value in log.items():
+		if isinstance(value, (np.integer, np.floating)):
+			value = value.item()
+		#
+		convertedLog[key] = value
+	#
+
+	return convertedLog
+#
+
+def RunPointList(pointList, seed, numberOfKnobs = 2, maximumMoveTime = 60,
+		controllerKwargs = None, plantKwargs = None):
+	"""
+	Moves every knob through the point list on simulated hardware, the same way the
+	hardware experiment runner does. Returns the results dictionary the runner saves
+	({"knob0": [logs], "knob1": [logs], ...}) and the number of moves that ran out of time
+
+	pointList : points to visit, in order
+	seed : seed for the simulated sensor noise
+	maximumMoveTime : simulated seconds a move may take before it is cut short, the log
+		for a cut short move records the time it was given
+	controllerKwargs (optional) : named arguments sent to each KnobController
+	plantKwargs (optional) : named arguments sent to SimulatedPlant
+	"""
+
+	if controllerKwargs is None:
+		controllerKwargs = dict()
+	#
+	if plantKwargs is None:
+		plantKwargs = dict()
+	#
+
+	# --- Creating Knobs ---
+	hardware = SimulatedHardware(max(numberOfKnobs, 3), seed = seed, **plantKwargs)
+	knobSuite = KnobSuite(numberOfKnobs, printDebugValues = False,
+		**hardware.GetControllerKwargs(), **controllerKwargs)
+
+	# Each knob gets one tick per suite cycle
+	ticksPerSecond = 1/(knobSuite.samplingTime*numberOfKnobs)
+	updateCount = CountUpdates(knobSuite, int(maximumMoveTime*ticksPerSecond*numberOfKnobs))
+
+	def Move(setpoints):
+		"""
+		Moves to the setpoints, returns False if the move ran out of time
+		"""
+
+		updateCount[0] = 0
+		try:
+			knobSuite(setpoints, printDebugValues = False)
+		except TickBudgetExceeded:
+			# Log where the move got to so the results stay aligned with the point list
+			for knobController in knobSuite.knobs:
+				if not knobController.terminatedCleanly:
+					knobController.endTime = hardware.clock.monotonic()
+					knobController.GenerateLog()
+				#
+			#
+			return False
+		#
+
+		return True
+	#
+
+	# --- Moving to Starting Location ---
+	Move([127]*numberOfKnobs)
+	Move([pointList[0]]*numberOfKnobs)
+
+	# --- Running Experiment ---
+	knobLogs: List[List[dict]] = [[] for number in range(0, numberOfKnobs)]
+	numberOfTimeouts = 0
+
+	for setpoint in pointList:
+		if not Move([setpoint]*numberOfKnobs):
+			numberOfTimeouts += 1
+		#
+
+		for number, log in enumerate(knobSuite.GetLogs()):
+			knobLogs[number].append(ConvertLog(log))
+		#
+	#
+
+	resultsDictionary = {f"knob{number}": knobLogs[number] for number in range(0, numberOfKnobs)}
+	return resultsDictionary, numberOfTimeouts
+#
+
+def RunSeed(arguments):
+	"""
+	Pool worker, runs RunPointList for one seed
+
+	arguments : tuple of (pointList, seed, runKwargs)
+	"""
+
+	pointList, seed, runKwargs = arguments
+	resultsDictionary, numberOfTimeouts = RunPointList(pointList, seed, **runKwargs)
+
+	return seed, resultsDictionary, numberOfTimeouts
+#
+
+def SummarizeValues(values):
+	"""
+	Returns summary statistics describing the distribution of values
+	"""
+
+	values = np.asarray(values, dtype = float)
+
+	summary = dict()
+	summary["count"] = int(values.size)
+	summary["mean"] = float(np.mean(values))
+	summary["std"] = float(np.std(values))
+	summary["min"] = float(np.min(values))
+	summary["p5"] = float(np.percentile(values, 5))
+	summary["median"] = float(np.median(values))
+	summary["p95"] = float(np.percentile(values, 95))
+	summary["max"] = float(np.max(values))
+
+	return summary
+#
+
+def ComputeDistributions(allResults: List[dict]):
+	"""
+	Groups every log from every run by (channel, startSetpoint, endSetpoint) and
+	summarizes the settling time and overshoot of each transition
+
+	allResults : list of results dictionaries returned by RunPointList
+	"""
+
+	# - Grouping -
+	groups: Dict[tuple, Dict[str, list]] = dict()
+	for resultsDictionary in allResults:
+		for knobLogs in resultsDictionary.values():
+			for log in knobLogs:
+				# Moves that don't go anywhere aren't interesting
+				if log["startSetpoint"] == log["endSetpoint"]:
+					continue
+				#
+
+				key = (log["channel"], log["startSetpoint"], log["endSetpoint"])
+				group = groups.setdefault(key, {"time": [], "overshoot": []})
+				group["time"].append(log["time"])
+				group["overshoot"].append(log["overshoot"])
+			#
+		#
+	#
+
+	# - Summarizing -
+	distributions: List[dict] = []
+	for (channel, startSetpoint, endSetpoint), group in sorted(groups.items()):
+		entry = dict()
+		entry["channel"] = channel
+		entry["startSetpoint"] = startSetpoint
+		entry["endSetpoint"] = endSetpoint
+		entry["time"] = SummarizeValues(group["time"])
+		entry["overshoot"] = SummarizeValues(group["overshoot"])
+		distributions.append(entry)
+	#
+
+	return distributions
+#
+
+def RunStepResponseBenchmark(pointList, seeds, outputFolder = None, numberOfProcesses = None,
+		**runKwargs):
+	"""
+	Replays the point list once per seed across a pool of processes.
+
+	If outputFolder is provided, every run is saved there as ExperimentResults_sim_<seed>.json
+	(the same format the hardware runner saves, so PlotExperimentResults can load the
+	folder directly) and the distributions are saved to <outputFolder>_Distributions.json.
+	Returns the distributions
+
+	pointList : points to visit, in order
+	seeds : one run is made for each seed
+	outputFolder (optional) : folder to save results to
+	numberOfProcesses (optional) : size of the process pool, defaults to the CPU count
+	**runKwargs : named arguments sent to RunPointList
+	"""
+
+	workItems = [(pointList, seed, runKwargs) for seed in seeds]
+
+	with multiprocessing.Pool(numberOfProcesses) as pool:
+		runs = pool.map(RunSeed, workItems)
+	#
+
+	allResults = [resultsDictionary for seed, resultsDictionary, numberOfTimeouts in runs]
+	totalTimeouts = sum(numberOfTimeouts for seed, resultsDictionary, numberOfTimeouts in runs)
+	distributions = ComputeDistributions(allResults)
+
+	if totalTimeouts > 0:
+		print(f"{totalTimeouts} moves ran out of time, their settling times are lower bounds")
+	#
+
+	# --- Saving Results ---
+	if outputFolder is not None:
+		os.makedirs(outputFolder, exist_ok = True)
+
+		for seed, resultsDictionary, numberOfTimeouts in runs:
+			with open(os.path.join(outputFolder, f"ExperimentResults_sim_{seed}.json"), 'w') as jsonFile:
+				json.dump(resultsDictionary, jsonFile)
+			#
+		#
+
+		summaryDictionary = dict()
+		summaryDictionary["seeds"] = list(seeds)
+		summaryDictionary["timeouts"] = totalTimeouts
+		summaryDictionary["distributions"] = distributions
+
+		# Saved next to the folder rather than in it, every file in a results folder is
+		# expected to be an experiment result
+		with open(os.path.normpath(outputFolder) + "_Distributions.json", 'w') as jsonFile:
+			json.dump(summaryDictionary, jsonFile)
+		#
+	#
+
+	return distributions
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	startTime = time.monotonic()
+
+	# --- Benchmark Parameters ---
+	pointFile = "../Experimentation/ServoExperimentPoints_0.json"
+	outputFolder = "../Experimentation/SimulatedConfiguration/"
+	numberOfSeeds = 16
+	# Gearbox to simulate (OpenSCAD customizer file), SimulatedPlant's defaults if None
+	gearFile = None # "../../CAD/ServoPID.json"
+
+	runKwargs = dict()
+	if gearFile is not None:
+		gearConfiguration = GearConfiguration(gearFile)
+		runKwargs["plantKwargs"] = gearConfiguration.GetPlantKwargs()
+		runKwargs["controllerKwargs"] = gearConfiguration.GetControllerKwargs()
+	#
+
+	# --- Running Benchmark ---
+	pointList = LoadPointList(pointFile)
+	print(f"Replaying {len(pointList)} points with {numberOfSeeds} seeds")
+
+	distributions = RunStepResponseBenchmark(pointList, range(0, numberOfSeeds), outputFolder, **runKwargs)
+
+	# --- Overall Results ---
+	meanTimes = [entry["time"]["mean"] for entry in distributions]
+	meanOvershoots = [entry["overshoot"]["mean"] for entry in distributions]
+	print(f"Transitions: {len(distributions)}")
+	print(f"Mean Settling Time: {np.mean(meanTimes):6.2f} s | Worst: {np.max(meanTimes):6.2f} s")
+	print(f"Mean Overshoot: {np.mean(meanOvershoots):6.2f} | Worst: {np.max(meanOvershoots):6.2f}")
+
+	print(f"Execution Time (s) : {time.monotonic() - startTime}")
+#
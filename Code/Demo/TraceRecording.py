@@ -0,0 +1,489 @@
+# ----- Imports -----
+# Utility
+import contextlib
+import io
+import json
+import numpy as np
+import struct
+
+# Reability
+from typing import Dict, List
+
+# For Control
+import time
+
+# My Code
+from KnobController import GetServoHat
+from LazyImport import LazyModule
+
+# Hardware, only imported when a trace is recorded on the real hardware
+smbus = LazyModule("smbus")
+
+# ----- Global Values ----
+# - File Layout -
+# A trace starts with TRACE_MAGIC, the length of the JSON header (uint32) and the header,
+# followed by fixed size records of (kind, field, value)
+TRACE_MAGIC = b"KNOBTRC1"
+HEADER_LENGTH = struct.Struct("<I")
+RECORD = struct.Struct("<BBd")
+RECORD_DTYPE = np.dtype([("kind", "u1"), ("field", "u1"), ("value", "<f8")])
+
+# - Record Kinds -
+# field holds the i2c address, servo channel, number of setpoints, or setpoint index
+READ = 1 # value : byte returned by the ADC
+WRITE = 2 # value : control byte sent to the ADC
+TIME = 3 # value : time returned by the clock
+SLEEP = 4 # value : seconds slept
+SERVO = 5 # value : command sent to the servo
+RESTART = 6 # value : unused
+CALL = 7 # value : CALL_SEQUENTIAL and CALL_DEBUG flags of a KnobSuite call
+SETPOINT = 8 # value : setpoint of the knob in field, follows a CALL record
+LIMIT = 9 # value : move time limit of the knob in field, follows the SETPOINT records
+CLEAR = 10 # value : unused, the suite's faults were cleared
+
+KIND_NAMES = {READ: "read", WRITE: "write", TIME: "time", SLEEP: "sleep", SERVO: "servo",
+	RESTART: "restart", CALL: "call", SETPOINT: "setpoint", LIMIT: "limit",
+	CLEAR: "clear"}
+
+CALL_SEQUENTIAL = 1
+CALL_DEBUG = 2
+
+# Controller arguments that describe the hardware rather than the controller, these are
+# provided separately when a trace is replayed
+HARDWARE_ARGUMENTS = ("i2cBus", "servoHat", "clock", "warmState", "busNumber")
+
+# ----- Utility Classes -----
+class TraceMismatch(Exception):
+	"""
+	Raised when a replayed controller does something other than what was recorded
+	"""
+	pass
+#
+
+# ----- Class -----
+class TraceRecorder:
+	"""
+	Records everything that passes between a KnobSuite and its hardware (every ADC byte,
+	every clock reading and every servo command) along with the setpoints the suite was
+	given, so the run can be replayed exactly with ReplayTrace.
+
+	Records are packed into a buffer and written out in blocks, so recording costs a
+	struct.pack per event on the control loop's hot path
+	"""
+
+	def __init__(self, fileName, numberOfKnobs, busNumbers = None, controllerKwargs = None,
+			warmStates = None, bufferSize = 65536):
+		"""
+		Creates the trace file and writes its header
+
+		fileName : file to save the trace to
+		numberOfKnobs : number of knobs in the suite being recorded
+		busNumbers (optional) : i2c bus of each knob
+		controllerKwargs (optional) : named arguments sent to each KnobController, the ones
+			that describe the hardware are left out of the header
+		warmStates (optional) : warm state each knob was created with
+		bufferSize : number of bytes collected before they are written to the file
+		"""
+
+		if controllerKwargs is None:
+			controllerKwargs = dict()
+		#
+
+		# - Header -
+		header = dict()
+		header["numberOfKnobs"] = numberOfKnobs
+		header["busNumbers"] = busNumbers
+		header["controllerKwargs"] = {name: value for name, value in controllerKwargs.items() \
+			if name not in HARDWARE_ARGUMENTS}
+		header["warmStates"] = warmStates if warmStates is not None else []
+		header["created"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+		headerBytes = json.dumps(header).encode()
+
+		self.traceFile = open(fileName, 'wb')
+		self.traceFile.write(TRACE_MAGIC + HEADER_LENGTH.pack(len(headerBytes)) + headerBytes)
+
+		# - Record Buffer -
+		self.buffer = bytearray()
+		self.bufferSize = bufferSize
+		self.numberOfRecords = 0
+
+		# Real buses created for recording, shared by every knob on the same bus
+		self.i2cBuses: Dict[int, object] = dict()
+	#
+
+	def Record(self, kind, field, value):
+		"""
+		Adds one record to the trace
+		"""
+
+		self.buffer += RECORD.pack(kind, field, value)
+		self.numberOfRecords += 1
+
+		if len(self.buffer) >= self.bufferSize:
+			self.Flush()
+		#
+	#
+
+	def RecordCall(self, setpointList, sequential, printDebugValues):
+		"""
+		Records the setpoints a KnobSuite was called with
+		"""
+
+		flags = (CALL_SEQUENTIAL if sequential else 0) | (CALL_DEBUG if printDebugValues else 0)
+		self.Record(CALL, len(setpointList), flags)
+
+		for number, setpoint in enumerate(setpointList):
+			self.Record(SETPOINT, number, setpoint)
+		#
+	#
+
+	def RecordMoveTimeLimits(self, moveTimeLimits):
+		"""
+		Records the move time limit each knob was given for the call just recorded (see
+		KnobSuite's moveTimeFile), so the trace replays without the move time surface
+		"""
+
+		for number, moveTimeLimit in enumerate(moveTimeLimits):
+			self.Record(LIMIT, number, moveTimeLimit)
+		#
+	#
+
+	def RecordClearFaults(self):
+		"""
+		Records that the suite's faults were cleared, faulted knobs ignore setpoints so the
+		replay has to clear them at the same point
+		"""
+
+		self.Record(CLEAR, 0, 0)
+	#
+
+	def WrapControllerKwargs(self, controllerKwargs: dict):
+		"""
+		Returns a copy of a KnobController's named arguments with its hardware wrapped so
+		it is recorded. The real hardware is created here if it wasn't provided
+		"""
+
+		wrappedKwargs = dict(controllerKwargs)
+
+		busNumber = int(controllerKwargs.get("busNumber", 1))
+
+		i2cBus = controllerKwargs.get("i2cBus")
+		if i2cBus is None:
+			if busNumber not in self.i2cBuses:
+				self.i2cBuses[busNumber] = smbus.SMBus(busNumber)
+			#
+			i2cBus = self.i2cBuses[busNumber]
+		#
+
+		servoHat = controllerKwargs.get("servoHat")
+		if servoHat is None:
+			servoHat = GetServoHat(busNumber)
+		#
+
+		wrappedKwargs["i2cBus"] = RecordingI2cBus(i2cBus, self)
+		wrappedKwargs["servoHat"] = RecordingServoHat(servoHat, self)
+		wrappedKwargs["clock"] = RecordingClock(controllerKwargs.get("clock", time), self)
+
+		return wrappedKwargs
+	#
+
+	def Flush(self):
+		"""
+		Writes the buffered records to the file
+		"""
+
+		self.traceFile.write(self.buffer)
+		self.traceFile.flush()
+		self.buffer = bytearray()
+	#
+
+	def Close(self):
+		"""
+		Writes any remaining records and closes the file
+		"""
+
+		if self.traceFile.closed:
+			return
+		#
+
+		self.Flush()
+		self.traceFile.close()
+	#
+#
+
+class RecordingI2cBus:
+	"""
+	Passes calls through to an i2c bus, recording the bytes read and written
+	"""
+
+	def __init__(self, i2cBus, traceRecorder: TraceRecorder):
+		self.i2cBus = i2cBus
+		self.traceRecorder = traceRecorder
+	#
+
+	def write_byte(self, address, value):
+		self.traceRecorder.Record(WRITE, address, value)
+		self.i2cBus.write_byte(address, value)
+	#
+
+	def read_byte(self, address):
+		value = self.i2cBus.read_byte(address)
+		self.traceRecorder.Record(READ, address, value)
+		return value
+	#
+#
+
+class RecordingServoHat:
+	"""
+	Passes calls through to a servo hat, recording the commands sent
+	"""
+
+	def __init__(self, servoHat, traceRecorder: TraceRecorder):
+		self.servoHat = servoHat
+		self.traceRecorder = traceRecorder
+	#
+
+	def restart(self):
+		self.traceRecorder.Record(RESTART, 0, 0)
+		self.servoHat.restart()
+	#
+
+	def move_servo_position(self, channel, position, swing = 90):
+		self.traceRecorder.Record(SERVO, channel, position)
+		self.servoHat.move_servo_position(channel, position, swing)
+	#
+#
+
+class RecordingClock:
+	"""
+	Passes calls through to a clock, recording the times it returns and the sleeps
+	"""
+
+	def __init__(self, clock, traceRecorder: TraceRecorder):
+		self.clock = clock
+		self.traceRecorder = traceRecorder
+	#
+
+	def monotonic(self):
+		currentTime = self.clock.monotonic()
+		self.traceRecorder.Record(TIME, 0, currentTime)
+		return currentTime
+	#
+
+	def sleep(self, seconds):
+		self.traceRecorder.Record(SLEEP, 0, seconds)
+		self.clock.sleep(seconds)
+	#
+#
+
+class TraceReader:
+	"""
+	Steps through the records of a trace, checking each thing the replayed controller
+	does against what was recorded
+	"""
+
+	def __init__(self, records):
+		"""
+		records : structured array of records (see LoadTrace)
+		"""
+
+		self.kinds = records["kind"].tolist()
+		self.fields = records["field"].tolist()
+		self.values = records["value"]
+		self.position = 0
+		self.numberOfServoCommands = 0
+	#
+
+	def IsFinished(self):
+		"""
+		Returns True once every record has been used
+		"""
+
+		return self.position >= len(self.kinds)
+	#
+
+	def Peek(self):
+		"""
+		Returns the kind of the next record (None at the end of the trace)
+		"""
+
+		if self.IsFinished():
+			return None
+		#
+
+		return self.kinds[self.position]
+	#
+
+	def Expect(self, kind, field = None, value = None):
+		"""
+		Returns the value of the next record, raising TraceMismatch if it isn't of the
+		given kind, or if field or value (when provided) don't match it. Values are
+		compared bit for bit
+		"""
+
+		if self.IsFinished():
+			raise TraceMismatch(f"Record {self.position}: expected no more events, got {KIND_NAMES[kind]}")
+		#
+
+		recordedKind = self.kinds[self.position]
+		recordedField = self.fields[self.position]
+		recordedValue = self.values[self.position]
+
+		if (recordedKind != kind) or ((field is not None) and (recordedField != field)) \
+				or ((value is not None) and (np.float64(value).tobytes() != recordedValue.tobytes())):
+			raise TraceMismatch(f"Record {self.position}:" \
+				+ f" recorded {KIND_NAMES.get(recordedKind, recordedKind)} ({recordedField}, {float(recordedValue)})," \
+				+ f" replay did {KIND_NAMES[kind]} ({field}, {value})")
+		#
+
+		self.position += 1
+		return float(recordedValue)
+	#
+#
+
+class ReplayI2cBus:
+	"""
+	i2c bus that answers reads with the recorded ADC bytes
+	"""
+
+	def __init__(self, traceReader: TraceReader):
+		self.traceReader = traceReader
+	#
+
+	def write_byte(self, address, value):
+		self.traceReader.Expect(WRITE, address, value)
+	#
+
+	def read_byte(self, address):
+		return int(self.traceReader.Expect(READ, address))
+	#
+#
+
+class ReplayServoHat:
+	"""
+	Servo hat that checks every command against the recorded command
+	"""
+
+	def __init__(self, traceReader: TraceReader):
+		self.traceReader = traceReader
+	#
+
+	def restart(self):
+		self.traceReader.Expect(RESTART)
+	#
+
+	def move_servo_position(self, channel, position, swing = 90):
+		self.traceReader.Expect(SERVO, channel, position)
+		self.traceReader.numberOfServoCommands += 1
+	#
+#
+
+class ReplayClock:
+	"""
+	Clock that returns the recorded times, sleeping does nothing
+	"""
+
+	def __init__(self, traceReader: TraceReader):
+		self.traceReader = traceReader
+	#
+
+	def monotonic(self):
+		return self.traceReader.Expect(TIME)
+	#
+
+	def sleep(self, seconds):
+		self.traceReader.Expect(SLEEP, value = seconds)
+	#
+#
+
+# ----- Methods and Functions -----
+def LoadTrace(fileName):
+	"""
+	Returns the header (dictionary) and records (structured array with fields kind,
+	field, and value) of a trace file
+	"""
+
+	with open(fileName, 'rb') as traceFile:
+		if traceFile.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+			raise ValueError(f"{fileName} is not a knob trace")
+		#
+
+		headerLength, = HEADER_LENGTH.unpack(traceFile.read(HEADER_LENGTH.size))
+		header = json.loads(traceFile.read(headerLength))
+
+		# A trace cut short by a crash may end part way through a record
+		recordBytes = traceFile.read()
+		numberOfRecords = len(recordBytes)//RECORD_DTYPE.itemsize
+		records = np.frombuffer(recordBytes, dtype = RECORD_DTYPE, count = numberOfRecords)
+	#
+
+	return header, records
+#
+
+def ReplayTrace(fileName):
+	"""
+	Feeds a recorded trace's ADC samples and clock readings into a fresh KnobSuite,
+	repeating every call (and every ClearFaults) the recorded suite received, and checks
+	that every servo command matches the recording bit for bit. Raises TraceMismatch at
+	the first difference, returns the number of servo commands checked otherwise
+	"""
+
+	# Imported here, KnobSuite imports this module
+	from KnobSuite import KnobSuite
+
+	header, records = LoadTrace(fileName)
+	traceReader = TraceReader(records)
+
+	# Debug printing changes when the settling filter is queried, so calls are replayed
+	# with the recorded setting and the output is thrown away
+	with contextlib.redirect_stdout(io.StringIO()):
+		knobSuite = KnobSuite(header["numberOfKnobs"], warmStates = header["warmStates"],
+			i2cBus = ReplayI2cBus(traceReader), servoHat = ReplayServoHat(traceReader),
+			clock = ReplayClock(traceReader), **header["controllerKwargs"])
+
+		while not traceReader.IsFinished():
+			if traceReader.Peek() == CLEAR:
+				traceReader.Expect(CLEAR)
+				knobSuite.ClearFaults()
+				continue
+			#
+
+			numberOfSetpoints = int(traceReader.fields[traceReader.position])
+			flags = int(traceReader.Expect(CALL))
+
+			setpointList: List[float] = []
+			for number in range(0, numberOfSetpoints):
+				setpoint = traceReader.Expect(SETPOINT, number)
+				setpointList.append(int(setpoint) if setpoint.is_integer() else setpoint)
+			#
+
+			# Limits the recorded suite got from its move time surface
+			for number in range(0, numberOfSetpoints):
+				if traceReader.Peek() != LIMIT:
+					break
+				#
+				knobSuite.knobs[number].moveTimeLimit = float(traceReader.Expect(LIMIT, number))
+			#
+
+			knobSuite(setpointList, sequential = bool(flags & CALL_SEQUENTIAL),
+				printDebugValues = bool(flags & CALL_DEBUG))
+		#
+	#
+
+	return traceReader.numberOfServoCommands
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	import sys
+
+	if len(sys.argv) < 2:
+		print("Usage: python TraceRecording.py <trace file>")
+		sys.exit(1)
+	#
+
+	startTime = time.monotonic()
+	numberOfCommands = ReplayTrace(sys.argv[1])
+	print(f"Replay matched: {numberOfCommands} servo commands")
+	print(f"Execution Time (s) : {time.monotonic() - startTime}")
+#
@@ -0,0 +1,482 @@
+# ----- Imports -----
+# Utility
+import itertools
+import json
+import numpy as np
+import os
+
+# Readability
+import time
+from typing import Dict, List
+
+# My Code
+from ExperimentGenerator import PlanTransitions
+from ExperimentLog import ResultsLog, ReadResultsLog, ConvertResultsLog
+
+# ----- Global Values -----
+# Metrics from each log that are modelled
+METRICS = ("time", "overshoot")
+
+# ----- Class -----
+class TransitionModel:
+	"""
+	Online model of how one knob performs over (startSetpoint, endSetpoint). Every metric
+	is modelled with a Gaussian process over the transitions measured so far, each
+	transition's average is weighted by how much its repeats agree with each other, so the
+	model is least certain where nothing has been measured nearby and where the repeats
+	disagree
+
+	Setpoints are scaled to [0, 1] and each metric is standardized before it is fit
+	"""
+
+	def __init__(self, metrics = METRICS, lengthScales = (0.05, 0.1, 0.2, 0.4, 0.8),
+			defaultLengthScale = 0.2, defaultNoise = 0.1, noiseShrinkage = 2):
+		"""
+		Creates a model with no measurements
+
+		metrics : names of the log values to model
+		lengthScales : kernel length scales to choose from, the one with the highest marginal
+			likelihood is used for each metric
+		defaultLengthScale : length scale used before there is enough data to choose one
+		defaultNoise : variance of a single measurement (relative to the metric's variance
+			across transitions) assumed until repeats have been measured
+		noiseShrinkage : number of pooled measurements each transition's own repeat variance
+			is blended with, so two repeats that happen to agree don't look noiseless
+		"""
+
+		self.metrics = metrics
+		self.lengthScales = lengthScales
+		self.defaultLengthScale = defaultLengthScale
+		self.defaultNoise = defaultNoise
+		self.noiseShrinkage = noiseShrinkage
+
+		# (startSetpoint, endSetpoint) -> list of measurements, one value per metric
+		self.measurements: Dict[tuple, List[list]] = dict()
+		self.numberOfMeasurements = 0
+
+		self.Fit()
+	#
+
+	def Update(self, log: dict):
+		"""
+		Adds a log from KnobController.GenerateLog, moves that don't go anywhere or that
+		ended in a fault are ignored
+		"""
+
+		key = (log["startSetpoint"], log["endSetpoint"])
+		if (key[0] == key[1]) or log.get("fault"):
+			return
+		#
+
+		self.measurements.setdefault(key, []).append([log[metric] for metric in self.metrics])
+		self.numberOfMeasurements += 1
+	#
+
+	def Kernel(self, a, b, lengthScale):
+		"""
+		Squared exponential kernel between the rows of a and b
+		"""
+
+		squaredDistances = np.sum((a[:, None, :] - b[None, :, :])**2, axis = 2)
+		return np.exp(-0.5*squaredDistances/lengthScale**2)
+	#
+
+	def Fit(self):
+		"""
+		Refits every metric to the measurements so far
+		"""
+
+		keys = list(self.measurements.keys())
+		self.inputs = np.array(keys, dtype = float).reshape(-1, 2)/255
+		numberOfMetrics = len(self.metrics)
+
+		# - Averages and Repeat Variances of Each Transition -
+		counts = np.array([len(self.measurements[key]) for key in keys], dtype = float)
+		means = np.zeros((len(keys), numberOfMetrics))
+		variances = np.zeros((len(keys), numberOfMetrics))
+		for i, key in enumerate(keys):
+			values = np.array(self.measurements[key], dtype = float)
+			means[i] = np.mean(values, axis = 0)
+			variances[i] = np.var(values, axis = 0, ddof = 1) if len(values) > 1 else 0
+		#
+
+		# - Per Metric Models -
+		self.fits = []
+		for m in range(0, numberOfMetrics):
+			fit = dict()
+
+			# Standardize so the same hyperparameters work for seconds and counts
+			fit["mean"] = np.mean(means[:, m]) if len(keys) > 0 else 0.0
+			spread = np.std(means[:, m]) if len(keys) > 1 else 0.0
+			fit["scale"] = spread if spread > 0 else 1.0
+			standardMeans = (means[:, m] - fit["mean"])/fit["scale"]
+			standardVariances = variances[:, m]/fit["scale"]**2
+
+			# Noise of a single measurement, pooled over every transition that was repeated
+			# and blended into each transition's own repeat variance
+			degreesOfFreedom = counts - 1
+			if np.sum(degreesOfFreedom) > 0:
+				pooledNoise = np.sum(degreesOfFreedom*standardVariances)/np.sum(degreesOfFreedom)
+			else:
+				pooledNoise = self.defaultNoise
+			#
+			fit["pooledNoise"] = pooledNoise
+			fit["noise"] = (degreesOfFreedom*standardVariances + self.noiseShrinkage*pooledNoise) \
+				/(degreesOfFreedom + self.noiseShrinkage)
+
+			# The average of n measurements is n times less noisy than one
+			averageNoise = fit["noise"]/np.maximum(counts, 1)
+
+			# Pick the length scale with the highest log marginal likelihood
+			fit["lengthScale"] = self.defaultLengthScale
+			fit["cholesky"] = np.zeros((0, 0))
+			fit["alpha"] = np.zeros(0)
+			bestLikelihood = -np.inf
+			lengthScales = self.lengthScales if len(keys) > 2 else [self.defaultLengthScale]
+			for lengthScale in (lengthScales if len(keys) > 0 else []):
+				covariance = self.Kernel(self.inputs, self.inputs, lengthScale) + np.diag(averageNoise + 1e-9)
+				cholesky = np.linalg.cholesky(covariance)
+				alpha = np.linalg.solve(cholesky.T, np.linalg.solve(cholesky, standardMeans))
+
+				likelihood = -0.5*standardMeans @ alpha - np.sum(np.log(np.diag(cholesky)))
+				if likelihood > bestLikelihood:
+					bestLikelihood = likelihood
+					fit["lengthScale"] = lengthScale
+					fit["cholesky"] = cholesky
+					fit["alpha"] = alpha
+				#
+			#
+
+			self.fits.append(fit)
+		#
+
+		self.keyIndices = {key: i for i, key in enumerate(keys)}
+	#
+
+	def Predict(self, transitions):
+		"""
+		Returns the predicted mean of every metric (transitions x metrics) and its standard
+		deviation, in the metrics' own units
+
+		transitions : list of (startSetpoint, endSetpoint) pairs
+		"""
+
+		inputs = np.array(transitions, dtype = float).reshape(-1, 2)/255
+
+		means = np.zeros((len(inputs), len(self.metrics)))
+		standardDeviations = np.zeros((len(inputs), len(self.metrics)))
+		for m, fit in enumerate(self.fits):
+			crossCovariance = self.Kernel(inputs, self.inputs, fit["lengthScale"])
+			solved = np.linalg.solve(fit["cholesky"], crossCovariance.T) if len(self.inputs) > 0 \
+				else np.zeros((0, len(inputs)))
+			variance = np.clip(1 - np.sum(solved**2, axis = 0), 1e-12, None)
+
+			means[:, m] = fit["mean"] + fit["scale"]*(crossCovariance @ fit["alpha"])
+			standardDeviations[:, m] = fit["scale"]*np.sqrt(variance)
+		#
+
+		return means, standardDeviations
+	#
+
+	def GetPosteriorCovariance(self, transitions, fit):
+		"""
+		Returns the standardized posterior covariance of one metric's mean between every
+		pair of transitions
+		"""
+
+		inputs = np.array(transitions, dtype = float).reshape(-1, 2)/255
+
+		covariance = self.Kernel(inputs, inputs, fit["lengthScale"])
+		if len(self.inputs) > 0:
+			crossCovariance = self.Kernel(inputs, self.inputs, fit["lengthScale"])
+			solved = np.linalg.solve(fit["cholesky"], crossCovariance.T)
+			covariance = covariance - solved.T @ solved
+		#
+
+		return covariance
+	#
+
+	def GetUncertainty(self, transitions):
+		"""
+		Returns the uncertainty of each transition: the standard deviation of every metric's
+		predicted mean, relative to how much the metric varies between transitions,
+		combined over the metrics
+		"""
+
+		means, standardDeviations = self.Predict(transitions)
+		scales = np.array([fit["scale"] for fit in self.fits])
+
+		return np.sqrt(np.sum((standardDeviations/scales)**2, axis = 1))
+	#
+
+	def SelectBatch(self, candidates, batchSize):
+		"""
+		Chooses batchSize transitions (repeats allowed) that remove the most uncertainty.
+		The most uncertain candidate is chosen, the model is conditioned on a measurement
+		there (the variance it leaves doesn't depend on the value measured), and so on, so
+		one batch doesn't pile onto a single region
+
+		candidates : list of (startSetpoint, endSetpoint) pairs to choose from
+		"""
+
+		candidates = list(candidates)
+		numberOfCandidates = len(candidates)
+
+		covariances = []
+		noises = []
+		for fit in self.fits:
+			covariances.append(self.GetPosteriorCovariance(candidates, fit))
+
+			# Noise of one more measurement of each candidate
+			noise = np.full(numberOfCandidates, fit["pooledNoise"])
+			for c, key in enumerate(candidates):
+				if key in self.keyIndices:
+					noise[c] = fit["noise"][self.keyIndices[key]]
+				#
+			#
+			noises.append(noise)
+		#
+
+		batch = []
+		for selection in range(0, batchSize):
+			totalVariance = sum(np.diag(covariance) for covariance in covariances)
+			chosen = int(np.argmax(totalVariance))
+			batch.append(candidates[chosen])
+
+			# Rank one update for a measurement of the chosen candidate
+			for covariance, noise in zip(covariances, noises):
+				column = covariance[:, chosen].copy()
+				covariance -= np.outer(column, column)/(column[chosen] + noise[chosen])
+			#
+		#
+
+		return batch
+	#
+
+	def GetMoveTimeMatrix(self, points):
+		"""
+		Returns the predicted time of every move between points, for planning. Assumes time
+		is the first metric
+		"""
+
+		transitions = list(itertools.product(points, points))
+		means, standardDeviations = self.Predict(transitions)
+
+		moveTimeMatrix = np.clip(means[:, 0], 0, None).reshape(len(points), len(points))
+		np.fill_diagonal(moveTimeMatrix, 0)
+
+		return moveTimeMatrix
+	#
+#
+
+# ----- Methods and Functions -----
+def LoadResultsIntoModels(folders, models: List[TransitionModel]):
+	"""
+	Adds the logs in previous ExperimentResults_*.json files to the models, so an adaptive
+	experiment can pick up where uniform ones left off. Returns the number of logs added
+
+	folders : folders holding ExperimentResults_*.json files
+	models : one model per knob
+	"""
+
+	numberOfLogs = 0
+	for folder in folders:
+		for name in sorted(os.listdir(folder)):
+			if not name.endswith(".json"):
+				continue
+			#
+
+			with open(os.path.join(folder, name)) as jsonFile:
+				resultsDictionary = json.load(jsonFile)
+			#
+
+			for knobNumber, model in enumerate(models):
+				for log in resultsDictionary.get(f"knob{knobNumber}", []):
+					model.Update(log)
+					numberOfLogs += 1
+				#
+			#
+		#
+	#
+
+	return numberOfLogs
+#
+
+def CreateBatchPlans(models: List[TransitionModel], points, batchSize):
+	"""
+	Chooses the next batch of transitions for every knob and orders each into the plan
+	with the least predicted move time. Returns one list of points per knob, all the same
+	length so the knobs can be driven in lockstep
+	"""
+
+	candidates = list(itertools.permutations(points, 2))
+
+	knobPlans: List[list] = []
+	for model in models:
+		transitions = model.SelectBatch(candidates, batchSize)
+		listOfPoints, expectedTime = PlanTransitions(transitions, points, model.GetMoveTimeMatrix(points))
+		knobPlans.append([int(point) for point in listOfPoints])
+	#
+
+	# Shorter plans wait at their last point, stationary moves are ignored
+	planLength = max(len(knobPlan) for knobPlan in knobPlans)
+	for knobPlan in knobPlans:
+		knobPlan.extend([knobPlan[-1]]*(planLength - len(knobPlan)))
+	#
+
+	return knobPlans
+#
+
+def RunAdaptiveExperiment(knobSuite, points, logFile, batchSize = 16, maximumMoves = 1000,
+		targetUncertainty = 0.1, resultsFolders = None, shouldStop = None, modelKwargs = None):
+	"""
+	Measures the knobs' performance over every transition between points, choosing each
+	batch of transitions where the models are least certain. Stops when every transition's
+	uncertainty (see TransitionModel.GetUncertainty) is below targetUncertainty, after
+	maximumMoves moves, or when shouldStop returns True. A knob that faults also stops
+	the experiment, it ignores setpoints until its fault is cleared so every later log
+	would repeat the faulted move. Every move is written to logFile (see
+	ExperimentLog.ResultsLog) and an interrupted experiment resumes from it.
+
+	Returns (models, finished), finished is False if the experiment was stopped early
+
+	knobSuite : KnobSuite to drive, every knob is modelled separately
+	points : setpoints the transitions are made between
+	logFile : line delimited log of every move
+	batchSize : transitions chosen for each knob between model updates
+	maximumMoves : most moves (per knob, including connecting moves) to make
+	targetUncertainty : uncertainty every transition must be under to finish
+	resultsFolders (optional) : folders of ExperimentResults_*.json files to start from
+	shouldStop (optional) : function checked after every move, e.g. a stop switch
+	modelKwargs (optional) : named arguments for each TransitionModel
+	"""
+
+	if modelKwargs is None:
+		modelKwargs = dict()
+	#
+
+	# The prototype suite in KnobControlPrototype has no fault detection
+	getFaults = getattr(knobSuite, "GetFaults", None)
+
+	points = sorted(set(int(point) for point in points))
+	candidates = list(itertools.permutations(points, 2))
+	models = [TransitionModel(**modelKwargs) for knobNumber in range(0, knobSuite.numberOfKnobs)]
+
+	# --- Previous Measurements ---
+	if resultsFolders:
+		numberOfLogs = LoadResultsIntoModels(resultsFolders, models)
+		print(f"Loaded {numberOfLogs} logs from {resultsFolders}")
+	#
+
+	resultsLog = ResultsLog(logFile, {"design": "adaptive", "points": points,
+		"resultsFolders": resultsFolders, "batchSize": batchSize})
+	if resultsLog.lastSetpointNumber >= 0:
+		for record in ReadResultsLog(logFile):
+			if record.get("type") == "transition":
+				for model, log in zip(models, record["logs"]):
+					model.Update(log)
+				#
+			#
+		#
+		print(f"Resuming {logFile} after {resultsLog.lastSetpointNumber + 1} moves")
+	#
+
+	# --- Measuring ---
+	setpointNumber = resultsLog.lastSetpointNumber + 1
+	finished = False
+	try:
+		while setpointNumber < maximumMoves:
+			for model in models:
+				model.Fit()
+			#
+
+			uncertainty = max(np.max(model.GetUncertainty(candidates)) for model in models)
+			print(f"Moves: {setpointNumber:5} | Highest Uncertainty: {uncertainty:6.3f}")
+			if uncertainty < targetUncertainty:
+				finished = True
+				break
+			#
+
+			knobPlans = CreateBatchPlans(models, points, min(batchSize, maximumMoves - setpointNumber))
+			for step in range(0, len(knobPlans[0])):
+				setpoints = [knobPlan[step] for knobPlan in knobPlans]
+				knobSuite(setpoints, sequential = False)
+
+				logs = knobSuite.GetLogs()
+				resultsLog.Append(setpointNumber, setpoints, logs)
+				for model, log in zip(models, logs):
+					model.Update(log)
+				#
+				setpointNumber += 1
+
+				faults = [] if getFaults is None else getFaults()
+				if any(fault is not None for fault in faults):
+					for knobNumber, fault in enumerate(faults):
+						if fault is not None:
+							print(f"Knob {knobNumber} faulted after {setpointNumber} moves: {fault}")
+						#
+					#
+					return models, False
+				#
+
+				if (shouldStop is not None) and shouldStop():
+					return models, False
+				#
+			#
+		#
+
+		# Out of moves, the models are as good as they will get
+		if setpointNumber >= maximumMoves:
+			finished = True
+		#
+	finally:
+		resultsLog.Close()
+	#
+
+	for model in models:
+		model.Fit()
+	#
+
+	return models, finished
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	from KnobControlPrototype import KnobSuite, ReadPotentiometer
+
+	# --- Experiment Parameters ---
+	pointFile = "ServoExperimentPoints_0.json"
+	resultsFolders = ["DefaultConfiguration"]
+	logFile = "ExperimentLog_Adaptive.jsonl"
+
+	batchSize = 16
+	maximumMoves = 400
+	targetUncertainty = 0.1
+
+	with open(pointFile) as jsonFile:
+		points = sorted(set(json.load(jsonFile)["pointList"]))
+	#
+	print(f"Points: {points}")
+
+	# --- Running ---
+	knobSuite = KnobSuite(2)
+	knobSuite([127, 127], sequential = False)
+
+	models, finished = RunAdaptiveExperiment(knobSuite, points, logFile, batchSize, maximumMoves,
+		targetUncertainty, resultsFolders, shouldStop = lambda: ReadPotentiometer(2) > 127)
+
+	# --- Saving the Results ---
+	if finished:
+		currentTimeString = time.strftime("%H_%M_%S", time.localtime())
+		resultsFilename = "ExperimentResults_" + currentTimeString + ".json"
+
+		with open(resultsFilename, 'w') as jsonFile:
+			json.dump(ConvertResultsLog(logFile), jsonFile)
+		#
+		os.replace(logFile, "ExperimentResults_" + currentTimeString + ".jsonl")
+
+		print(f"Experimental Results Saved To: {resultsFilename}")
+	else:
+		print(f"Experiment stopped, run again to resume from {logFile}")
+	#
+#
@@ -0,0 +1,295 @@
+# ----- Imports -----
+# Utility
+import hashlib
+import json
+import numpy as np
+import os
+
+# Readability
+from typing import List
+
+# My Code
+from ResultsStore import ConvertResultsDictionary, GroupTransitions, LoadResults, SaveResults, RESULTS_DTYPE
+
+# ----- Global Values -----
+# Metrics the partial aggregates are kept for
+PARTIAL_METRICS = ("time", "overshoot")
+
+# Changes whenever the cached files change layout, entries of other versions are parsed again
+CACHE_VERSION = 2
+
+# ----- Class -----
+class AggregationCache:
+	"""
+	Caches what is parsed out of every ExperimentResults_*.json file: its columns (see
+	ResultsStore) and its partial aggregates (count, mean, and sum of squared deviations of
+	every transition). Entries are keyed by the file's path, size, and modification time, so only
+	new or changed files are parsed again and the rest are merged from their partial
+	aggregates
+
+	The cache is a folder with an index.json and two .npy files per results file
+	"""
+
+	def __init__(self, cacheFolder = "AggregationCache"):
+		"""
+		Opens (or creates) a cache
+
+		cacheFolder : folder the cache is kept in
+		"""
+
+		self.cacheFolder = cacheFolder
+		os.makedirs(cacheFolder, exist_ok = True)
+
+		self.indexFileName = os.path.join(cacheFolder, "index.json")
+		self.index = self.LoadIndex()
+
+		# Number of results files parsed (rather than loaded from the cache) so far
+		self.numberOfFilesParsed = 0
+	#
+
+	def LoadIndex(self):
+		"""
+		Returns the index saved on disk, an empty one if there isn't one or it is unreadable
+		"""
+
+		try:
+			with open(self.indexFileName) as jsonFile:
+				return json.load(jsonFile)
+			#
+		except (OSError, ValueError):
+			return dict()
+		#
+	#
+
+	def SaveIndex(self, updatedKeys):
+		"""
+		Saves the entries in updatedKeys to the index on disk. Entries saved by other
+		processes since the index was loaded are kept, and the index is replaced in one
+		step so it is never left half written
+		"""
+
+		index = self.LoadIndex()
+		for key in updatedKeys:
+			index[key] = self.index[key]
+		#
+		self.index = index
+
+		temporaryFileName = self.indexFileName + f".{os.getpid()}.tmp"
+		with open(temporaryFileName, 'w') as jsonFile:
+			json.dump(index, jsonFile, indent = 1)
+		#
+		os.replace(temporaryFileName, self.indexFileName)
+	#
+
+	def GetEntry(self, fileName):
+		"""
+		Returns the cache entry of a results file, parsing the file if it isn't cached or
+		has changed since it was. Returns (key, updated)
+		"""
+
+		key = os.path.abspath(fileName)
+		fileStatus = os.stat(fileName)
+
+		entry = self.index.get(key)
+		if (entry is not None) and (entry.get("version") == CACHE_VERSION) \
+				and (entry["size"] == fileStatus.st_size) and (entry["mtime"] == fileStatus.st_mtime_ns) \
+				and os.path.exists(os.path.join(self.cacheFolder, entry["columns"])) \
+				and os.path.exists(os.path.join(self.cacheFolder, entry["partials"])):
+			return key, False
+		#
+
+		# - Parsing -
+		with open(fileName) as jsonFile:
+			results = ConvertResultsDictionary(json.load(jsonFile))
+		#
+		self.numberOfFilesParsed += 1
+
+		# Named after the path so every results file has its own entry
+		entryName = hashlib.sha1(key.encode()).hexdigest()[:16]
+		entry = {"version": CACHE_VERSION, "size": fileStatus.st_size, "mtime": fileStatus.st_mtime_ns,
+			"columns": entryName + "_columns.npy", "partials": entryName + "_partials.npy"}
+
+		SaveResults(os.path.join(self.cacheFolder, entry["columns"]), results)
+		np.save(os.path.join(self.cacheFolder, entry["partials"]), ComputePartialAggregates(results), allow_pickle = False)
+
+		self.index[key] = entry
+		return key, True
+	#
+
+	def Update(self, fileNames):
+		"""
+		Makes sure every file in fileNames is cached, returns their keys
+		"""
+
+		keys: List[str] = []
+		updatedKeys: List[str] = []
+		for fileName in fileNames:
+			key, updated = self.GetEntry(fileName)
+			keys.append(key)
+			if updated:
+				updatedKeys.append(key)
+			#
+		#
+
+		if updatedKeys:
+			self.SaveIndex(updatedKeys)
+		#
+
+		return keys
+	#
+
+	def AggregateFolders(self, folders):
+		"""
+		Returns the merged partial aggregates of every results file in folders (see
+		MergePartialAggregates)
+		"""
+
+		keys = self.Update(GetResultsFileNames(folders))
+		partials = [np.load(os.path.join(self.cacheFolder, self.index[key]["partials"]), allow_pickle = False) for key in keys]
+
+		return MergePartialAggregates(partials)
+	#
+
+	def LoadFolderColumns(self, folders, memoryMap = True):
+		"""
+		Returns every result in folders as one results array (see ResultsStore), for
+		statistics that can't be merged from partial aggregates (e.g. medians)
+		"""
+
+		keys = self.Update(GetResultsFileNames(folders))
+		if len(keys) == 0:
+			return np.empty(0, dtype = RESULTS_DTYPE)
+		#
+
+		return np.concatenate([LoadResults(os.path.join(self.cacheFolder, self.index[key]["columns"]), memoryMap) \
+			for key in keys])
+	#
+#
+
+# ----- Methods and Functions -----
+def GetResultsFileNames(folders):
+	"""
+	Returns every results (.json) file in folders
+	"""
+
+	fileNames: List[str] = []
+	for folder in folders:
+		fileNames += [os.path.join(folder, name) for name in sorted(os.listdir(folder)) if name.endswith(".json")]
+	#
+
+	return fileNames
+#
+
+def GetPartialDtype(metrics = PARTIAL_METRICS):
+	"""
+	Returns the fields of a partial aggregate
+	"""
+
+	fields = [("channel", "<i2"), ("start", "<i2"), ("end", "<i2"), ("count", "<i8")]
+	for metric in metrics:
+		fields += [(metric + "Mean", "<f8"), (metric + "M2", "<f8")]
+	#
+
+	return np.dtype(fields)
+#
+
+def ComputePartialAggregates(results, metrics = PARTIAL_METRICS):
+	"""
+	Returns the count, mean, and sum of squared deviations from the mean (M2) of every
+	metric for each transition in results, partial aggregates of several files are merged
+	with MergePartialAggregates. Moves that start and end on the same point are dropped
+	"""
+
+	results = results[results["start"] != results["end"]]
+	order, groupStarts, counts = GroupTransitions(results)
+
+	partials = np.empty(len(groupStarts), dtype = GetPartialDtype(metrics))
+	for field in ["channel", "start", "end"]:
+		partials[field] = results[field][order[groupStarts]]
+	#
+	partials["count"] = counts
+
+	if len(order) == 0:
+		return partials
+	#
+
+	groupIndices = np.repeat(np.arange(len(groupStarts)), counts)
+	for metric in metrics:
+		values = np.asarray(results[metric][order], dtype = float)
+
+		means = np.add.reduceat(values, groupStarts)/counts
+		partials[metric + "Mean"] = means
+		partials[metric + "M2"] = np.add.reduceat((values - means[groupIndices])**2, groupStarts)
+	#
+
+	return partials
+#
+
+def MergePartialAggregates(partials, metrics = PARTIAL_METRICS):
+	"""
+	Merges partial aggregates (see ComputePartialAggregates) into one row per transition
+	with the fields channel, start, end, count, and <metric>Mean and <metric>Std for each
+	metric, sorted by channel, start, end
+
+	Partials are combined with Chan et al.'s update, every partial's M2 plus its count times
+	the squared distance of its mean from the combined mean, so the variance is never the
+	difference of two large sums
+	"""
+
+	fields = [("channel", "<i2"), ("start", "<i2"), ("end", "<i2"), ("count", "<i8")]
+	for metric in metrics:
+		fields += [(metric + "Mean", "<f8"), (metric + "Std", "<f8")]
+	#
+
+	if len(partials) == 0:
+		return np.empty(0, dtype = fields)
+	#
+	partials = np.concatenate(partials)
+
+	# - Combining Each Transition's Partials -
+	order, groupStarts, groupSizes = GroupTransitions(partials)
+
+	aggregates = np.empty(len(groupStarts), dtype = fields)
+	for field in ["channel", "start", "end"]:
+		aggregates[field] = partials[field][order[groupStarts]]
+	#
+
+	if len(order) == 0:
+		return aggregates
+	#
+
+	partialCounts = partials["count"][order].astype(float)
+	counts = np.add.reduceat(partials["count"][order], groupStarts)
+	aggregates["count"] = counts
+	groupIndices = np.repeat(np.arange(len(groupStarts)), groupSizes)
+
+	for metric in metrics:
+		partialMeans = partials[metric + "Mean"][order]
+
+		means = np.add.reduceat(partialCounts*partialMeans, groupStarts)/counts
+		m2 = np.add.reduceat(partials[metric + "M2"][order] + partialCounts*(partialMeans - means[groupIndices])**2,
+			groupStarts)
+
+		aggregates[metric + "Mean"] = means
+		aggregates[metric + "Std"] = np.sqrt(m2/counts)
+	#
+
+	return aggregates
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	import sys
+	import time
+
+	# Aggregates folders of results files, run twice to see the cache at work
+	folders = sys.argv[1:] if len(sys.argv) > 1 else ["DefaultConfiguration", "ClampedConfiguration"]
+
+	aggregationCache = AggregationCache()
+
+	startTime = time.perf_counter()
+	aggregates = aggregationCache.AggregateFolders(folders)
+	elapsedTime = time.perf_counter() - startTime
+
+	print(f"{len(aggregates)} transitions from {folders}, parsed {aggregationCache.numberOfFilesParsed} files ({1000*elapsedTime:.1f} ms)")
+#
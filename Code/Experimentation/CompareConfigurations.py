@@ -0,0 +1,356 @@
+# ----- Imports -----
+# Utility
+import matplotlib.colors
+import matplotlib.figure
+import numpy as np
+import scipy.stats
+
+# Readability
+from typing import List
+
+# My Code
+from AggregationCache import AggregationCache
+from PlotExperimentResults import CreateTriangulation
+from ResultsStore import GroupTransitions
+
+# ----- Global Values -----
+# Metrics compared between configurations, lower is better for both
+COMPARISON_METRICS = ("time", "overshoot")
+
+# ----- Methods and Functions -----
+# --- Bootstrapping ---
+def GroupResults(results):
+	"""
+	Returns results without stationary moves, sorted by transition, with the keys
+	(channel x start x end array), start index, and count of every transition
+	"""
+
+	results = results[results["start"] != results["end"]]
+	order, groupStarts, counts = GroupTransitions(results)
+	results = results[order]
+
+	keys = np.stack([results["channel"][groupStarts], results["start"][groupStarts], results["end"][groupStarts]], axis = 1)
+
+	return results, keys, groupStarts, counts
+#
+
+def BootstrapMeans(values, groupStarts, counts, numberOfResamples, random):
+	"""
+	Resamples the moves of every transition with replacement, all transitions and all
+	resamples at once. Returns the mean of every resample (resamples x transitions)
+
+	Each transition's values are spread about their mean by sqrt(n/(n - 1)) before they
+	are drawn, otherwise with only a few repeats per transition the resampled means vary
+	less than the real ones do (by a factor of (n - 1)/n in variance)
+
+	values : values sorted by transition
+	groupStarts : index of each transition's first value (every transition needs at
+		least two values)
+	counts : number of values of each transition
+	random : numpy random generator
+	"""
+
+	# Every transition's values side by side, one slot per value
+	slotGroupStarts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+	offsets = np.arange(np.sum(counts)) - np.repeat(slotGroupStarts, counts)
+	values = values[np.repeat(groupStarts, counts) + offsets]
+
+	# Inflating the deviations from each transition's mean
+	slotMeans = np.repeat(np.add.reduceat(values, slotGroupStarts)/counts, counts)
+	slotCounts = np.repeat(counts, counts)
+	values = slotMeans + (values - slotMeans)*np.sqrt(slotCounts/(slotCounts - 1))
+
+	# Every slot draws from its own transition
+	draws = np.repeat(slotGroupStarts, counts) + np.floor(random.random((numberOfResamples, len(values)))*slotCounts).astype(int)
+
+	return np.add.reduceat(values[draws], slotGroupStarts, axis = 1)/counts
+#
+
+# --- Testing Each Transition ---
+def GetGroupMeansAndVariances(values, groupStarts, counts):
+	"""
+	Returns the mean and sample variance (n - 1 in the denominator) of every transition
+	"""
+
+	groupIndices = np.repeat(np.arange(len(groupStarts)), counts)
+	means = np.add.reduceat(values, groupStarts)/counts
+	variances = np.add.reduceat((values - means[groupIndices])**2, groupStarts)/(counts - 1)
+
+	return means, variances
+#
+
+def WelchTest(baselineMeans, baselineVariances, baselineCounts, candidateMeans, candidateVariances,
+		candidateCounts, confidenceLevel):
+	"""
+	Welch's t test of candidate - baseline for every transition, which doesn't assume the
+	configurations are equally noisy. Returns (difference, lower, upper, pValue)
+	"""
+
+	baselineTerms = baselineVariances/baselineCounts
+	candidateTerms = candidateVariances/candidateCounts
+	standardErrors = np.sqrt(baselineTerms + candidateTerms)
+
+	# Welch-Satterthwaite degrees of freedom
+	with np.errstate(divide = "ignore", invalid = "ignore"):
+		degreesOfFreedom = (baselineTerms + candidateTerms)**2 \
+			/(baselineTerms**2/(baselineCounts - 1) + candidateTerms**2/(candidateCounts - 1))
+	#
+	# Transitions whose repeats all agree have no spread to estimate, the most
+	# conservative degrees of freedom are used
+	degreesOfFreedom = np.where(np.isfinite(degreesOfFreedom), degreesOfFreedom,
+		np.minimum(baselineCounts, candidateCounts) - 1)
+
+	differences = candidateMeans - baselineMeans
+	halfWidths = scipy.stats.t.ppf(1 - (1 - confidenceLevel)/2, degreesOfFreedom)*standardErrors
+
+	with np.errstate(divide = "ignore", invalid = "ignore"):
+		tValues = differences/standardErrors
+	#
+	pValues = 2*scipy.stats.t.sf(np.abs(tValues), degreesOfFreedom)
+	# Without any spread a difference is either certain or there is none
+	pValues = np.where(standardErrors > 0, pValues, np.where(differences == 0, 1.0, 0.0))
+
+	return differences, differences - halfWidths, differences + halfWidths, pValues
+#
+
+def AdjustPValues(pValues):
+	"""
+	Returns Benjamini-Hochberg adjusted p values, a transition is significant at a false
+	discovery rate of q when its adjusted p value is below q
+	"""
+
+	numberOfTests = len(pValues)
+	if numberOfTests == 0:
+		return pValues
+	#
+
+	order = np.argsort(pValues)
+	scaled = pValues[order]*numberOfTests/np.arange(1, numberOfTests + 1)
+
+	# Each adjusted value is the smallest scaled value at or after its rank
+	adjusted = np.empty(numberOfTests)
+	adjusted[order] = np.minimum(np.minimum.accumulate(scaled[::-1])[::-1], 1)
+
+	return adjusted
+#
+
+def CompareResults(baselineResults, candidateResults, metrics = COMPARISON_METRICS,
+		numberOfResamples = 2000, confidenceLevel = 0.95, minimumCount = 2, seed = None):
+	"""
+	Compares two result sets (see ResultsStore) transition by transition. For every
+	transition measured at least minimumCount times in both, the difference in mean
+	(candidate - baseline) of each metric is reported with a Welch t interval and p value.
+	The p values are adjusted for the number of transitions tested (Benjamini-Hochberg,
+	false discovery rate of 1 - confidenceLevel) before transitions are counted as better
+	or worse. The average difference over all compared transitions gets a bootstrap
+	confidence interval
+
+	Returns (comparison, summary). comparison is a structured array with one row per
+	compared transition and the fields channel, start, end, baselineCount, candidateCount,
+	and for each metric <metric>Difference, <metric>Lower, <metric>Upper,
+	<metric>PValue, <metric>AdjustedPValue. summary maps each metric to (meanDifference,
+	lower, upper, numberBetter, numberWorse), where better and worse count the transitions
+	significantly below or above zero after the adjustment
+
+	numberOfResamples : bootstrap resamples of the average difference
+	confidenceLevel : coverage of the confidence intervals
+	minimumCount : fewest repeats a transition needs in both result sets to be compared,
+		at least 2 so its spread can be estimated
+	seed (optional) : seed for the resampling
+	"""
+
+	random = np.random.default_rng(seed)
+	minimumCount = max(minimumCount, 2)
+
+	baselineResults, baselineKeys, baselineStarts, baselineCounts = GroupResults(baselineResults)
+	candidateResults, candidateKeys, candidateStarts, candidateCounts = GroupResults(candidateResults)
+
+	# --- Matching Transitions ---
+	# Both are sorted by key, so shared keys line up in order
+	baselineKeyView = np.ascontiguousarray(baselineKeys).view([("", baselineKeys.dtype)]*3).ravel()
+	candidateKeyView = np.ascontiguousarray(candidateKeys).view([("", candidateKeys.dtype)]*3).ravel()
+	shared, baselineShared, candidateShared = np.intersect1d(baselineKeyView, candidateKeyView, return_indices = True)
+
+	# Too few repeats to say how noisy a transition is
+	isRepeated = (baselineCounts[baselineShared] >= minimumCount) & (candidateCounts[candidateShared] >= minimumCount)
+	baselineShared = baselineShared[isRepeated]
+	candidateShared = candidateShared[isRepeated]
+
+	fields = [("channel", "<i2"), ("start", "<i2"), ("end", "<i2"), ("baselineCount", "<i8"), ("candidateCount", "<i8")]
+	for metric in metrics:
+		fields += [(metric + "Difference", "<f8"), (metric + "Lower", "<f8"), (metric + "Upper", "<f8"),
+			(metric + "PValue", "<f8"), (metric + "AdjustedPValue", "<f8")]
+	#
+
+	comparison = np.empty(len(baselineShared), dtype = fields)
+	comparison["channel"] = baselineKeys[baselineShared, 0]
+	comparison["start"] = baselineKeys[baselineShared, 1]
+	comparison["end"] = baselineKeys[baselineShared, 2]
+	comparison["baselineCount"] = baselineCounts[baselineShared]
+	comparison["candidateCount"] = candidateCounts[candidateShared]
+
+	summary = dict()
+	if len(baselineShared) == 0:
+		return comparison, summary
+	#
+
+	# --- Testing Every Metric ---
+	tail = 100*(1 - confidenceLevel)/2
+	falseDiscoveryRate = 1 - confidenceLevel
+	for metric in metrics:
+		baselineValues = np.asarray(baselineResults[metric], dtype = float)
+		candidateValues = np.asarray(candidateResults[metric], dtype = float)
+
+		# - Each Transition -
+		baselineMeans, baselineVariances = GetGroupMeansAndVariances(baselineValues, baselineStarts, baselineCounts)
+		candidateMeans, candidateVariances = GetGroupMeansAndVariances(candidateValues, candidateStarts, candidateCounts)
+
+		differences, lower, upper, pValues = WelchTest(
+			baselineMeans[baselineShared], baselineVariances[baselineShared], baselineCounts[baselineShared],
+			candidateMeans[candidateShared], candidateVariances[candidateShared], candidateCounts[candidateShared],
+			confidenceLevel)
+		adjustedPValues = AdjustPValues(pValues)
+
+		comparison[metric + "Difference"] = differences
+		comparison[metric + "Lower"] = lower
+		comparison[metric + "Upper"] = upper
+		comparison[metric + "PValue"] = pValues
+		comparison[metric + "AdjustedPValue"] = adjustedPValues
+
+		# - Average Over All Compared Transitions -
+		# Only the compared transitions are resampled
+		baselineBootstrap = BootstrapMeans(baselineValues, baselineStarts[baselineShared], baselineCounts[baselineShared],
+			numberOfResamples, random)
+		candidateBootstrap = BootstrapMeans(candidateValues, candidateStarts[candidateShared], candidateCounts[candidateShared],
+			numberOfResamples, random)
+		overallLower, overallUpper = np.percentile(np.mean(candidateBootstrap - baselineBootstrap, axis = 1), [tail, 100 - tail])
+
+		isSignificant = adjustedPValues < falseDiscoveryRate
+		summary[metric] = (float(np.mean(differences)), float(overallLower), float(overallUpper),
+			int(np.sum(isSignificant & (differences < 0))), int(np.sum(isSignificant & (differences > 0))))
+	#
+
+	return comparison, summary
+#
+
+# --- Reporting ---
+def PrintSummary(baselineName, candidateName, summary, numberOfTransitions, confidenceLevel = 0.95):
+	"""
+	Prints the summary of CompareResults as a table
+	"""
+
+	print(f"{candidateName} vs {baselineName} ({numberOfTransitions} compared transitions, {100*confidenceLevel:g}% intervals," \
+		+ f" better and worse at a {100*(1 - confidenceLevel):g}% false discovery rate)")
+	print(f"{'Metric':>10} | {'Difference':>10} | {'Interval':>21} | {'Better':>6} | {'Worse':>6}")
+	for metric, (meanDifference, lower, upper, numberBetter, numberWorse) in summary.items():
+		print(f"{metric:>10} | {meanDifference:10.3f} | [{lower:8.3f}, {upper:8.3f}] | {numberBetter:6} | {numberWorse:6}")
+	#
+#
+
+def SaveComparison(fileName, comparison):
+	"""
+	Saves the per transition comparison as a CSV file
+	"""
+
+	np.savetxt(fileName, comparison, delimiter = ",", header = ",".join(comparison.dtype.names), comments = "",
+		fmt = ["%d"]*5 + ["%.6g"]*(len(comparison.dtype.names) - 5))
+#
+
+def PlotComparison(figureTitle, filename, comparison, metrics = COMPARISON_METRICS, channels = (0, 1),
+		confidenceLevel = 0.95):
+	"""
+	Plots the difference (candidate - baseline) of every metric for every knob as a
+	heatmap, blue where the candidate is faster or overshoots less. Transitions that
+	differ significantly after the adjustment for multiple comparisons (see
+	CompareResults) are marked with filled points
+	"""
+
+	fig = matplotlib.figure.Figure()
+	axs = fig.subplots(len(metrics), len(channels), squeeze = False)
+	fig.suptitle(figureTitle)
+	fig.set_size_inches(1.25*fig.get_size_inches())
+
+	labels = {"time": "Settling Time Difference (s)", "overshoot": "Overshoot Difference"}
+	for column, channel in enumerate(channels):
+		knobComparison = comparison[comparison["channel"] == channel]
+		if len(knobComparison) < 3:
+			continue
+		#
+
+		# One triangulation for every panel of the knob
+		triangulation = CreateTriangulation(knobComparison)
+
+		for row, metric in enumerate(metrics):
+			ax = axs[row, column]
+			ax.set_title(f"Knob {channel} {metric.capitalize()}")
+			ax.set_xlabel("Starting Position")
+			ax.set_ylabel("Ending Position")
+
+			# Centered on no difference
+			differences = knobComparison[metric + "Difference"]
+			limit = max(np.max(np.abs(differences)), 1e-9)
+			trpColor = ax.tripcolor(triangulation, differences, shading = 'gouraud', cmap = "RdBu_r",
+				norm = matplotlib.colors.Normalize(-limit, limit))
+			fig.colorbar(trpColor, ax = ax, label = labels.get(metric, metric))
+
+			significant = knobComparison[metric + "AdjustedPValue"] < (1 - confidenceLevel)
+			ax.plot(triangulation.x[~significant], triangulation.y[~significant], linewidth = 0, marker = ".",
+				color = "k", fillstyle = "none")
+			ax.plot(triangulation.x[significant], triangulation.y[significant], linewidth = 0, marker = "o",
+				markersize = 4, color = "k")
+		#
+	#
+
+	fig.tight_layout()
+	fig.savefig(filename)
+#
+
+def CompareConfigurations(configurations, numberOfResamples = 2000, confidenceLevel = 0.95, minimumCount = 2,
+		seed = 0, aggregationCache: AggregationCache = None):
+	"""
+	Compares every configuration with the first, prints a summary table of each, and saves
+	a CSV and a difference heatmap named after each candidate. Returns the list of
+	(comparison, summary)
+
+	configurations : list of (name, folders, filename), folders is a list of folders of
+		ExperimentResults files and filename is the stem of the files to save
+	"""
+
+	if aggregationCache is None:
+		aggregationCache = AggregationCache()
+	#
+
+	baselineName, baselineFolders, baselineFilename = configurations[0]
+	baselineResults = aggregationCache.LoadFolderColumns(baselineFolders, memoryMap = False)
+
+	comparisons: List[tuple] = []
+	for candidateName, candidateFolders, candidateFilename in configurations[1:]:
+		candidateResults = aggregationCache.LoadFolderColumns(candidateFolders, memoryMap = False)
+
+		comparison, summary = CompareResults(baselineResults, candidateResults, numberOfResamples = numberOfResamples,
+			confidenceLevel = confidenceLevel, minimumCount = minimumCount, seed = seed)
+		comparisons.append((comparison, summary))
+
+		PrintSummary(baselineName, candidateName, summary, len(comparison), confidenceLevel)
+		SaveComparison(candidateFilename + "Comparison.csv", comparison)
+		PlotComparison(f"{candidateName} - {baselineName}", candidateFilename + "Comparison", comparison,
+			confidenceLevel = confidenceLevel)
+	#
+
+	return comparisons
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	import time
+
+	# (name, folders, filename), every configuration is compared with the first
+	configurations = [
+		("Without I Term Clamping", ["DefaultConfiguration"], "default"),
+		("With I Term Clamping", ["ClampedConfiguration"], "clamped"),
+	]
+
+	startTime = time.perf_counter()
+	CompareConfigurations(configurations)
+	print(f"Compared {len(configurations)} configurations in {time.perf_counter() - startTime:.2f} s")
+#
@@ -1,14 +1,17 @@
 # ----- Imports -----
 # Utility
 from collections import deque
+import json
 import math
+import multiprocessing
 import numpy as np
+import os
 import random
 import itertools
 
 # Readability
 import time
-from typing import List
+from typing import Dict, List
 
 
 # ----- Methods and Functions -----
@@ -45,12 +48,53 @@ def ConvertPairsIntoPoints(transitionParis):
 	return pointList
 # 
 
+def CreateEulerianCircuit(experimentList, startIndex = 0):
+	"""
+	Returns a list of points that makes every transition between two different points in
+	experimentList (every ordered pair, like itertools.permutations) exactly once.
+
+	Every point has as many transitions into it as out of it, so the transitions form an
+	Eulerian circuit which Hierholzer's algorithm finds in linear time. No transition is
+	repeated, so the plan is optimal for any cost model where the required transitions are
+	all that matter, and the same list always gives the same plan
+
+	experimentList : points to visit
+	startIndex : index of the point to start (and end) at
+	"""
+
+	numberOfPoints = len(experimentList)
+
+	# Transitions that haven't been used yet, out of each point (by index)
+	remainingTransitions = [deque(j for j in range(0, numberOfPoints) if j != i) \
+		for i in range(0, numberOfPoints)]
+
+	# - Hierholzer's Algorithm -
+	# Follow unused transitions until stuck (which can only happen back at the start of the
+	# current loop), then back up to a point that still has unused transitions
+	stack = [startIndex]
+	circuit = []
+	while stack:
+		currentIndex = stack[-1]
+
+		if remainingTransitions[currentIndex]:
+			stack.append(remainingTransitions[currentIndex].popleft())
+		else:
+			circuit.append(stack.pop())
+		# 
+	# 
+	circuit.reverse()
+
+	return [experimentList[index] for index in circuit]
+# 
+
 def OptimizationPass(distance_matrix, x0 = None, exact = False):
 
 	print("")
 	# print(f"X0: {x0}")
 
 	if not exact:
+		from python_tsp.heuristics import solve_tsp_local_search, solve_tsp_simulated_annealing
+
 		permutation, distance = solve_tsp_simulated_annealing(distance_matrix, x0=x0)
 		
 		print("$ : Simulated Annealing Solution:")
@@ -81,6 +125,453 @@ def OptimizationPass(distance_matrix, x0 = None, exact = False):
 	return permutation, distance
 # 
 
+def CreateTransitionGraph(transitionList, idealTransitionCost = 0, extraTransitionCost = 5,
+		identityCost = 10, sparse = False, dtype = None):
+	"""
+	Returns the cost of following each transition with each other transition: identityCost
+	for repeating a transition, idealTransitionCost when the second starts where the first
+	ends, and extraTransitionCost otherwise (a move has to be added between them)
+
+	Built with broadcasting over the start and end points, so thousands of transitions
+	take seconds instead of a python loop over every pair
+
+	transitionList : list of (start, end) pairs
+	sparse : if True a scipy.sparse CSR matrix holding the cost minus extraTransitionCost is
+		returned, every entry that isn't stored costs extraTransitionCost. Only the ideal
+		transitions and the diagonal are stored, roughly one row of points per transition
+	dtype (optional) : data type of the matrix, a smaller type (e.g. np.int16) saves memory
+		for large designs. Picked from the costs if not provided
+	"""
+
+	transitions = np.asarray(transitionList)
+	starts = transitions[:, 0]
+	ends = transitions[:, 1]
+	numberOfTransitions = len(transitions)
+
+	if dtype is None:
+		dtype = np.result_type(idealTransitionCost, extraTransitionCost, identityCost)
+	# 
+
+	if sparse:
+		import scipy.sparse
+
+		# Only store the entries that differ from the extra transition cost. The ideal
+		# transitions out of transition i are the ones starting at its end, found in a
+		# sorted copy of the starts so no dense matrix is ever created
+		startOrder = np.argsort(starts, kind = "stable")
+		sortedStarts = starts[startOrder]
+		firstIndices = np.searchsorted(sortedStarts, ends, side = "left")
+		counts = np.searchsorted(sortedStarts, ends, side = "right") - firstIndices
+
+		rows = np.repeat(np.arange(numberOfTransitions), counts)
+		offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+		columns = startOrder[np.repeat(firstIndices, counts) + offsets]
+
+		# The diagonal is the identity cost, even if a transition starts where it ends
+		notDiagonal = rows != columns
+		rows = rows[notDiagonal]
+		columns = columns[notDiagonal]
+		values = np.full(len(rows), idealTransitionCost - extraTransitionCost, dtype = dtype)
+
+		diagonal = np.arange(numberOfTransitions)
+		rows = np.concatenate([rows, diagonal])
+		columns = np.concatenate([columns, diagonal])
+		values = np.concatenate([values, np.full(numberOfTransitions, identityCost - extraTransitionCost, dtype = dtype)])
+
+		return scipy.sparse.csr_matrix((values, (rows, columns)), shape = (numberOfTransitions, numberOfTransitions))
+	# 
+
+	# Transition i ends where transition j starts
+	isIdealTransition = ends[:, None] == starts[None, :]
+
+	transitionGraph = np.full((numberOfTransitions, numberOfTransitions), extraTransitionCost, dtype = dtype)
+	transitionGraph[isIdealTransition] = idealTransitionCost
+	np.fill_diagonal(transitionGraph, identityCost)
+
+	return transitionGraph
+# 
+
+def PlanWithAnnealing(transitionList, idealTransitionCost = 0, extraTransitionCost = 5,
+		identityCost = 10, numberOfCycles = 1, maxValue = 255):
+	"""
+	Orders the transitions by solving them as a travelling salesman problem with
+	python_tsp (simulated annealing followed by local search). Returns the list of points
+	and the cost of the plan
+
+	Slow and not guaranteed optimal, CreateEulerianCircuit is better unless transitions
+	have different costs
+	"""
+
+	# --- Creating TSP Problem ---
+	# Computing Weight Matrix
+	transitionGraph = CreateTransitionGraph(transitionList, idealTransitionCost,
+		extraTransitionCost, identityCost)
+
+	print(f"There are {transitionGraph.size} elements in the cost graph.")
+
+	# print("Cost Graph:")
+	# print(transitionGraph)
+
+	# --- Example Problem ---
+	# distance_matrix = np.array([
+	# 	[0,  5, 4, 10],
+	# 	[5,  0, 8,  5],
+	# 	[4,  8, 0,  3],
+	# 	[10, 5, 3,  0]
+	# ])
+	# permutation, distance = solve_tsp_local_search(distance_matrix)
+
+	# --- My Problem ---
+	distance_matrix = transitionGraph
+
+	bestDistance = maxValue
+	previousBestDistance = maxValue
+	permutation = None
+	bestPermutation = None
+	
+	for i in range(0, numberOfCycles):
+		print(f"\t\t Pass # {i}")
+		
+		permutation, distance = OptimizationPass(distance_matrix)
+
+		if (distance > bestDistance):
+			break
+		# 
+
+		bestDistance = min(distance, bestDistance)
+
+		# If a better result was found save the new permutation
+		if bestDistance < previousBestDistance:
+			bestPermutation = permutation
+			bestResult = (bestDistance, bestPermutation)
+		# 
+		
+		previousBestDistance = bestDistance
+	# 
+
+	distance, permutation = bestResult
+
+	print("!!!\\")
+	print(f"Best Result with Cost of {distance}: {permutation}")
+	print("!!!/")
+	print("")
+
+	# --- Converting Back to Point List ---
+	optimalTransitions = [transitionList[index] for index in permutation]
+
+	print(f"~~~ Optimal Transition Pairs: {optimalTransitions}")
+	
+	listOfPoints = ConvertPairsIntoPoints(optimalTransitions)
+
+	print(f"~~~ Order to Traverse {len(listOfPoints)} Points: {listOfPoints}")
+
+	return listOfPoints, distance
+# 
+
+# --- Planning With Move Times ---
+def LoadMoveTimes(folders):
+	"""
+	Returns the average time of every move (startSetpoint, endSetpoint) recorded in the
+	ExperimentResults files in folders, across every knob and every run
+
+	folders : folders holding ExperimentResults_*.json files
+	"""
+
+	allTimes: Dict[tuple, List[float]] = dict()
+
+	for folder in folders:
+		for name in sorted(os.listdir(folder)):
+			if not name.endswith(".json"):
+				continue
+			# 
+
+			with open(os.path.join(folder, name)) as jsonFile:
+				resultsDictionary = json.load(jsonFile)
+			# 
+
+			for knobLogs in resultsDictionary.values():
+				for log in knobLogs:
+					# Moves that don't go anywhere aren't interesting
+					if log["startSetpoint"] == log["endSetpoint"]:
+						continue
+					# 
+
+					key = (log["startSetpoint"], log["endSetpoint"])
+					allTimes.setdefault(key, []).append(log["time"])
+				# 
+			# 
+		# 
+	# 
+
+	return {key: float(np.mean(times)) for key, times in allTimes.items()}
+# 
+
+def FitMoveTimeModel(moveTimes: Dict[tuple, float]):
+	"""
+	Fits time = intercept + slope*|end - start| to measured move times, returns
+	(intercept, slope). Used for moves that haven't been measured
+	"""
+
+	distances = np.array([abs(end - start) for start, end in moveTimes.keys()], dtype = float)
+	times = np.array(list(moveTimes.values()), dtype = float)
+
+	slope, intercept = np.polyfit(distances, times, 1)
+
+	return float(intercept), float(slope)
+# 
+
+def CreateMoveTimeMatrix(points, moveTimes: Dict[tuple, float] = None, model = None):
+	"""
+	Returns the expected time to move from each point to each other point. Measured
+	averages are used where they exist, the fitted model everywhere else
+
+	points : list of points, the matrix is indexed the same way
+	moveTimes (optional) : measured average times (see LoadMoveTimes)
+	model (optional) : (intercept, slope) of a fitted model (see FitMoveTimeModel), fitted
+		to moveTimes if not provided
+	"""
+
+	if moveTimes is None:
+		moveTimes = dict()
+	# 
+	if model is None:
+		model = FitMoveTimeModel(moveTimes)
+	# 
+	intercept, slope = model
+
+	points = np.asarray(points, dtype = float)
+	moveTimeMatrix = intercept + slope*np.abs(points[None, :] - points[:, None])
+
+	for i in range(0, len(points)):
+		for j in range(0, len(points)):
+			key = (int(points[i]), int(points[j]))
+			if key in moveTimes:
+				moveTimeMatrix[i, j] = moveTimes[key]
+			# 
+		# 
+	# 
+	np.fill_diagonal(moveTimeMatrix, 0)
+
+	return moveTimeMatrix
+# 
+
+def PlanTransitions(requiredTransitions, points, moveTimeMatrix, seed = None, noiseMagnitude = 0.1):
+	"""
+	Builds one plan that makes every required transition, adding the connecting moves
+	that cost the least expected time. Returns (listOfPoints, expectedTime)
+
+	Every point needs as many moves into it as out of it for the moves to be chained
+	without gaps, so the cheapest connecting moves that balance them are chosen with an
+	assignment solver, separate groups of points are joined, and the result is walked
+	with Hierholzer's algorithm. The plan is then opened at its most expensive connecting
+	move, which never needs to be made
+
+	requiredTransitions : list of (start, end) pairs, repeats are allowed
+	points : points the transitions use, indexes moveTimeMatrix
+	moveTimeMatrix : expected move time between each pair of points
+	seed (optional) : seed for the random perturbations, the plan with no seed is not
+		perturbed
+	noiseMagnitude : size of the random perturbation of the connecting move times
+		(relative to their mean), which varies the plans found between starts
+	"""
+
+	from scipy.optimize import linear_sum_assignment
+
+	random = np.random.default_rng(seed)
+	numberOfPoints = len(points)
+	pointIndices = {point: index for index, point in enumerate(points)}
+
+	# Required moves out of each point
+	edges: List[List[int]] = [[] for i in range(0, numberOfPoints)]
+	for start, end in requiredTransitions:
+		edges[pointIndices[start]].append(pointIndices[end])
+	# 
+	connectingEdges = set()
+
+	# --- Balancing Moves In and Out ---
+	movesOut = np.array([len(edges[i]) for i in range(0, numberOfPoints)])
+	movesIn = np.bincount([end for i in range(0, numberOfPoints) for end in edges[i]], minlength = numberOfPoints)
+
+	# Points that are left more often than they are entered need extra moves into them
+	# and the other way around
+	needsMoveOut = np.repeat(np.arange(numberOfPoints), np.clip(movesIn - movesOut, 0, None))
+	needsMoveIn = np.repeat(np.arange(numberOfPoints), np.clip(movesOut - movesIn, 0, None))
+
+	if len(needsMoveOut) > 0:
+		costs = moveTimeMatrix[needsMoveOut[:, None], needsMoveIn[None, :]]
+		if seed is not None:
+			costs = costs + noiseMagnitude*np.mean(moveTimeMatrix)*random.random(costs.shape)
+		# 
+
+		rows, columns = linear_sum_assignment(costs)
+		for row, column in zip(rows, columns):
+			edges[needsMoveOut[row]].append(needsMoveIn[column])
+			connectingEdges.add((needsMoveOut[row], needsMoveIn[column]))
+		# 
+	# 
+
+	# --- Joining Separate Groups of Points ---
+	# Find the groups of points connected by moves
+	groupOf = -np.ones(numberOfPoints, dtype = int)
+	groups: List[List[int]] = []
+	for i in range(0, numberOfPoints):
+		if (groupOf[i] >= 0) or (len(edges[i]) == 0):
+			continue
+		# 
+
+		group = [i]
+		groupOf[i] = len(groups)
+		queue = deque([i])
+		while queue:
+			current = queue.popleft()
+			neighbors = edges[current] + [j for j in range(0, numberOfPoints) if current in edges[j]]
+			for neighbor in neighbors:
+				if groupOf[neighbor] < 0:
+					groupOf[neighbor] = len(groups)
+					group.append(neighbor)
+					queue.append(neighbor)
+				# 
+			# 
+		# 
+		groups.append(group)
+	# 
+
+	# Join the groups in a random order with the cheapest round trip between them
+	groupOrder = list(range(0, len(groups)))
+	if seed is not None:
+		random.shuffle(groupOrder)
+	# 
+	for first, second in zip(groupOrder[:-1], groupOrder[1:]):
+		firstGroup = np.array(groups[first])[:, None]
+		secondGroup = np.array(groups[second])[None, :]
+		roundTrips = moveTimeMatrix[firstGroup, secondGroup] + moveTimeMatrix[secondGroup, firstGroup]
+
+		u, v = np.unravel_index(np.argmin(roundTrips), roundTrips.shape)
+		u, v = groups[first][u], groups[second][v]
+		edges[u].append(v)
+		edges[v].append(u)
+		connectingEdges.add((u, v))
+		connectingEdges.add((v, u))
+	# 
+
+	# --- Walking the Moves ---
+	if seed is not None:
+		for i in range(0, numberOfPoints):
+			random.shuffle(edges[i])
+		# 
+	# 
+	remainingEdges = [deque(edges[i]) for i in range(0, numberOfPoints)]
+
+	startIndex = pointIndices[requiredTransitions[0][0]]
+	stack = [startIndex]
+	circuit = []
+	while stack:
+		currentIndex = stack[-1]
+
+		if remainingEdges[currentIndex]:
+			stack.append(remainingEdges[currentIndex].popleft())
+		else:
+			circuit.append(stack.pop())
+		# 
+	# 
+	circuit.reverse()
+
+	# --- Opening the Circuit ---
+	# Start just after the most expensive connecting move so it can be dropped
+	moveTimes = [moveTimeMatrix[circuit[k], circuit[k + 1]] for k in range(0, len(circuit) - 1)]
+	connectingMoves = [k for k in range(0, len(circuit) - 1) if (circuit[k], circuit[k + 1]) in connectingEdges]
+	if connectingMoves:
+		dropped = max(connectingMoves, key = lambda k: moveTimes[k])
+		circuit = circuit[dropped + 1:] + circuit[1:dropped + 1]
+	# 
+
+	listOfPoints = [points[index] for index in circuit]
+	expectedTime = float(sum(moveTimeMatrix[circuit[k], circuit[k + 1]] for k in range(0, len(circuit) - 1)))
+
+	return listOfPoints, expectedTime
+# 
+
+def PlanTransitionsWorker(arguments):
+	"""
+	Pool worker, runs PlanTransitions for one seed
+
+	arguments : tuple of (requiredTransitions, points, moveTimeMatrix, seed)
+	"""
+
+	return PlanTransitions(*arguments)
+# 
+
+def PlanWithMoveTimes(requiredTransitions, moveTimeMatrix, points, numberOfStarts = 32,
+		numberOfProcesses = None):
+	"""
+	Plans the required transitions to take the least expected bench time, using the
+	measured (or modelled) move times as the cost of each move. PlanTransitions is run from
+	numberOfStarts different random starts across a pool of processes and the fastest plan
+	is returned as (listOfPoints, expectedTime)
+
+	When every ordered pair is required no connecting moves are needed and the plan is an
+	Eulerian circuit, this pays off when only some transitions are needed (repeating the
+	noisiest ones, or finishing an interrupted experiment)
+
+	requiredTransitions : list of (start, end) pairs, repeats are allowed
+	moveTimeMatrix : expected move time between each pair of points (see CreateMoveTimeMatrix)
+	points : points indexing moveTimeMatrix
+	numberOfStarts : number of plans to build, the first is unperturbed
+	numberOfProcesses (optional) : size of the process pool, defaults to the CPU count
+	"""
+
+	workItems = [(requiredTransitions, points, moveTimeMatrix, None)]
+	workItems += [(requiredTransitions, points, moveTimeMatrix, seed) for seed in range(1, numberOfStarts)]
+
+	with multiprocessing.Pool(numberOfProcesses) as pool:
+		plans = pool.map(PlanTransitionsWorker, workItems)
+	# 
+
+	return min(plans, key = lambda plan: plan[1])
+# 
+
+# --- Plans for Several Knobs ---
+def CreateKnobPlans(listOfPoints, numberOfKnobs, splitTransitions = False):
+	"""
+	Returns one list of points per knob, all the same length so the knobs can be driven
+	through them in lockstep
+
+	By default every knob makes every transition in listOfPoints, but each starts a
+	different fraction of the way through the plan, so the knobs are never making the same
+	transition at the same time. If listOfPoints isn't a closed circuit each shifted plan
+	needs one extra move where it wraps around.
+
+	splitTransitions : if True the transitions are split between the knobs instead, each
+		knob covers a different part of the plan, so (treating the knobs as identical)
+		every transition is covered in 1/numberOfKnobs of the time
+	"""
+
+	transitionPairs = list(zip(listOfPoints[:-1], listOfPoints[1:]))
+	numberOfTransitions = len(transitionPairs)
+
+	knobPlans: List[list] = []
+	for knobNumber in range(0, numberOfKnobs):
+		if splitTransitions:
+			firstTransition = knobNumber*numberOfTransitions//numberOfKnobs
+			lastTransition = (knobNumber + 1)*numberOfTransitions//numberOfKnobs
+			knobTransitions = transitionPairs[firstTransition:lastTransition]
+		else:
+			shift = knobNumber*numberOfTransitions//numberOfKnobs
+			knobTransitions = transitionPairs[shift:] + transitionPairs[:shift]
+		# 
+
+		knobPlans.append(ConvertPairsIntoPoints(knobTransitions))
+	# 
+
+	# Shorter plans wait at their last point, stationary moves are ignored by the analysis
+	planLength = max(len(knobPlan) for knobPlan in knobPlans)
+	for knobPlan in knobPlans:
+		knobPlan.extend([knobPlan[-1]]*(planLength - len(knobPlan)))
+	# 
+
+	return knobPlans
+# 
+
 # ----- Utility Classes -----
 
 # ----- Begin Program -----
@@ -145,120 +636,77 @@ if __name__ == "__main__":
 	numberOfTransitions = len(transitionList)
 	print(f"A minimum of {numberOfTransitions} transitions is required: {transitionList}")
 
-	# --- Creating TSP Problem ---
 	# Graph costs
 	idealTransitionCost = 0
 	extraTransitionCost = 5
 	identityCost = 10
 
-	# Computing Weight Matrix
-	transitionGraph =np.zeros((numberOfTransitions, numberOfTransitions)).tolist()
-
-	permutationCount = 0
-	for i in range(0, numberOfTransitions):
-		x1, y1 = transitionList[i]
-		
-		for j in range(0, numberOfTransitions):
-			x2, y2 = transitionList[j]
-
-			isIdentity = (x1 == x2) and (y1 == y2)
-			isIdealTransition = (y1 == x2)
-
-			if isIdentity:
-				transitionCost = identityCost
-			elif isIdealTransition:
-				transitionCost = idealTransitionCost
-			else:
-				transitionCost = extraTransitionCost
-			# 
-
-			# print(f"Transition: {permutationCount:5} | From ({x1:3},{y1:3}) to ({x2:3},{y2:3})", end = "")
-			# print(f" | Cost: {transitionCost}")
-			
-			permutationCount += 1
-
-			transitionGraph[i][j] = transitionCost
-		# 
-	# 
-
-	print(f"There are {permutationCount} elements in the cost graph.")
-
-	# print("Cost Graph:")
-	# print(transitionGraph)
-
-	# --- Example Problem ---
-	from python_tsp.heuristics import solve_tsp_local_search, solve_tsp_simulated_annealing, solve_tsp_lin_kernighan, solve_tsp_record_to_record
-
-	# distance_matrix = np.array([
-	# 	[0,  5, 4, 10],
-	# 	[5,  0, 8,  5],
-	# 	[4,  8, 0,  3],
-	# 	[10, 5, 3,  0]
-	# ])
-	# permutation, distance = solve_tsp_local_search(distance_matrix)
-
-	# --- My Problem ---
-	# Converting the graph into a numpy array
-	distance_matrix = np.array(transitionGraph)
-
-	bestDistance = maxValue
-	previousBestDistance = maxValue
-	permutation = None
-	bestPermutation = None
-	
-	numberOfCycles = 1
-	for i in range(0, numberOfCycles):
-		print(f"\t\t Pass # {i}")
-		
-		permutation, distance = OptimizationPass(distance_matrix)
-
-		if (distance > bestDistance):
-			break
-		# 
-
-		bestDistance = min(distance, bestDistance)
-
-		# If a better result was found save the new permutation
-		if bestDistance < previousBestDistance:
-			bestPermutation = permutation
-			bestResult = (bestDistance, bestPermutation)
-		# 
-		
-		previousBestDistance = bestDistance
+	# --- Choosing Planner ---
+	# "eulerian" : every transition exactly once, optimal and instant when all transitions
+	#	cost the same (the default)
+	# "annealing" : solves the transitions as a TSP with python_tsp, only worth it for
+	#	non-uniform cost models
+	# "moveTime" : uses the move times measured in resultsFolders as the cost of each move
+	#	and minimizes the expected bench time
+	planner = "eulerian"
+	resultsFolders = ["DefaultConfiguration", "ClampedConfiguration"]
+
+	# Each knob gets its own phase shifted plan (see CreateKnobPlans)
+	numberOfKnobs = 2
+	splitTransitions = False
+
+	if planner == "eulerian":
+		listOfPoints = CreateEulerianCircuit(experimentList)
+
+		# Every transition beyond the required ones is an extra one
+		numberOfExtraTransitions = len(listOfPoints) - 1 - numberOfTransitions
+		distance = extraTransitionCost*numberOfExtraTransitions
+
+		coveredTransitions = set(zip(listOfPoints[:-1], listOfPoints[1:]))
+		print(f"Eulerian Circuit: {len(coveredTransitions)} of {numberOfTransitions} transitions covered" \
+			+ f" with {numberOfExtraTransitions} extra transitions")
+		print(f"~~~ Order to Traverse {len(listOfPoints)} Points: {listOfPoints}")
+	elif planner == "moveTime":
+		moveTimes = LoadMoveTimes(resultsFolders)
+		points = sorted(set(experimentList))
+		moveTimeMatrix = CreateMoveTimeMatrix(points, moveTimes)
+
+		listOfPoints, expectedTime = PlanWithMoveTimes(transitionList, moveTimeMatrix, points)
+
+		numberOfExtraTransitions = len(listOfPoints) - 1 - numberOfTransitions
+		distance = extraTransitionCost*numberOfExtraTransitions
+
+		print(f"Expected Bench Time: {expectedTime/60:6.1f} minutes with {numberOfExtraTransitions} extra transitions")
+		print(f"~~~ Order to Traverse {len(listOfPoints)} Points: {listOfPoints}")
+	else:
+		listOfPoints, distance = PlanWithAnnealing(transitionList, idealTransitionCost,
+			extraTransitionCost, identityCost)
 	# 
 
-	distance, permutation = bestResult
-
-	print("!!!\\")
-	print(f"Best Result with Cost of {distance}: {permutation}")
-	print("!!!/")
-	print("")
-
-	# --- Converting Back to Point List ---
-	optimalTransitions = [transitionList[index] for index in permutation]
-
-	print(f"~~~ Optimal Transition Pairs: {optimalTransitions}")
-	
-	listOfPoints = ConvertPairsIntoPoints(optimalTransitions)
-
-	print(f"~~~ Order to Traverse {len(listOfPoints)} Points: {listOfPoints}")
+	# --- Plans for Each Knob ---
+	knobPlans = CreateKnobPlans(listOfPoints, numberOfKnobs, splitTransitions)
+	print(f"~~~ {numberOfKnobs} Knob Plans of {len(knobPlans[0])} Points: {knobPlans}")
 
 	# --- Saving Results ---
 	# Converting to default python datatypes (only if necessary)
 	distance = int(distance)
+	knobPlans = [[int(point) for point in knobPlan] for knobPlan in knobPlans]
 
 	# Saving Results as a Dictionary
 	experimentDict = dict()
 	experimentDict["numberOfPoints"] = len(listOfPoints)
 	experimentDict["pointList"] = listOfPoints
 	experimentDict["distance"] = distance
+	experimentDict["knobPlans"] = knobPlans
 	
 	print(f"Dictionary Before Saving and Loading: {experimentDict}")
 
 	# Exporting the dictionary to a JSON
 	import json
 
-	fileName = "ServoExperimentPoints_"+str(distance)+".json"
+	# Named after the planner too, a plan without extra transitions would otherwise replace
+	# the tracked ServoExperimentPoints_0.json
+	fileName = "ServoExperimentPoints_" + planner + "_" + str(distance) + ".json"
 
 	# Opening JSON File
 	with open(fileName, 'w') as jsonFile:
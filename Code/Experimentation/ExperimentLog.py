@@ -0,0 +1,269 @@
+# ----- Imports -----
+# Utility
+import json
+import numpy as np
+import os
+
+# Readability
+import time
+
+# ----- Class -----
+class ResultsLog:
+	"""
+	Line delimited JSON log of an experiment, one line per transition, written as the
+	experiment runs so a crash, a stop, or a power loss only loses the transition in
+	progress. The first line describes the session (the plan being run) so an interrupted
+	session can be resumed with the same plan
+
+	Each line is flushed as it is written and the file is synced to disk every
+	syncInterval seconds
+	"""
+
+	def __init__(self, fileName, sessionInfo: dict = None, syncInterval = 30):
+		"""
+		Opens (or creates) the log
+
+		fileName : line delimited JSON file to append to
+		sessionInfo (optional) : JSON friendly description of the session, written as the
+			first line of a new log. If the log already exists it must describe the same
+			session, otherwise ValueError is raised
+		syncInterval : seconds between syncs of the file to disk
+		"""
+
+		self.fileName = fileName
+		self.syncInterval = syncInterval
+
+		if sessionInfo is None:
+			sessionInfo = dict()
+		#
+
+		# - Checking an Existing Log Belongs to this Session -
+		# A line cut short by a crash would have the next record glued onto it
+		if os.path.exists(fileName):
+			removedBytes = RemovePartialLine(fileName)
+			if removedBytes > 0:
+				print(f"Removed an unfinished line ({removedBytes} bytes) from the end of {fileName}")
+			#
+		#
+
+		existingInfo, lastSetpointNumber = ScanResultsLog(fileName)
+		if (existingInfo is not None) and (existingInfo.get("session") != sessionInfo):
+			raise ValueError(f"{fileName} belongs to a different session, move it to start a new one")
+		#
+		self.lastSetpointNumber = lastSetpointNumber
+
+		# - Opening -
+		self.lastSyncTime = time.monotonic()
+		self.logFile = open(fileName, 'a')
+		if existingInfo is None:
+			header = {"type": "session", "session": sessionInfo,
+				"created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())}
+			self.WriteLine(header)
+			self.Sync()
+		#
+	#
+
+	def WriteLine(self, dictionary):
+		"""
+		Writes one record as a line of JSON, numpy values are converted to python values
+		"""
+
+		self.logFile.write(json.dumps(dictionary, default = ConvertValue) + "\n")
+		self.logFile.flush()
+	#
+
+	def Append(self, setpointNumber, setpoints, logs):
+		"""
+		Records a completed transition
+
+		setpointNumber : index of the transition in the plan
+		setpoints : setpoint each knob was sent to
+		logs : log of each knob (KnobSuite.GetLogs)
+		"""
+
+		record = {"type": "transition", "setpointNumber": setpointNumber,
+			"setpoints": list(setpoints), "logs": list(logs)}
+		self.WriteLine(record)
+		self.lastSetpointNumber = setpointNumber
+
+		if (time.monotonic() - self.lastSyncTime) >= self.syncInterval:
+			self.Sync()
+		#
+	#
+
+	def Sync(self):
+		"""
+		Makes sure everything written so far is on disk
+		"""
+
+		self.logFile.flush()
+		os.fsync(self.logFile.fileno())
+		self.lastSyncTime = time.monotonic()
+	#
+
+	def Close(self):
+		"""
+		Syncs and closes the log
+		"""
+
+		if self.logFile.closed:
+			return
+		#
+
+		self.Sync()
+		self.logFile.close()
+	#
+#
+
+# ----- Methods and Functions -----
+def ConvertValue(value):
+	"""
+	Converts numpy values (which json can't save) into python values
+	"""
+
+	if isinstance(value, (np.integer, np.floating, np.bool_)):
+		return value.item()
+	#
+
+	raise TypeError(f"{type(value)} can't be saved as JSON")
+#
+
+def ReadResultsLog(fileName):
+	"""
+	Yields every record in a log, one at a time so the log is never loaded whole. A line
+	cut short by a crash is skipped
+	"""
+
+	with open(fileName) as logFile:
+		for line in logFile:
+			try:
+				yield json.loads(line)
+			except ValueError:
+				continue
+			#
+		#
+	#
+#
+
+def RemovePartialLine(fileName, chunkSize = 4096):
+	"""
+	Cuts a line left unfinished by a crash off the end of a log, so the next record is
+	written on a line of its own. Returns the number of bytes removed
+	"""
+
+	with open(fileName, 'rb+') as logFile:
+		end = logFile.seek(0, os.SEEK_END)
+
+		# Searching backwards for the last complete line
+		position = end
+		while position > 0:
+			chunkStart = max(position - chunkSize, 0)
+			logFile.seek(chunkStart)
+			newline = logFile.read(position - chunkStart).rfind(b"\n")
+			if newline >= 0:
+				position = chunkStart + newline + 1
+				break
+			#
+			position = chunkStart
+		#
+
+		logFile.truncate(position)
+	#
+
+	return end - position
+#
+
+def ScanResultsLog(fileName):
+	"""
+	Returns the session header of a log (None if there is no log) and the setpointNumber
+	of the last completed transition (-1 if there are none)
+	"""
+
+	if not os.path.exists(fileName):
+		return None, -1
+	#
+
+	header = None
+	lastSetpointNumber = -1
+	for record in ReadResultsLog(fileName):
+		if record.get("type") == "session":
+			header = record
+		elif record.get("type") == "transition":
+			lastSetpointNumber = max(lastSetpointNumber, record["setpointNumber"])
+		#
+	#
+
+	return header, lastSetpointNumber
+#
+
+def ConvertResultsLog(fileName):
+	"""
+	Returns the results in a log in the format the runner used to save
+	({"knob0": [logs], "knob1": [logs], ...}) so the analysis scripts can read it. If a
+	transition was recorded twice (the runner stopped after logging but before moving on)
+	the last record is kept
+	"""
+
+	records = dict()
+	for record in ReadResultsLog(fileName):
+		if record.get("type") == "transition":
+			records[record["setpointNumber"]] = record["logs"]
+		#
+	#
+
+	resultsDictionary = dict()
+	for setpointNumber in sorted(records.keys()):
+		for knobNumber, log in enumerate(records[setpointNumber]):
+			resultsDictionary.setdefault(f"knob{knobNumber}", []).append(log)
+		#
+	#
+
+	return resultsDictionary
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	import sys
+	import tempfile
+
+	# Checks a log resumes cleanly after a crash left half a line at its end
+	if (len(sys.argv) == 2) and (sys.argv[1] == "--check"):
+		with tempfile.TemporaryDirectory() as folder:
+			fileName = os.path.join(folder, "ExperimentLog.jsonl")
+			session = {"plan": "check"}
+
+			resultsLog = ResultsLog(fileName, session)
+			resultsLog.Append(0, [10], [{"time": 1.0}])
+			resultsLog.Close()
+			with open(fileName, 'a') as logFile:
+				logFile.write('{"type": "transition", "setpointNum')
+			#
+
+			resultsLog = ResultsLog(fileName, session)
+			resultsLog.Append(1, [20], [{"time": 2.0}])
+			resultsLog.Close()
+
+			resultsDictionary = ConvertResultsLog(fileName)
+			lastSetpointNumber = ScanResultsLog(fileName)[1]
+		#
+
+		assert resultsDictionary == {"knob0": [{"time": 1.0}, {"time": 2.0}]}, resultsDictionary
+		assert lastSetpointNumber == 1, lastSetpointNumber
+		print("Resuming after an unfinished line keeps every transition")
+		sys.exit(0)
+	#
+
+	# Converts a log into an ExperimentResults file
+	if len(sys.argv) < 3:
+		print("Usage: python ExperimentLog.py <log file> <results file>")
+		print("       python ExperimentLog.py --check")
+		sys.exit(1)
+	#
+
+	resultsDictionary = ConvertResultsLog(sys.argv[1])
+	with open(sys.argv[2], 'w') as jsonFile:
+		json.dump(resultsDictionary, jsonFile)
+	#
+
+	print(f"Converted {sum(len(logs) for logs in resultsDictionary.values())} logs to {sys.argv[2]}")
+#
@@ -3,7 +3,9 @@
 from collections import deque
 import math
 import numpy as np
+import os
 import random
+import sys
 
 # Reability
 from typing import List
@@ -11,12 +13,16 @@ from typing import List
 # For Control
 import time
 
-# For I2C
-import pi_servo_hat
-import smbus
+# My Code (LazyImport is shared with Code/Demo)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Demo"))
+from LazyImport import LazyModule, LazyObject
+
+# For I2C (only imported once the hardware is used)
+pi_servo_hat = LazyModule("pi_servo_hat")
+smbus = LazyModule("smbus")
 
 # For control systems
-from simple_pid import PID
+simple_pid = LazyModule("simple_pid")
 
 # ----- Global Values ----
 ADC_ADDRESS = 0x4a
@@ -25,13 +31,20 @@ POT_1_CONTROL_BYTE = 0X42
 POT_2_CONTROL_BYTE = 0x41
 
 # ----- Global Classes -----
-# Initializing the i2c bus
-i2cBus = smbus.SMBus(1)
+# Hardware is only opened on first use so importing this file has no side effects
+def OpenServoHat():
+	"""
+	Initializes the servo hat and soft resets it, preparing it for use
+	"""
+
+	servoHat = pi_servo_hat.PiServoHat()
+	servoHat.restart()
+
+	return servoHat
+# 
 
-# Initializing Servo Hat
-servoHat = pi_servo_hat.PiServoHat()
-# Soft rest the system, preparing it for use
-servoHat.restart()
+i2cBus = LazyObject(lambda: smbus.SMBus(1))
+servoHat = LazyObject(OpenServoHat)
 
 # ----- Methods and Functions -----
 def ReadPotentiometer(potentiometerNumber):
@@ -190,7 +203,7 @@ class KnobController:
 		# - Defining PID Controller -
 		# Create the pid controller
 		startingValue = np.mean([self.pidLowerBound, self.pidUpperBound])
-		self.pid = PID(0.4, 0.33, 0.05, starting_output=startingValue)
+		self.pid = simple_pid.PID(0.4, 0.33, 0.05, starting_output=startingValue)
 
 		# Setting the sampling time
 		self.samplingTime = 0.005
@@ -839,6 +852,7 @@ if __name__ == "__main__":
 
 	conductExperiment = True
 	experimentDictionary = None
+	knobPlans = None
 	if not conductExperiment:
 		# setpointQueue = deque([50, 200, 200, 50])
 		setpointQueue = deque([50, 200, 100, 150])
@@ -868,82 +882,118 @@ if __name__ == "__main__":
 		print(f"Loaded Experimental Data : {experimentDictionary}")
 
 		setpointQueue = deque(experimentDictionary["pointList"])
+
+		# Each knob follows its own plan, older files only have the one point list
+		knobPlans = experimentDictionary.get("knobPlans",
+			[experimentDictionary["pointList"]]*knobSuite.numberOfKnobs)
 	# 
 
 	print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
 	print("TODAY'S POINTS!!!")
-	print(setpointQueue)
+	print(setpointQueue if knobPlans is None else knobPlans)
 	print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
 	
+	# --- Results Log ---
+	# Every transition is written as soon as it finishes, so an interrupted session can
+	# be resumed from the last completed transition
+	resultsLog = None
+	firstSetpointNumber = 0
+	if conductExperiment:
+		import os
+		from ExperimentLog import ResultsLog, ConvertResultsLog
+
+		resultsLogFile = "ExperimentLog_" + os.path.splitext(fileName)[0] + ".jsonl"
+		resultsLog = ResultsLog(resultsLogFile, {"pointFile": fileName, "knobPlans": knobPlans})
+
+		firstSetpointNumber = resultsLog.lastSetpointNumber + 1
+		if firstSetpointNumber > 0:
+			print(f"Resuming {resultsLogFile} from location {firstSetpointNumber}")
+		# 
+	# 
+
 	# knobSuite([127, 127], sequential = True)
 	knobSuite([127, 127], sequential = False)
 
 	
-	# Move to first location in experiment
-	startingLocation = setpointQueue[0]
-	knobSuite([startingLocation, startingLocation], sequential = False)
+	# Move to first location in experiment (or where the last completed transition ended)
+	if knobPlans is not None:
+		startingIndex = max(firstSetpointNumber - 1, 0)
+		startingLocations = [knobPlan[startingIndex] for knobPlan in knobPlans]
+	else:
+		startingLocation = setpointQueue[0]
+		startingLocations = [startingLocation, startingLocation]
+	# 
+	knobSuite(startingLocations, sequential = False)
 	
 	if (ReadPotentiometer(2) > 127):
 		exit()
 	# 
 	time.sleep(2)
 
-	# Prepare for testing knobs
-	knob0Logs = []
-	knob1Logs = []
-
-	setpointNumber = 0
+	experimentComplete = False
+	setpointNumber = firstSetpointNumber
 	while True:
+		# Terminate if the experiment is over
+		if (knobPlans is not None) and (setpointNumber >= len(knobPlans[0])):
+			experimentComplete = True
+			break
+		# 
+
 		# randomSetpoint = random.randint(0 + 5, 255 - 5)
 		# setpoints = [randomSetpoint, 255 - randomSetpoint]
 
-		setpoint = setpointQueue[0]
-		setpointQueue.rotate(-1)
-		setpoints = [setpoint, setpoint]
+		if knobPlans is not None:
+			# Every knob moves through its own plan at the same time
+			setpoints = [knobPlan[setpointNumber] for knobPlan in knobPlans]
+		else:
+			setpoint = setpointQueue[0]
+			setpointQueue.rotate(-1)
+			setpoints = [setpoint, setpoint]
+		# 
 
 		print(f"# Go To Location {setpointNumber} : {setpoints}")
 
 		# knobSuite(setpoints, sequential = True)
 		knobSuite(setpoints, sequential = False)
 
-		# Get and save logs
-		log0, log1 = knobSuite.GetLogs()
-		knob0Logs.append(log0)
-		knob1Logs.append(log1)
+		# Save the logs straight away
+		if resultsLog is not None:
+			resultsLog.Append(setpointNumber, setpoints, knobSuite.GetLogs())
+		# 
 
 		if (ReadPotentiometer(2) > 127):
 			break
 		time.sleep(2)
 
 		setpointNumber += 1
-
-		# Terminate if the experiment is over
-		if ((experimentDictionary is not None) \
-	  		and (setpointNumber == experimentDictionary["numberOfPoints"]) and conductExperiment):
-			break
-		# 
 	# 
 
 	# Save the results
-	if conductExperiment:
-		# Initialization
-		currentTime = time.localtime()
-		currentTimeString = time.strftime("%H_%M_%S", currentTime)
+	if resultsLog is not None:
+		resultsLog.Close()
 
-		resultsFilename = "ExperimentResults_" + currentTimeString + ".json"
-		print("Filename: "+ resultsFilename)
+		if experimentComplete:
+			# Initialization
+			currentTime = time.localtime()
+			currentTimeString = time.strftime("%H_%M_%S", currentTime)
 
-		# Saving Results to Dictionary
-		resultsDictionary = dict()
-		resultsDictionary["knob0"] = knob0Logs
-		resultsDictionary["knob1"] = knob1Logs
+			resultsFilename = "ExperimentResults_" + currentTimeString + ".json"
+			print("Filename: "+ resultsFilename)
 
-		# Saving Dictionary as JSON
-		with open(resultsFilename, 'w') as jsonFile:
-			json.dump(resultsDictionary, jsonFile)
-		# 
-		jsonFile.close()
+			# Converting the log into the usual results file
+			resultsDictionary = ConvertResultsLog(resultsLogFile)
+
+			# Saving Dictionary as JSON
+			with open(resultsFilename, 'w') as jsonFile:
+				json.dump(resultsDictionary, jsonFile)
+			# 
+
+			# Keep the log with the results, the next session starts a new one
+			os.replace(resultsLogFile, "ExperimentResults_" + currentTimeString + ".jsonl")
 
-		print(f"Experimental Results Saved To: {resultsFilename}")
+			print(f"Experimental Results Saved To: {resultsFilename}")
+		else:
+			print(f"Experiment stopped after location {resultsLog.lastSetpointNumber}, run again to resume from {resultsLogFile}")
+		# 
 	# 
-# 
+#
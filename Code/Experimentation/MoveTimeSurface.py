@@ -0,0 +1,150 @@
+# ----- Imports -----
+# Utility
+import numpy as np
+
+# Readability
+from typing import Dict, List
+
+# My Code
+from AggregationCache import AggregationCache
+
+# ----- Global Values -----
+# Metrics a surface is fit for
+SURFACE_METRICS = ("time", "overshoot")
+
+# ----- Methods and Functions -----
+def TabulateAggregates(knobAggregates, metric):
+	"""
+	Returns (points, table, measured): every point one knob's transitions start or end at,
+	the average of metric for each (start, end) pair of points, and which pairs were
+	measured. The diagonal (moves that don't go anywhere) is never measured, so it is
+	filled like any other missing pair rather than pinned to zero, which would drag the
+	predictions of every short move towards zero
+
+	knobAggregates : aggregates of one knob (see AggregationCache.MergePartialAggregates)
+	"""
+
+	points = np.union1d(knobAggregates["start"], knobAggregates["end"]).astype(float)
+
+	startIndices = np.searchsorted(points, knobAggregates["start"])
+	endIndices = np.searchsorted(points, knobAggregates["end"])
+
+	table = np.zeros((len(points), len(points)))
+	measured = np.zeros((len(points), len(points)), dtype = bool)
+	table[startIndices, endIndices] = knobAggregates[metric + "Mean"]
+	measured[startIndices, endIndices] = True
+
+	return points, table, measured
+#
+
+def FillMissingTransitions(points, table, measured):
+	"""
+	Fills the pairs that weren't measured (partial plans and the diagonal) with a low order
+	polynomial in the move's distance and end points, fit to the pairs that were. Filled
+	values are kept within the range that was measured, so the fit can't extrapolate to
+	moves faster (or slower) than any on record
+	"""
+
+	if np.all(measured) or not np.any(measured):
+		return table
+	#
+
+	starts, ends = np.meshgrid(points, points, indexing = "ij")
+	distances = np.abs(ends - starts)/255
+	features = np.stack([np.ones_like(distances), distances, distances**2, starts/255, ends/255], axis = -1)
+
+	table = table.copy()
+	if np.sum(measured) < features.shape[-1]:
+		# Too few pairs to fit, the average is the best guess
+		table[~measured] = np.mean(table[measured])
+		return table
+	#
+
+	coefficients = np.linalg.lstsq(features[measured], table[measured], rcond = None)[0]
+	table[~measured] = np.clip(features[~measured] @ coefficients, np.min(table[measured]), np.max(table[measured]))
+
+	return table
+#
+
+def InterpolateTable(points, table, gridPoints):
+	"""
+	Bilinearly interpolates a table over (points x points) onto (gridPoints x gridPoints),
+	values past the outermost points are held at the edge
+	"""
+
+	# Along the end axis for every start, then along the start axis
+	rows = np.array([np.interp(gridPoints, points, row) for row in table])
+	grid = np.array([np.interp(gridPoints, points, column) for column in rows.T]).T
+
+	return grid
+#
+
+def CreateMoveTimeSurface(aggregates, gridSize = 256, channels = None):
+	"""
+	Fits a lookup grid of every metric in SURFACE_METRICS for every knob from aggregated
+	results. Returns a dictionary of gridPoints (the setpoints the grid is sampled at) and,
+	for each metric, a (knobs x gridSize x gridSize) array indexed [knob, start, end]
+
+	aggregates : aggregated results (see AggregationCache.MergePartialAggregates)
+	gridSize : points along each axis, 256 gives one cell per setpoint, coarser grids are
+		interpolated when queried
+	channels (optional) : knobs to fit, every knob in aggregates if not provided
+	"""
+
+	if channels is None:
+		channels = np.unique(aggregates["channel"]).tolist()
+	#
+	gridPoints = np.linspace(0, 255, gridSize)
+
+	surface: Dict[str, np.ndarray] = {"gridPoints": gridPoints, "channels": np.array(channels)}
+	for metric in SURFACE_METRICS:
+		grids: List[np.ndarray] = []
+		for channel in channels:
+			knobAggregates = aggregates[aggregates["channel"] == channel]
+
+			points, table, measured = TabulateAggregates(knobAggregates, metric)
+			table = FillMissingTransitions(points, table, measured)
+			grids.append(InterpolateTable(points, table, gridPoints))
+		#
+
+		surface[metric] = np.array(grids, dtype = np.float32)
+	#
+
+	return surface
+#
+
+def SaveMoveTimeSurface(fileName, surface: dict):
+	"""
+	Saves a surface (see CreateMoveTimeSurface) for MoveTimePrediction.MoveTimePredictor
+	"""
+
+	np.savez(fileName, **surface)
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	# --- Parameters ---
+	resultsFolders = ["DefaultConfiguration"]
+	surfaceFile = "MoveTimeSurface.npz"
+	gridSize = 256
+
+	# --- Fitting ---
+	aggregates = AggregationCache().AggregateFolders(resultsFolders)
+	surface = CreateMoveTimeSurface(aggregates, gridSize)
+	SaveMoveTimeSurface(surfaceFile, surface)
+
+	print(f"Fit a {gridSize}x{gridSize} surface for knobs {surface['channels'].tolist()} from {resultsFolders}")
+
+	# The grid passes through every measured transition that falls on a grid point
+	for channel in surface["channels"]:
+		knobAggregates = aggregates[aggregates["channel"] == channel]
+		setpoints = np.stack([knobAggregates["start"], knobAggregates["end"]]).astype(float)
+		gridIndices = np.round(setpoints*(gridSize - 1)/255).astype(int)
+		predictions = surface["time"][list(surface["channels"]).index(channel)][gridIndices[0], gridIndices[1]]
+		error = np.sqrt(np.mean((predictions - knobAggregates["timeMean"])**2))
+
+		print(f"Knob {channel}: RMS error at measured transitions {error:.3f} s")
+	#
+
+	print(f"Surface Saved To: {surfaceFile}")
+#
@@ -1,18 +1,24 @@
 # ----- Imports -----
 # Utility
 from collections import deque
-import random
 import numpy as np
+import os
+import random
+import sys
 
 # For Control
 import time
 
-# For I2C
-import pi_servo_hat
-import smbus
+# My Code (LazyImport is shared with Code/Demo)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Demo"))
+from LazyImport import LazyModule, LazyObject
+
+# For I2C (only imported once the hardware is used)
+pi_servo_hat = LazyModule("pi_servo_hat")
+smbus = LazyModule("smbus")
 
 # For control systems
-from simple_pid import PID
+simple_pid = LazyModule("simple_pid")
 
 """
 	Right now my goal is get to the point where I can make the servo turn to a certain
@@ -36,13 +42,20 @@ POT_0_CHANNEL = 0x41
 POT_1_CHANNEL = 0X40
 
 # ----- Global Classes -----
-# Initializing the i2c bus
-i2cBus = smbus.SMBus(1)
+# Hardware is only opened on first use so importing this file has no side effects
+def OpenServoHat():
+	"""
+	Initializes the servo hat and soft resets it, preparing it for use
+	"""
+
+	servoHat = pi_servo_hat.PiServoHat()
+	servoHat.restart()
+
+	return servoHat
+# 
 
-# Initializing Servo Hat
-servoHat = pi_servo_hat.PiServoHat()
-# Soft rest the system, preparing it for use
-servoHat.restart()
+i2cBus = LazyObject(lambda: smbus.SMBus(1))
+servoHat = LazyObject(OpenServoHat)
 
 # ----- Methods and Functions -----
 def ReadPotentiometer(potentiometerNumber):
@@ -166,7 +179,7 @@ if __name__ == "__main__":
 	# pid = PID(0.4, 0.3, 0)
 	# pid = PID(0.4, 0.3, 0.075)
 	# pid = PID(0.4, 0.3, 0.05)
-	pid = PID(0.4, 0.33, 0.05)
+	pid = simple_pid.PID(0.4, 0.33, 0.05)
 
 	# Setting the sampling time
 	samplingTime = 0.005
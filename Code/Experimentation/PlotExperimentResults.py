@@ -4,6 +4,8 @@ from collections import deque
 import math
 import matplotlib.axes
 import matplotlib.figure
+import matplotlib.tri
+import multiprocessing
 import numpy as np
 import random
 import matplotlib.pyplot as plt
@@ -14,190 +16,90 @@ import os
 import time
 from typing import List
 
+# My Code
+from AggregationCache import AggregationCache
+from ResultsStore import GroupTransitions
 
 # ----- Methods and Functions -----
-def RemoveStationaryMovements(transitionList):
+def AggregateResults(results, metrics = ("time", "overshoot"), percentiles = (5, 25, 75, 95)):
 	"""
-	This function removes all transitions that started and ended on the same point.
+	Groups moves by (channel, start, end) and summarizes each group, so runs with
+	different, reordered, or partial plans can be pooled. Moves that start and end on the
+	same point are dropped
+
+	Returns a structured array with one row per transition (sorted by channel, start, end)
+	and the fields channel, start, end, count, and for each metric <metric>Mean,
+	<metric>Median, <metric>Std, and <metric>P<percentile>
+
+	results : results array (see ResultsStore)
+	metrics : result fields to summarize
+	percentiles : percentiles to report besides the median
 	"""
 
-	filteredTransitions = []
+	results = results[results["start"] != results["end"]]
 
-	for log in transitionList:
-		startPoint = log["startSetpoint"]
-		endPoint = log["endSetpoint"]
+	# --- Grouping ---
+	order, groupStarts, counts = GroupTransitions(results)
+	groupIndices = np.repeat(np.arange(len(groupStarts)), counts)
 
-		# print(f"Start: {startPoint:4} | End: {endPoint:4}")
-		if (startPoint != endPoint):
-			filteredTransitions.append(log)
-		# 
+	# --- Summarizing ---
+	fields = [("channel", "<i2"), ("start", "<i2"), ("end", "<i2"), ("count", "<i8")]
+	for metric in metrics:
+		fields += [(metric + "Mean", "<f8"), (metric + "Median", "<f8"), (metric + "Std", "<f8")]
+		fields += [(f"{metric}P{percentile:g}", "<f8") for percentile in percentiles]
 	# 
 
-	return filteredTransitions
-# 
+	aggregates = np.empty(len(groupStarts), dtype = fields)
+	for field in ["channel", "start", "end"]:
+		aggregates[field] = results[field][order[groupStarts]]
+	# 
+	aggregates["count"] = counts
 
-def AverageResults(listOfExperimentLogs):
-	"""
-	Goes through all the logs generated from the experiments and averages the results
-	into one log
-	"""
+	if len(order) == 0:
+		return aggregates
+	# 
 
-	# Extract values into variables so the code is more legible
-	numberOfLogs = len(listOfExperimentLogs[0])
-	numberOfLists = len(listOfExperimentLogs)
-
-	# print(f"Number of Logs: {numberOfLogs} | Number of Lists: {numberOfLists}")
-
-	listOfAverages: List[dict] = []
-
-	for i in range(0, numberOfLogs):
-		# For each log index
-
-		# Reset currentAverageDictionary
-		currentAverageDictionary = dict()
-		currentAverageDictionary["channel"] = ""
-		currentAverageDictionary["startSetpoint"] = ""
-		currentAverageDictionary["endSetpoint"] = ""
-		currentAverageDictionary["time"] = ""
-		currentAverageDictionary["overshoot"] = ""
-
-		# Reset Current Information
-		currentStartSetpoint = None
-		currentEndSetpoint = None
-		timeValues = []
-		overshootValues = []
-
-		# Average all logs at i
-		for experimentNum in range(0, numberOfLists):
-			# For each log at i from each experiment
-			currentList = listOfExperimentLogs[experimentNum]
-			currentLog = currentList[i]
-			
-			# Verify that all experiments have the same starting point
-			if (currentStartSetpoint is None):
-				currentStartSetpoint = currentLog["startSetpoint"]
-				# print(f"Started at {currentStartSetpoint}")
-				startSetpointMatches = True
-			elif (currentLog["startSetpoint"] == currentStartSetpoint):
-				# Does this match the other logs at this index?
-				startSetpointMatches = True
-			else:
-				print(f"SOMETHING ISN'T LINING UP")
-				startSetpointMatches = False
-			# 
-
-			# Verify that all experiments have the same ending point
-			if (currentEndSetpoint is None):
-				currentEndSetpoint = currentLog["endSetpoint"]
-				# print(f"Ended at {currentEndSetpoint}")
-				endSetpointMatches = True
-			elif (currentLog["endSetpoint"] == currentEndSetpoint):
-				# Does this match the other logs at this index?
-				endSetpointMatches = True
-			else:
-				print(f"SOMETHING ISN'T LINING UP")
-				endSetpointMatches = False
-			#
-			
-			# Save the values from the current log
-			timeValues.append(currentLog["time"])
-			overshootValues.append(currentLog["overshoot"])
-		# 
-		
-		# Data has been collected, compute the average
-		if startSetpointMatches and endSetpointMatches:
-			# If all logs start and end at the same spot
-			
-			# Average the data
-			averageTime = np.mean(timeValues)
-			averageOvershoot = np.mean(overshootValues)
-
-			# print(f"Time: {timeValues}")
-			# print(f"Overshoot: {overshootValues}")
-			# print(f"Average Time: {averageTime: 6.2f} | Average Overshoot: {averageOvershoot: 6.2f}")
-
-			# Save Results to currentAverageDictionary
-			currentAverageDictionary["channel"] = currentLog["channel"]
-			currentAverageDictionary["startSetpoint"] = currentLog["startSetpoint"]
-			currentAverageDictionary["endSetpoint"] = currentLog["endSetpoint"]
-			currentAverageDictionary["time"] = averageTime
-			currentAverageDictionary["overshoot"] = averageOvershoot
-			
-			listOfAverages.append(currentAverageDictionary)
-			
-			# print(f"Averaged Entry: {currentAverageDictionary}")
-		else:
-			# Something went wrong, complain
-			print(f"I GIVE UP!!!")
-			break
+	for metric in metrics:
+		values = np.asarray(results[metric][order], dtype = float)
+
+		means = np.add.reduceat(values, groupStarts)/counts
+		deviations = values - means[groupIndices]
+		aggregates[metric + "Mean"] = means
+		aggregates[metric + "Std"] = np.sqrt(np.add.reduceat(deviations**2, groupStarts)/counts)
+
+		# Sort the values within each group, then interpolate between the ranks
+		sortedValues = values[np.lexsort((values, groupIndices))]
+		for name, percentile in [("Median", 50)] + [(f"P{percentile:g}", percentile) for percentile in percentiles]:
+			ranks = groupStarts + (percentile/100)*(counts - 1)
+			lower = np.floor(ranks).astype(int)
+			upper = np.ceil(ranks).astype(int)
+			aggregates[metric + name] = sortedValues[lower] + (ranks - lower)*(sortedValues[upper] - sortedValues[lower])
 		# 
 	# 
 
-	return listOfAverages
+	return aggregates
 # 
 
-def ConvertLogsToLists(listOfLogs: List[dict]):
+def AverageFolderContents(folder, aggregationCache: AggregationCache = None):
 	"""
-	Converts the list of logs into 4 arrays where all entires from the same log have the same
-	index in the array
-	"""
-
-	# print(f"List o Logs: {listOfLogs}")
+	Summarizes every result in the specified folder, returns the summaries of knob 0 and
+	of knob 1 (see AggregateResults). Only files that are new or have changed since the
+	last time are parsed
 
-	startPoints: List[int] = []
-	endPoints: List[int] = []
-	settlingTime: List[float] = []
-	overshoot: list[float] = []
-	
-	for log in listOfLogs:
-		startPoints.append(log["startSetpoint"])
-		endPoints.append(log["endSetpoint"])
-		settlingTime.append(log["time"])
-		overshoot.append(log["overshoot"])
-	# 
-
-	return startPoints, endPoints, settlingTime, overshoot
-# 
-
-def AverageFolderContents(folder):
-	"""
-	Averages all logs from the specified folder
+	aggregationCache (optional) : cache of parsed results files, the default cache is used
+		if not provided
 	"""
 
-	experimentResults: List[dict] = []
-
-	# Loading each file and extracting the results
-	for name in os.listdir(folder):
-		with open(os.path.join(folder, name)) as currentFile:
-			currentDictionary = dict()
-			currentDictionary:dict = json.load(currentFile)
-			currentFile.close()
-
-			# print(f"Filename: '{name}'")
-			# print(f"Dictionary: {currentDictionary.keys()}")
-
-			experimentResults.append(currentDictionary)
-		# 
+	if aggregationCache is None:
+		aggregationCache = AggregationCache()
 	# 
 
-	# --- Filtering Results ---
-	# Sorting Results by Knob
-	knob0Logs = []
-	knob1Logs = []
-	for i in range(0, len(experimentResults)):
-		knob0Logs.append(experimentResults[i]["knob0"])
-		knob1Logs.append(experimentResults[i]["knob1"])
-	# 
+	# Medians and percentiles can't be merged from partial aggregates, so the cached
+	# columns are summarized instead
+	aggregates = AggregateResults(aggregationCache.LoadFolderColumns([folder]))
 
-	# Removing Identities
-	for i in range(0, len(experimentResults)):
-		knob0Logs[i] = RemoveStationaryMovements(knob0Logs[i])
-		knob1Logs[i] = RemoveStationaryMovements(knob1Logs[i])
-	# 
-
-	# Averaging Results
-	knob0Averages = AverageResults(knob0Logs)
-	knob1Averages = AverageResults(knob1Logs)
+	knob0Averages = aggregates[aggregates["channel"] == 0]
+	knob1Averages = aggregates[aggregates["channel"] == 1]
 
 	return knob0Averages, knob1Averages
 # 
@@ -212,77 +114,62 @@ def CreateAlphaBlendedCmap(alpha):
 	return cmap
 # 
 
-def PlotExperimentalResults(figureTitle, filename, knob0Data, knob1Data):
+def CreateTriangulation(knobData):
+	"""
+	Returns the Delaunay triangulation of a knob's (start, end) points, computed once and
+	shared by every panel of the knob
+	"""
+
+	return matplotlib.tri.Triangulation(np.asarray(knobData["start"], dtype = float),
+		np.asarray(knobData["end"], dtype = float))
+# 
+
+def PlotExperimentalResults(figureTitle, filename, knob0Data, knob1Data, statistic = "Mean"):
 	"""
 	Plots the results from an experiment
+
+	knob0Data, knob1Data : summaries of each knob (see AggregateResults)
+	statistic : summary of each transition that is plotted ("Mean", "Median", "P95", ...)
 	"""
-	# --- Converting To Lists ---
-	knob0StartList, knob0EndList, knob0SettlingTimeList, knob0OvershootList = ConvertLogsToLists(knob0Data)
-	knob1StartList, knob1EndList, knob1SettlingTimeList, knob1OvershootList = ConvertLogsToLists(knob1Data)
+	# --- Triangulating Each Knob ---
+	# The settling and overshoot panels of a knob use the same points
+	knobData = [knob0Data, knob1Data]
+	triangulations = [CreateTriangulation(data) for data in knobData]
 
-	# --- Knob 0 Plots ---
 	# -- Creating Figure/Subplots and Apply Lables --
-	fig, axs = plt.subplots(2, 2)
-	plt.suptitle(figureTitle)
+	# Built without pyplot so figures can be drawn in worker processes
+	fig = matplotlib.figure.Figure()
+	axs = fig.subplots(2, 2)
+	fig.suptitle(figureTitle)
 	
 	# Changing Figure Dimensions
 	figureSizeMultiplier = 1.25
 	fig.set_size_inches(figureSizeMultiplier*fig.get_size_inches())
 
-	# Applying Lables
-	axs[0,0].set_title("Knob 0 Settling Time")
-	axs[1,0].set_title("Knob 0 Overshoot")
-	
-	axs[0,1].set_title("Knob 1 Settling Time")
-	axs[1,1].set_title("Knob 1 Overshoot")
-	
-	axs[0,0].set_xlabel("Starting Position")
-	axs[0,1].set_xlabel("Starting Position")
-	axs[1,0].set_xlabel("Starting Position")
-	axs[1,1].set_xlabel("Starting Position")
-	
-	axs[0,0].set_ylabel("Ending Position")
-	axs[0,1].set_ylabel("Ending Position")
-	axs[1,0].set_ylabel("Ending Position")
-	axs[1,1].set_ylabel("Ending Position")
-
 	# -- Plotting the Data --
-	# Creating a new color map with blended alpha values (removes ghost edges)
-	cmap = CreateAlphaBlendedCmap(0.75)
-	
-	# - Knob 0 Settling -
-	# Creating Settling Color Graident
-	trpColor = axs[0,0].tripcolor(knob0StartList, knob0EndList, knob0SettlingTimeList,\
-						shading='gouraud')
-	fig.colorbar(trpColor, label = "Settling Time (s)") # Adding the color-bar to the figure
-	
-	# - Knob 0 Overshoot -
-	# Creating Overshoot Color Graident
-	trpColor = axs[1,0].tripcolor(knob0StartList, knob0EndList, knob0OvershootList,\
-						shading='gouraud')
-	fig.colorbar(trpColor, label = "Overshoot") # Adding the color-bar to the figure
-	
-	# - Knob 1 Settling -
-	# Creating Settling Color Graident
-	trpColor = axs[0,1].tripcolor(knob1StartList, knob1EndList, knob1SettlingTimeList,\
-						shading='gouraud')
-	fig.colorbar(trpColor, label = "Settling Time (s)") # Adding the color-bar to the figure
-	
-	# - Knob 1 Overshoot -
-	# Creating Overshoot Color Graident
-	trpColor = axs[1,1].tripcolor(knob1StartList, knob1EndList, knob1OvershootList,\
-						shading='gouraud')
-	fig.colorbar(trpColor, label = "Overshoot") # Adding the color-bar to the figure
-	
-	
-	# - All Plots -
-	# Plotting Transition Start and End Points on All Plots
 	marker = "."
-	axs[0,0].plot(knob0StartList, knob0EndList, linewidth=0, marker=marker, color="k", fillstyle="none")
-	axs[0,1].plot(knob0StartList, knob0EndList, linewidth=0, marker=marker, color="k", fillstyle="none")
-	axs[1,0].plot(knob0StartList, knob0EndList, linewidth=0, marker=marker, color="k", fillstyle="none")
-	axs[1,1].plot(knob0StartList, knob0EndList, linewidth=0, marker=marker, color="k", fillstyle="none")
-
+	for knobNumber, (data, triangulation) in enumerate(zip(knobData, triangulations)):
+		# Applying Lables
+		axs[0, knobNumber].set_title(f"Knob {knobNumber} {statistic} Settling Time")
+		axs[1, knobNumber].set_title(f"Knob {knobNumber} {statistic} Overshoot")
+
+		# - Settling -
+		# Creating Settling Color Graident
+		trpColor = axs[0, knobNumber].tripcolor(triangulation, data["time" + statistic], shading='gouraud')
+		fig.colorbar(trpColor, ax = axs[0, knobNumber], label = "Settling Time (s)") # Adding the color-bar to the figure
+
+		# - Overshoot -
+		# Creating Overshoot Color Graident
+		trpColor = axs[1, knobNumber].tripcolor(triangulation, data["overshoot" + statistic], shading='gouraud')
+		fig.colorbar(trpColor, ax = axs[1, knobNumber], label = "Overshoot") # Adding the color-bar to the figure
+
+		# Plotting Transition Start and End Points on Both Plots
+		for row in range(0, 2):
+			axs[row, knobNumber].plot(triangulation.x, triangulation.y, linewidth=0, marker=marker, color="k", fillstyle="none")
+			axs[row, knobNumber].set_xlabel("Starting Position")
+			axs[row, knobNumber].set_ylabel("Ending Position")
+		# 
+	# 
 
 	# Change Layout
 	"""
@@ -293,16 +180,49 @@ def PlotExperimentalResults(figureTitle, filename, knob0Data, knob1Data):
 	fig.tight_layout()
 
 	# - Saving the Figure -
-	plt.savefig(filename)
+	fig.savefig(filename)
 # 
 
 # ----- Universal Functions -----
-def LoadAndPlotExperimentalData(folder, figureTitle, figureFilename):
+def LoadAndPlotExperimentalData(folder, figureTitle, figureFilename, statistic = "Mean"):
 	# --- Loading Results ---
 	knob0Averages, knob1Averages = AverageFolderContents(folder)
 		
 	# --- Plotting Results ---
-	PlotExperimentalResults(figureTitle, figureFilename, knob0Averages, knob1Averages)
+	PlotExperimentalResults(figureTitle, figureFilename, knob0Averages, knob1Averages, statistic)
+# 
+
+def PlotConfigurationWorker(arguments):
+	"""
+	Pool worker, loads and plots one configuration
+
+	arguments : tuple of (folder, figureTitle, figureFilename) or (folder, figureTitle,
+		figureFilename, statistic)
+	"""
+
+	LoadAndPlotExperimentalData(*arguments)
+
+	return arguments[2]
+# 
+
+def GenerateReports(configurations, numberOfProcesses = None):
+	"""
+	Plots every configuration, each in its own process drawing with the Agg backend.
+	Returns the figure filenames
+
+	configurations : list of (folder, figureTitle, figureFilename), optionally followed by
+		the statistic to plot (see PlotExperimentalResults)
+	numberOfProcesses (optional) : size of the process pool, defaults to the CPU count
+	"""
+
+	if numberOfProcesses is None:
+		numberOfProcesses = os.cpu_count()
+	# 
+	numberOfProcesses = max(1, min(numberOfProcesses, len(configurations)))
+
+	with multiprocessing.Pool(numberOfProcesses, initializer = matplotlib.use, initargs = ("Agg",)) as pool:
+		return pool.map(PlotConfigurationWorker, configurations)
+	# 
 # 
 
 # ----- Begin Program -----
@@ -315,11 +235,13 @@ if __name__ == "__main__":
 	toyDefaultFolder = "ToyExperiments/Clamped/"
 
 	# --- Loading and Plotting Results ---
-	figureTitle = "Without I Term Clamping"
-	filename = "defaultExperimentResults"
-	LoadAndPlotExperimentalData(defaultFolderPath, figureTitle, filename)
-	
-	figureTitle = "With I Term Clamping"
-	filename = "clampedExperimentResults"
-	LoadAndPlotExperimentalData(clampedFolderPath, figureTitle, filename)
-# 
\ No newline at end of file
+	# (folder, figureTitle, filename) of every configuration to compare
+	configurations = [
+		(defaultFolderPath, "Without I Term Clamping", "defaultExperimentResults"),
+		(clampedFolderPath, "With I Term Clamping", "clampedExperimentResults"),
+	]
+
+	startTime = time.perf_counter()
+	filenames = GenerateReports(configurations)
+	print(f"Plotted {filenames} in {time.perf_counter() - startTime:.2f} s")
+#
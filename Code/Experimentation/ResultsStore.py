@@ -0,0 +1,191 @@
+# ----- Imports -----
+# Utility
+import json
+import numpy as np
+import os
+
+# Readability
+from typing import List
+
+# ----- Global Values -----
+# One row per move, the same values KnobController.GenerateLog records
+RESULTS_DTYPE = np.dtype([
+	("channel", "<i2"),
+	("start", "<i2"),
+	("end", "<i2"),
+	("time", "<f8"),
+	("overshoot", "<f8"),
+	("minSpeed", "<f8"),
+	("maxSpeed", "<f8"),
+])
+
+# Log key each field is read from
+LOG_KEYS = {
+	"channel": "channel",
+	"start": "startSetpoint",
+	"end": "endSetpoint",
+	"time": "time",
+	"overshoot": "overshoot",
+	"minSpeed": "minSpeed",
+	"maxSpeed": "maxSpeed",
+}
+
+# ----- Methods and Functions -----
+# --- Converting ---
+def ConvertLogsToArray(logs: List[dict]):
+	"""
+	Returns a list of logs (KnobController.GenerateLog) as a structured array with one row
+	per log and one column per field of RESULTS_DTYPE. Moves that ended in a fault are left
+	out, their times say nothing about the controller
+	"""
+
+	logs = [log for log in logs if not log.get("fault")]
+
+	results = np.empty(len(logs), dtype = RESULTS_DTYPE)
+	for field, key in LOG_KEYS.items():
+		results[field] = [log[key] for log in logs]
+	#
+
+	return results
+#
+
+def ConvertResultsDictionary(resultsDictionary: dict):
+	"""
+	Returns an ExperimentResults dictionary ({"knob0": [logs], "knob1": [logs], ...}) as
+	one structured array, knob by knob in the order the moves were made
+	"""
+
+	logs = [log for knobName in sorted(resultsDictionary.keys()) for log in resultsDictionary[knobName]]
+
+	return ConvertLogsToArray(logs)
+#
+
+def ConvertResultsFile(jsonFileName, storeFileName = None):
+	"""
+	Converts an ExperimentResults_*.json file into a results store, returns the name of
+	the store
+
+	jsonFileName : results file to convert
+	storeFileName (optional) : store to write, defaults to the results file with a .npy
+		extension
+	"""
+
+	if storeFileName is None:
+		storeFileName = os.path.splitext(jsonFileName)[0] + ".npy"
+	#
+
+	with open(jsonFileName) as jsonFile:
+		resultsDictionary = json.load(jsonFile)
+	#
+
+	SaveResults(storeFileName, ConvertResultsDictionary(resultsDictionary))
+
+	return storeFileName
+#
+
+def ConvertResultsFolder(folder):
+	"""
+	Converts every ExperimentResults_*.json file in folder whose store is missing or older
+	than it, returns the names of every store in the folder
+	"""
+
+	storeFileNames: List[str] = []
+	for name in sorted(os.listdir(folder)):
+		if not name.endswith(".json"):
+			continue
+		#
+
+		jsonFileName = os.path.join(folder, name)
+		storeFileName = os.path.splitext(jsonFileName)[0] + ".npy"
+		if (not os.path.exists(storeFileName)) or (os.path.getmtime(storeFileName) < os.path.getmtime(jsonFileName)):
+			ConvertResultsFile(jsonFileName, storeFileName)
+		#
+
+		storeFileNames.append(storeFileName)
+	#
+
+	return storeFileNames
+#
+
+# --- Grouping ---
+def GroupTransitions(results):
+	"""
+	Sorts results by (channel, start, end) so every transition's moves are contiguous.
+	Returns (order, groupStarts, counts): the sorting indices, where each group starts in
+	the sorted results, and how many moves each group has
+	"""
+
+	order = np.lexsort((results["end"], results["start"], results["channel"]))
+	keys = np.stack([results["channel"][order], results["start"][order], results["end"][order]])
+
+	# A new group starts wherever a key changes
+	isGroupStart = np.ones(len(order), dtype = bool)
+	isGroupStart[1:] = np.any(keys[:, 1:] != keys[:, :-1], axis = 0)
+	groupStarts = np.flatnonzero(isGroupStart)
+	counts = np.diff(np.append(groupStarts, len(order)))
+
+	return order, groupStarts, counts
+#
+
+# --- Saving and Loading ---
+def SaveResults(fileName, results):
+	"""
+	Saves a results array as a .npy file, which can be memory mapped when it is loaded
+	"""
+
+	np.save(fileName, np.asarray(results, dtype = RESULTS_DTYPE), allow_pickle = False)
+#
+
+def LoadResults(fileName, memoryMap = True):
+	"""
+	Loads a results store. When memory mapped nothing is read until a column is used and
+	each column (e.g. results["time"]) is a view of the file, not a copy
+
+	memoryMap : map the file read only instead of reading it into memory
+	"""
+
+	results = np.load(fileName, mmap_mode = "r" if memoryMap else None, allow_pickle = False)
+	if results.dtype != RESULTS_DTYPE:
+		raise ValueError(f"{fileName} isn't a results store, its fields are {results.dtype}")
+	#
+
+	return results
+#
+
+def LoadResultsFolder(folder, memoryMap = True):
+	"""
+	Returns every result in folder as one array, converting any results files that
+	haven't been converted yet
+	"""
+
+	storeFileNames = ConvertResultsFolder(folder)
+	if len(storeFileNames) == 0:
+		return np.empty(0, dtype = RESULTS_DTYPE)
+	#
+
+	return np.concatenate([LoadResults(storeFileName, memoryMap) for storeFileName in storeFileNames])
+#
+
+# ----- Begin Program -----
+if __name__ == "__main__":
+	import sys
+	import time
+
+	# Converts results files or folders of results files
+	if len(sys.argv) < 2:
+		print("Usage: python ResultsStore.py <results file or folder> ...")
+		sys.exit(1)
+	#
+
+	for path in sys.argv[1:]:
+		startTime = time.perf_counter()
+		if os.path.isdir(path):
+			results = LoadResultsFolder(path)
+		else:
+			results = LoadResults(ConvertResultsFile(path))
+		#
+		elapsedTime = time.perf_counter() - startTime
+
+		print(f"{path}: {len(results)} moves on channels {np.unique(results['channel']).tolist()} ({1000*elapsedTime:.1f} ms)")
+	#
+#